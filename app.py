@@ -1,10 +1,20 @@
 import os
+import json
+import hashlib
+import mimetypes
 import logging
+import tempfile
+import threading
 import time
-from flask import Flask, render_template, request, jsonify, session
+from flask import (Flask, Response, render_template, request, jsonify, session, stream_with_context,
+                   send_from_directory, url_for)
 from werkzeug.middleware.proxy_fix import ProxyFix
-from utils.vector_store import VectorStore
-from utils.chat import get_chat_response, response_cache
+from utils.chat import (get_chat_response, get_chat_responses_batch, stream_chat_response, response_cache,
+                        semantic_cache, groq_flight, groq_breaker, metrics, stage_seconds,
+                        get_namespace_chat_response, get_predefined_response, namespace_cache_key)
+from utils.assets import BUNDLES, DIST_DIR, load_manifest
+from utils.ingest import IngestionLog, IngestionQueue
+from utils.namespaces import DEFAULT_NAMESPACE, NamespaceRegistry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,14 +23,247 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "rubber_bumper_default_key")
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+app.config["ASSET_DIR"] = DIST_DIR
+
+# Total time to handle each chat endpoint, next to the per-stage timings recorded in utils.chat
+request_seconds = metrics.histogram(
+    "chatbot_request_duration_seconds", "Time to handle chat API requests", ["endpoint"]
+)
+
+# Built asset bundles have content-hash names, so browsers can keep them for a year
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Predefined answers only change with the code; GET /chat-api lets browsers and proxies reuse them
+PREDEFINED_ANSWER_MAX_AGE = int(os.environ.get("PREDEFINED_ANSWER_MAX_AGE", "3600"))
+
+# Largest number of questions accepted by /chat-api/batch
+BATCH_MAX_MESSAGES = int(os.environ.get("BATCH_MAX_MESSAGES", "500"))
+
+# Memory budget for the vector stores of all namespaces; least recently used case studies are
+# spilled to snapshots under NAMESPACE_SNAPSHOT_DIR (namespaces/ in the instance directory by default)
+NAMESPACE_MAX_BYTES = int(os.environ.get("NAMESPACE_MAX_BYTES", str(1024 * 1024 * 1024)))
+NAMESPACE_SNAPSHOT_DIR = os.environ.get("NAMESPACE_SNAPSHOT_DIR")
+
+# Uploaded chunks and upload job statuses, shared by all workers (defaults to the instance directory)
+INGESTION_LOG_PATH = os.environ.get("INGESTION_LOG_PATH")
 
 # Set up Groq API key in environment variables
 groq_api_key = os.environ.get("GROQ_API_KEY", "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")
 os.environ["GROQ_API_KEY"] = groq_api_key
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Initialize vector store with pre-loaded Rubber Bumper data
-vector_store = VectorStore()
+# The vector store, the namespaces and the ingestion queue are created on first use (or by
+# warm_up()), so importing the app doesn't load scikit-learn and cold starts stay fast.
+_vector_store = None
+_namespaces = None
+_ingestion_log = None
+_ingestion_queue = None
+_init_lock = threading.RLock()
+
+def vector_store_options():
+    """Return the VectorStore backend options set by the VECTOR_STORE_* variables."""
+    return {
+        "backend": os.environ.get("VECTOR_STORE_BACKEND", "tfidf"),
+        "dimensions": int(os.environ.get("VECTOR_STORE_DIMENSIONS", "128")),
+        "clusters": int(os.environ.get("VECTOR_STORE_CLUSTERS", "0")),
+    }
+
+def build_vector_store():
+    """
+    Build the vector store with the pre-loaded Rubber Bumper data.
+
+    Incremental indexing lets uploaded documents be added without refitting
+    the whole corpus. VECTOR_STORE_BACKEND=bm25 selects the BM25 inverted
+    index and VECTOR_STORE_BACKEND=dense low-rank quantized vectors instead
+    of TF-IDF. With VECTOR_STORE_SNAPSHOT set, a saved index is memory-mapped
+    instead of rebuilt, unless it is unreadable or was built with different
+    backend options, in which case it is rebuilt and replaced.
+    """
+    from utils.vector_store import VectorStore
+
+    options = vector_store_options()
+    vector_store_snapshot = os.environ.get("VECTOR_STORE_SNAPSHOT")
+    if vector_store_snapshot and os.path.exists(vector_store_snapshot):
+        try:
+            store = VectorStore.load(vector_store_snapshot, mmap=True)
+        except (OSError, ValueError, KeyError, EOFError) as e:
+            logger.warning(f"Rebuilding unreadable vector store snapshot {vector_store_snapshot}: {str(e)}")
+        else:
+            mismatch = snapshot_mismatch(store, options)
+            if mismatch is None:
+                logger.info(f"Loaded vector store snapshot from {vector_store_snapshot}")
+                return store
+            logger.warning(f"Rebuilding vector store snapshot {vector_store_snapshot}: {mismatch}")
+
+    store = VectorStore(incremental=True, **options)
+    if vector_store_snapshot:
+        try:
+            store.save(vector_store_snapshot)
+            logger.info(f"Saved vector store snapshot to {vector_store_snapshot}")
+        except OSError as e:
+            # Another worker may be writing the same snapshot
+            logger.warning(f"Could not save vector store snapshot: {str(e)}")
+    return store
+
+def snapshot_mismatch(store, options):
+    """Return why a loaded snapshot doesn't match the VECTOR_STORE_* options, or None if it does."""
+    if store.backend != options["backend"]:
+        return f"saved with backend {store.backend}, configured {options['backend']}"
+    if store.backend == "dense":
+        for option in ("dimensions", "clusters"):
+            saved = getattr(store._dense, option)
+            if saved != options[option]:
+                return f"saved with {option}={saved}, configured {options[option]}"
+    return None
+
+def build_namespace_store(namespace):
+    """
+    Create the vector store of a namespace.
+
+    The default namespace holds the Rubber Bumper data; other namespaces
+    start empty and are filled by uploads. Their hashed feature space is
+    smaller than the default 2**20 features, as every incremental store keeps
+    a document frequency entry per feature.
+    """
+    if namespace == DEFAULT_NAMESPACE:
+        return build_vector_store()
+
+    from utils.vector_store import VectorStore
+    return VectorStore(incremental=True, n_features=2**18, preload=False, **vector_store_options())
+
+def get_namespaces():
+    """Return the registry of per-case-study vector stores, creating it on first use."""
+    global _namespaces
+    if _namespaces is None:
+        with _init_lock:
+            if _namespaces is None:
+                log = get_ingestion_log()
+                _namespaces = NamespaceRegistry(
+                    build_namespace_store, NAMESPACE_SNAPSHOT_DIR, max_bytes=NAMESPACE_MAX_BYTES,
+                    exists=lambda namespace: log.position(namespace) is not None, refresh=log.sync,
+                )
+    return _namespaces
+
+def get_ingestion_log():
+    """Return the log through which uploads reach every worker, opening it on first use."""
+    global _ingestion_log
+    if _ingestion_log is None:
+        with _init_lock:
+            if _ingestion_log is None:
+                _ingestion_log = IngestionLog(INGESTION_LOG_PATH)
+    return _ingestion_log
+
+def get_vector_store():
+    """
+    Return the application's vector store (the default namespace), building it on first use.
+
+    Documents uploaded through other workers since the last call are applied first.
+    """
+    global _vector_store
+    if _vector_store is None:
+        with _init_lock:
+            if _vector_store is None:
+                start_time = time.time()
+                _vector_store = get_namespaces().get(DEFAULT_NAMESPACE)
+                logger.info(f"Vector store ready in {time.time() - start_time:.2f}s")
+                return _vector_store
+    get_ingestion_log().sync(DEFAULT_NAMESPACE, _vector_store)
+    return _vector_store
+
+def check_namespace(namespace, create=False):
+    """
+    Validate a namespace named in a request.
+
+    Returns:
+        None if the namespace can be used, otherwise an error response: 400 for an
+        invalid name, 404 for a namespace that doesn't exist unless create is True.
+    """
+    try:
+        NamespaceRegistry.validate(namespace)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not create and namespace != DEFAULT_NAMESPACE and namespace not in get_namespaces():
+        return jsonify({"error": f"Unknown namespace: {namespace}"}), 404
+    return None
+
+def get_ingestion_queue():
+    """Return the background queue for ingesting uploaded PDFs, creating it on first use."""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        with _init_lock:
+            if _ingestion_queue is None:
+                extraction_workers = os.environ.get("PDF_EXTRACTION_WORKERS")
+                _ingestion_queue = IngestionQueue(
+                    get_ingestion_log(),
+                    max_workers=int(os.environ.get("INGEST_WORKERS", "1")),
+                    extraction_workers=int(extraction_workers) if extraction_workers else None,
+                    # Apply the chunks here right away; other workers apply them on their next request
+                    on_finished=lambda job: get_namespaces().get(job.namespace),
+                )
+    return _ingestion_queue
+
+def warm_up():
+    """
+    Do the work deferred from import: build the vector store and load the Groq SDK.
+
+    gunicorn.conf.py calls this in the master process when the app is
+    preloaded, so forked workers start with the store already built.
+    """
+    import groq  # noqa: F401
+
+    get_vector_store()
+
+def __getattr__(name):
+    # Keeps `from app import vector_store` and `app.ingestion_queue` working
+    if name == "vector_store":
+        return get_vector_store()
+    if name == "ingestion_queue":
+        return get_ingestion_queue()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_asset_manifest = None
+
+def asset_urls(bundle):
+    """
+    Return the URLs to load an asset bundle from, for use in templates.
+
+    Once the assets have been built with `python -m utils.assets`, this is
+    the single fingerprinted bundle; otherwise it is the bundle's source
+    files, so the app also runs without the build step.
+
+    Args:
+        bundle: A bundle name from utils.assets.BUNDLES, e.g. "chat.css".
+    """
+    global _asset_manifest
+    asset_dir = app.config["ASSET_DIR"]
+    if _asset_manifest is None or _asset_manifest[0] != asset_dir or app.debug:
+        _asset_manifest = (asset_dir, load_manifest(asset_dir))
+
+    filename = _asset_manifest[1].get(bundle)
+    if filename is not None:
+        return [url_for('assets', filename=filename)]
+    return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+app.add_template_global(asset_urls)
+
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    """Serve a built asset bundle, precompressed with brotli or gzip when the client accepts it."""
+    asset_dir = app.config["ASSET_DIR"]
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in request.accept_encodings and os.path.isfile(os.path.join(asset_dir, filename + suffix)):
+            response = send_from_directory(asset_dir, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(asset_dir, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/')
 def index():
@@ -36,17 +279,30 @@ def health_check():
     return jsonify({
         "status": "ok",
         "timestamp": time.time(),
-        "cache_size": len(response_cache)
+        "cache_size": len(response_cache),
+        "cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "groq_requests": groq_flight.stats(),
+        "groq_breaker": groq_breaker.stats(),
+        "namespaces": _namespaces.stats() if _namespaces is not None else None
     })
 
-@app.route('/chat-api', methods=['POST'])
+@app.route('/chat-api', methods=['GET', 'POST'])
 def chat_api():
-    """Process chat requests and return responses."""
+    """
+    Process chat requests and return responses.
+
+    Questions with a predefined answer can also be asked with GET
+    /chat-api?message=...; the answer is then sent with Cache-Control and an
+    ETag, so repeated questions are answered by the browser cache or with
+    304 Not Modified. Other questions get 404 from GET, so crawlers and link
+    prefetching can't trigger Groq calls.
+    """
     start_time = time.time()
 
     try:
         # Parse request data
-        data = request.json
+        data = request.args if request.method == 'GET' else request.json
         if data is None:
             return jsonify({"error": "Invalid JSON data"}), 400
 
@@ -55,20 +311,45 @@ def chat_api():
         if not user_message:
             return jsonify({"error": "Message is required"}), 400
 
+        namespace = data.get('namespace') or DEFAULT_NAMESPACE
+        error = check_namespace(namespace)
+        if error is not None:
+            return error
+
         # Log the incoming request
         logger.info(f"Chat request received: {user_message[:50]}{'...' if len(user_message) > 50 else ''}")
 
         # Get chat response
-        response = get_chat_response(user_message, vector_store)
+        if request.method == 'GET':
+            response = get_predefined_response(user_message) if namespace == DEFAULT_NAMESPACE else None
+            if response is None:
+                result = jsonify({"error": "No predefined answer to this question; ask it with POST /chat-api"})
+                result.cache_control.no_store = True
+                return result, 404
+        elif namespace == DEFAULT_NAMESPACE:
+            response = get_chat_response(user_message, get_vector_store())
+        else:
+            with get_namespaces().use(namespace) as store:
+                response = get_namespace_chat_response(user_message, store, namespace)
 
         # Calculate processing time
         processing_time = time.time() - start_time
         logger.info(f"Request processed in {processing_time:.2f}s")
 
-        return jsonify({
-            "response": response,
-            "processing_time": round(processing_time, 2)
-        })
+        with stage_seconds.time(stage="serialization"):
+            result = jsonify({
+                "response": response,
+                "processing_time": round(processing_time, 2)
+            })
+
+        if request.method == 'GET':
+            # Weak, as processing_time differs between otherwise equal responses
+            result.set_etag(hashlib.sha256(response.encode("utf-8")).hexdigest()[:32], weak=True)
+            result.cache_control.public = True
+            result.cache_control.max_age = PREDEFINED_ANSWER_MAX_AGE
+            result.make_conditional(request)
+        request_seconds.observe(time.time() - start_time, endpoint="/chat-api")
+        return result
 
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
@@ -77,13 +358,153 @@ def chat_api():
             "fallback_response": "I'm having trouble processing your request right now. Please try asking about Rubber Bumper's products, market position, or factory conversion options."
         }), 500
 
+@app.route('/chat-api/batch', methods=['POST'])
+def chat_api_batch():
+    """Answer a list of questions in one request, in input order."""
+    start_time = time.time()
+
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "Invalid JSON data"}), 400
+
+    messages = data.get('messages')
+    if not isinstance(messages, list) or not messages:
+        return jsonify({"error": "messages must be a non-empty list"}), 400
+    if not all(isinstance(message, str) for message in messages):
+        return jsonify({"error": "messages must be strings"}), 400
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return jsonify({"error": f"At most {BATCH_MAX_MESSAGES} messages are accepted per batch"}), 413
+
+    try:
+        logger.info(f"Batch chat request received: {len(messages)} messages")
+        results = get_chat_responses_batch(messages, get_vector_store())
+
+        processing_time = time.time() - start_time
+        logger.info(f"Batch processed in {processing_time:.2f}s")
+
+        with stage_seconds.time(stage="serialization"):
+            result = jsonify({
+                "results": results,
+                "count": len(results),
+                "processing_time": round(processing_time, 2)
+            })
+        request_seconds.observe(time.time() - start_time, endpoint="/chat-api/batch")
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in batch chat endpoint: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Error generating responses: {str(e)}"}), 500
+
+def format_sse(event, data):
+    """Format a Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/chat-api/stream', methods=['POST'])
+def chat_api_stream():
+    """Stream chat responses as Server-Sent Events while they are generated."""
+    start_time = time.time()
+
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "Invalid JSON data"}), 400
+
+    user_message = data.get('message', '').strip()
+    if not user_message:
+        return jsonify({"error": "Message is required"}), 400
+
+    logger.info(f"Streaming chat request received: {user_message[:50]}{'...' if len(user_message) > 50 else ''}")
+
+    def generate():
+        try:
+            for event, text in stream_chat_response(user_message, get_vector_store()):
+                if event == "token":
+                    yield format_sse("token", {"token": text})
+                else:
+                    processing_time = time.time() - start_time
+                    logger.info(f"Streaming request processed in {processing_time:.2f}s")
+                    yield format_sse("done", {
+                        "response": text,
+                        "processing_time": round(processing_time, 2)
+                    })
+                    request_seconds.observe(time.time() - start_time, endpoint="/chat-api/stream")
+        except Exception as e:
+            logger.error(f"Error in streaming chat endpoint: {str(e)}", exc_info=True)
+            yield format_sse("error", {
+                "error": f"Error generating response: {str(e)}",
+                "fallback_response": "I'm having trouble processing your request right now. Please try asking about Rubber Bumper's products, market position, or factory conversion options."
+            })
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    """Accept a PDF file and queue it for ingestion into the vector store of a namespace."""
+    try:
+        uploaded_file = request.files.get('file')
+        if uploaded_file is None or not uploaded_file.filename:
+            return jsonify({"error": "A PDF file is required"}), 400
+
+        if not uploaded_file.filename.lower().endswith('.pdf'):
+            return jsonify({"error": "Only PDF files are supported"}), 400
+
+        # Uploads to a new namespace create it
+        namespace = request.form.get('namespace') or DEFAULT_NAMESPACE
+        error = check_namespace(namespace, create=True)
+        if error is not None:
+            return error
+
+        # Save the upload so the job can read it after this request finishes
+        fd, path = tempfile.mkstemp(suffix='.pdf', prefix='upload-')
+        with os.fdopen(fd, 'wb') as f:
+            uploaded_file.save(f)
+
+        job = get_ingestion_queue().submit(uploaded_file.filename, path, namespace)
+
+        response = jsonify(dict(job.to_dict(), status_url=f"/upload/{job.id}"))
+        return response, 202
+    except Exception as e:
+        logger.error(f"Error in upload endpoint: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Error uploading file: {str(e)}"}), 500
+
+@app.route('/upload/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """Report the progress of a PDF ingestion job, which may run on another worker."""
+    job = get_ingestion_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job ID"}), 404
+
+    return jsonify(job.to_dict())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage latencies and answer path counts in Prometheus text format."""
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Route to reset the chat data
 @app.route('/clear', methods=['POST'])
 def clear_data():
-    """Clear chat history and reset the vector store."""
+    """Clear chat history and reset the vector store, or delete the namespace named in the body."""
     try:
-        # Reload the base Rubber Bumper data
-        vector_store.clear()
+        data = request.get_json(silent=True) or {}
+        namespace = data.get('namespace') if isinstance(data, dict) else None
+        if namespace and namespace != DEFAULT_NAMESPACE:
+            error = check_namespace(namespace)
+            if error is not None:
+                return error
+            get_namespaces().drop(namespace)
+            # Other workers forget the namespace, and its running upload jobs fail, once it leaves the log
+            get_ingestion_log().drop(namespace)
+            response_cache.delete_prefix(namespace_cache_key(namespace))
+            logger.info(f"Namespace {namespace} deleted")
+            return jsonify({"message": f"Namespace {namespace} deleted", "cache_size": len(response_cache)})
+
+        # Drop uploaded documents for every worker; each reloads the base Rubber Bumper data on its next request
+        get_ingestion_log().reset(DEFAULT_NAMESPACE)
+        if _vector_store is not None:
+            get_vector_store()
 
         # Clear session data
         if 'chat_history' in session:
@@ -91,6 +512,7 @@ def clear_data():
 
         # Clear response cache
         response_cache.clear()
+        semantic_cache.clear()
 
         logger.info("Chat history and cache cleared successfully")
         return jsonify({
@@ -0,0 +1,146 @@
+"""
+ASGI entry point for the Rubber Bumper chatbot.
+
+POST /chat-api is served natively on the event loop with the pooled async
+Groq client, so one process can hold hundreds of LLM calls in flight.
+Questions about other namespaces than the default one are answered on a
+worker thread. All other routes are delegated to the Flask app in app.py.
+
+Run with an async worker, for example:
+
+    gunicorn --bind 0.0.0.0:5000 -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import json
+import time
+import asyncio
+import logging
+from asgiref.wsgi import WsgiToAsgi
+from app import app as flask_app, get_vector_store, get_namespaces, request_seconds
+from utils.chat import (get_chat_response_async, get_namespace_chat_response, close_async_groq_client,
+                        stage_seconds)
+from utils.namespaces import DEFAULT_NAMESPACE, NamespaceRegistry
+
+logger = logging.getLogger(__name__)
+
+# Largest JSON body accepted by the async chat endpoint
+MAX_BODY_BYTES = 1024 * 1024
+
+FALLBACK_MESSAGE = "I'm having trouble processing your request right now. Please try asking about Rubber Bumper's products, market position, or factory conversion options."
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+async def app(scope, receive, send):
+    """Route /chat-api to the async handler and everything else to Flask."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/chat-api" and scope["method"] == "POST":
+        await chat_api(receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+async def lifespan(receive, send):
+    """
+    Handle server startup and shutdown.
+
+    The vector store is built on a thread before the server reports that it
+    has started, so the first requests neither wait for it nor stall the
+    event loop. The Groq connection pool is closed on exit.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await asyncio.to_thread(get_vector_store)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_groq_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def send_json(send, payload, status=200):
+    """Send a complete JSON response."""
+    with stage_seconds.time(stage="serialization"):
+        body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def read_body(receive):
+    """Read the request body, or return None if it exceeds MAX_BODY_BYTES."""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            return None
+        if not message.get("more_body"):
+            return body
+
+def answer_in_namespace(user_message, namespace):
+    """Answer a question from a namespace's store, keeping it loaded meanwhile."""
+    with get_namespaces().use(namespace) as store:
+        return get_namespace_chat_response(user_message, store, namespace)
+
+async def chat_api(receive, send):
+    """Process chat requests and return responses, awaiting the Groq call."""
+    start_time = time.time()
+
+    try:
+        body = await read_body(receive)
+        if body is None:
+            await send_json(send, {"error": "Request body too large"}, 413)
+            return
+
+        # Parse request data
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            await send_json(send, {"error": "Invalid JSON data"}, 400)
+            return
+
+        user_message = str(data.get('message', '')).strip()
+        if not user_message:
+            await send_json(send, {"error": "Message is required"}, 400)
+            return
+
+        namespace = data.get('namespace') or DEFAULT_NAMESPACE
+        try:
+            NamespaceRegistry.validate(namespace)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, 400)
+            return
+        if namespace != DEFAULT_NAMESPACE and namespace not in get_namespaces():
+            await send_json(send, {"error": f"Unknown namespace: {namespace}"}, 404)
+            return
+
+        # Log the incoming request
+        logger.info(f"Async chat request received: {user_message[:50]}{'...' if len(user_message) > 50 else ''}")
+
+        if namespace == DEFAULT_NAMESPACE:
+            # Building the store, or applying documents uploaded through other workers, blocks
+            vector_store = await asyncio.to_thread(get_vector_store)
+            response = await get_chat_response_async(user_message, vector_store)
+        else:
+            response = await asyncio.to_thread(answer_in_namespace, user_message, namespace)
+
+        # Calculate processing time
+        processing_time = time.time() - start_time
+        logger.info(f"Request processed in {processing_time:.2f}s")
+
+        await send_json(send, {
+            "response": response,
+            "processing_time": round(processing_time, 2)
+        })
+        request_seconds.observe(time.time() - start_time, endpoint="/chat-api")
+
+    except Exception as e:
+        logger.error(f"Error in async chat endpoint: {str(e)}", exc_info=True)
+        await send_json(send, {
+            "error": f"Error generating response: {str(e)}",
+            "fallback_response": FALLBACK_MESSAGE
+        }, 500)
@@ -0,0 +1,105 @@
+"""
+Benchmark text chunking throughput against the previous implementation.
+
+The previous chunker grew each chunk by string concatenation and rebuilt
+the overlap word by word from a split of the whole chunk. It is kept here
+as the baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chunking --megabytes 1 4
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.pdf_fixtures import make_text
+from utils.pdf_processor import split_sentences, split_text_into_chunks
+
+def legacy_iter_chunks(sentences, chunk_size=1000, overlap=200):
+    """The chunking loop split_text_into_chunks used before offset-based chunking."""
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
+            yield current_chunk.strip()
+            words = current_chunk.split()
+            overlap_text = ""
+            for word in reversed(words):
+                if len(overlap_text) + len(word) + 1 <= overlap:
+                    overlap_text = word + " " + overlap_text
+                else:
+                    break
+            current_chunk = overlap_text
+        current_chunk += " " + sentence
+    if current_chunk.strip():
+        yield current_chunk.strip()
+
+def punkt_available():
+    """Return whether NLTK's Punkt tokenizer data is installed."""
+    try:
+        split_sentences("Punkt check. Second sentence.", "punkt")
+        return True
+    except LookupError:
+        return False
+
+IMPLEMENTATIONS = [
+    # name, sentence splitter, function of the text
+    ("legacy", "punkt", lambda text: list(legacy_iter_chunks(split_sentences(text, "punkt")))),
+    ("legacy", "regex", lambda text: list(legacy_iter_chunks(split_sentences(text, "regex")))),
+    ("offsets-chars", "punkt", lambda text: split_text_into_chunks(text, splitter="punkt")),
+    ("offsets-chars", "regex", lambda text: split_text_into_chunks(text, splitter="regex")),
+    ("offsets-tokens", "regex", lambda text: split_text_into_chunks(text, 250, 50, splitter="regex", unit="tokens")),
+]
+
+def run(sizes_mb, repeat):
+    """
+    Chunk synthetic text of each size with every implementation.
+
+    Returns:
+        A list of result dicts, one per implementation and size.
+    """
+    has_punkt = punkt_available()
+    results = []
+    for size_mb in sizes_mb:
+        text = make_text(int(size_mb * 1024 * 1024))
+        for name, splitter, func in IMPLEMENTATIONS:
+            result = {"implementation": name, "splitter": splitter, "megabytes": size_mb}
+            if splitter == "punkt" and not has_punkt:
+                results.append(dict(result, skipped="NLTK punkt data is not installed"))
+                continue
+
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                chunks = func(text)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append(dict(result, seconds=round(best, 4), chunks=len(chunks),
+                                mb_per_s=round(len(text) / 1024 / 1024 / best, 2)))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4], help="Text sizes to chunk")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration; the best is reported")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(sorted(set(args.megabytes)), args.repeat)
+
+    print(f"{'implementation':<16}{'splitter':<10}{'MB':>6}{'seconds':>10}{'chunks':>8}{'MB/s':>8}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['implementation']:<16}{result['splitter']:<10}{result['megabytes']:>6g}  "
+                  f"skipped: {result['skipped']}")
+            continue
+        print(f"{result['implementation']:<16}{result['splitter']:<10}{result['megabytes']:>6g}"
+              f"{result['seconds']:>10.3f}{result['chunks']:>8}{result['mb_per_s']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
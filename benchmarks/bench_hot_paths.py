@@ -0,0 +1,258 @@
+"""
+Microbenchmarks for the chat, retrieval and chunking hot paths.
+
+Runs offline: Groq calls are answered by an in-process stub. Results can be
+written as JSON and compared against a previous run to spot regressions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_hot_paths --json before.json
+    python -m benchmarks.bench_hot_paths --compare before.json
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import nltk
+
+from benchmarks.pdf_fixtures import WORDS, make_text
+from utils import chat
+from utils.pdf_processor import split_text_into_chunks
+from utils.vector_store import VectorStore
+
+QUERIES = [
+    "what is the payback period of the factory conversion",
+    "how fast is the condom market growing",
+    "rubber band profit margin and overhead",
+    "who are the competitors in the rubber band market",
+    "should the president convert the rubber band plant",
+    "what are the risks of converting the factory",
+    "how much revenue do condoms bring in",
+    "market share of max rubber",
+]
+
+class StubGroqClient:
+    """Stand-in for the Groq client that answers immediately with a fixed completion."""
+
+    def __init__(self, answer="Converting the rubber band plant pays back within the four-year target."):
+        message = SimpleNamespace(content=answer)
+        self._response = SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return self._response
+
+def make_documents(count, seed=0):
+    """Return count synthetic paragraphs of case-study vocabulary."""
+    rng = random.Random(seed)
+    return [
+        " ".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))) + "." for _ in range(rng.randint(3, 8)))
+        for _ in range(count)
+    ]
+
+def make_store(size, incremental=True, backend="tfidf"):
+    """Return a vector store with the case study plus synthetic documents, size documents in total."""
+    store = VectorStore(incremental=incremental, backend=backend)
+    extra = size - len(store)
+    if extra > 0:
+        store.add_documents(make_documents(extra, seed=size))
+    store.search("warm up")
+    return store
+
+def measure(func, min_time=0.5, min_iterations=5, max_iterations=100000):
+    """
+    Call func repeatedly for at least min_time seconds and summarize the timings.
+
+    Returns:
+        A dict with the iteration count and mean, median, p95 and minimum in milliseconds.
+    """
+    func()
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_iterations and (len(samples) < min_iterations or time.perf_counter() - start < min_time):
+        call_start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_start)
+
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 4),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 4),
+        "min_ms": round(samples[0] * 1000, 4),
+    }
+
+def bench_direct_response(min_time):
+    """get_direct_response on cache hits, intent matches and misses."""
+    chat.response_cache.clear()
+    chat.get_direct_response("what products")
+    misses = itertools.cycle(f"tell me something unrelated number {i}" for i in range(1000))
+
+    yield "direct_response", {"case": "cache_hit"}, measure(lambda: chat.get_direct_response("what products"), min_time)
+    yield "direct_response", {"case": "intent_match"}, measure(
+        lambda: chat.match_direct_response("how is the condom market growing these days"), min_time)
+    yield "direct_response", {"case": "miss"}, measure(lambda: chat.get_direct_response(next(misses)), min_time)
+
+def bench_vector_store(sizes, min_time):
+    """VectorStore.search and add_documents at each corpus size, in each indexing mode."""
+    batch = make_documents(64, seed=-1)
+    for size in sizes:
+        for mode in ("incremental", "tfidf", "bm25"):
+            incremental = mode != "tfidf"
+            store = make_store(size, incremental=incremental, backend="bm25" if mode == "bm25" else "tfidf")
+            queries = itertools.cycle(QUERIES)
+            yield "vector_store_search", {"documents": size, "mode": mode}, measure(
+                lambda: store.search(next(queries)), min_time)
+
+            # Refitting TF-IDF on every add is what incremental mode avoids; skip it on large corpora
+            if incremental or size <= 10000:
+                ids = itertools.count()
+
+                def add_batch():
+                    start_id = next(ids) * len(batch)
+                    store.add_documents(batch, ids=[f"bench-{start_id + i}" for i in range(len(batch))])
+                    store.search(QUERIES[0])
+
+                yield "vector_store_add_documents", {"documents": size, "mode": mode, "batch": len(batch)}, measure(
+                    add_batch, min_time, max_iterations=20)
+
+def bench_chunking(text_mb, min_time):
+    """split_text_into_chunks on multi-megabyte text, with each sentence splitter."""
+    text = make_text(int(text_mb * 1024 * 1024))
+    for splitter in ("punkt", "regex"):
+        params = {"megabytes": text_mb, "splitter": splitter}
+        if splitter == "punkt":
+            try:
+                nltk.sent_tokenize("Punkt check. Second sentence.")
+            except LookupError:
+                yield "split_text_into_chunks", params, {"skipped": "NLTK punkt data is not installed"}
+                continue
+
+        result = measure(lambda: split_text_into_chunks(text, splitter=splitter), min_time, min_iterations=3)
+        result["mb_per_s"] = round(len(text) / 1024 / 1024 / (result["mean_ms"] / 1000), 2)
+        yield "split_text_into_chunks", params, result
+
+def bench_chat_api(min_time):
+    """End-to-end POST /chat-api through Flask's test client with the stubbed Groq client."""
+    from app import app
+
+    client = app.test_client()
+    questions = (f"how will tariffs affect the rubber business in year {i}" for i in itertools.count())
+
+    with mock.patch.object(chat, "groq_client", StubGroqClient()):
+        yield "chat_api", {"path": "cache"}, measure(
+            lambda: client.post("/chat-api", json={"message": "what products"}), min_time)
+        yield "chat_api", {"path": "llm"}, measure(
+            lambda: client.post("/chat-api", json={"message": next(questions)}), min_time)
+
+def run(sizes, text_mb, min_time):
+    """
+    Run every benchmark.
+
+    Returns:
+        A list of result dicts with the benchmark name, its parameters and timings.
+    """
+    benchmarks = itertools.chain(
+        bench_direct_response(min_time),
+        bench_vector_store(sizes, min_time),
+        bench_chunking(text_mb, min_time),
+        bench_chat_api(min_time),
+    )
+    results = []
+    for name, params, timings in benchmarks:
+        result = {"name": name, "params": params, **timings}
+        results.append(result)
+        print(f"{result_key(result):<72}{describe(result)}", flush=True)
+    return results
+
+def result_key(result):
+    """Identify a result across runs by its name and parameters."""
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+def describe(result):
+    """Format a result as one line of the printed table."""
+    if "skipped" in result:
+        return f"skipped: {result['skipped']}"
+    return f"{result['p50_ms']:>10.3f} ms p50 {result['p95_ms']:>10.3f} ms p95 {result['iterations']:>8} runs"
+
+def environment():
+    """Describe the commit and machine the results were measured on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Print the change in median time of each benchmark against a previous run.
+
+    Medians are compared rather than means so a few slow outliers (GC pauses,
+    a busy machine) don't read as regressions.
+
+    Returns:
+        The keys of benchmarks that got slower by more than the threshold ratio.
+    """
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'}:")
+    for result in results:
+        key = result_key(result)
+        before = previous.get(key)
+        if before is None or "p50_ms" not in before or "p50_ms" not in result:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<72}{before['p50_ms']:>10.3f} -> {result['p50_ms']:>10.3f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", help="Vector store corpus sizes (default: 12 1000 10000 100000)")
+    parser.add_argument("--text-mb", type=float, default=2.0, help="Size of the chunking input in megabytes")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent timing each benchmark")
+    parser.add_argument("--quick", action="store_true", help="Small corpora and short timings, for a smoke run")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.sizes, args.text_mb, args.min_time = args.sizes or [12, 1000], 0.25, 0.1
+    args.sizes = args.sizes or [12, 1000, 10000, 100000]
+
+    results = run(sorted(set(args.sizes)), args.text_mb, args.min_time)
+    report = {"environment": environment(), "results": results}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark sequential vs. multi-process PDF page extraction.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_extraction --pages 300 --workers 2 4 8
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+
+from benchmarks.pdf_fixtures import make_pdf
+from utils.pdf_processor import iter_clean_pages, iter_clean_pages_parallel, iter_pdf_pages
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of func() over repeat runs, and its last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(pages, workers_list, repeat):
+    """
+    Extract the same synthetic PDF sequentially and with each worker count.
+
+    Returns:
+        A list of result dicts, one per configuration.
+    """
+    data = make_pdf(pages)
+
+    sequential_time, expected = time_call(
+        lambda: list(iter_clean_pages(iter_pdf_pages(io.BytesIO(data)))), repeat
+    )
+    results = [{"mode": "sequential", "workers": 1, "pages": pages,
+                "seconds": round(sequential_time, 4), "speedup": 1.0}]
+
+    for workers in workers_list:
+        elapsed, pages_text = time_call(
+            lambda: list(iter_clean_pages_parallel(io.BytesIO(data), workers=workers)), repeat
+        )
+        if pages_text != expected:
+            raise AssertionError(f"Parallel extraction with {workers} workers returned different text")
+        results.append({"mode": "parallel", "workers": workers, "pages": pages,
+                        "seconds": round(elapsed, 4), "speedup": round(sequential_time / elapsed, 2)})
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="Number of pages in the synthetic PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1],
+                        help="Worker counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration; the best is reported")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(args.pages, sorted(set(args.workers)), args.repeat)
+
+    print(f"{'mode':<12}{'workers':>8}{'seconds':>10}{'speedup':>9}")
+    for result in results:
+        print(f"{result['mode']:<12}{result['workers']:>8}{result['seconds']:>10.3f}{result['speedup']:>8.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
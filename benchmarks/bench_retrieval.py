@@ -0,0 +1,109 @@
+"""
+Benchmark the retrieval backends against TF-IDF search.
+
+For each corpus size this reports the median query latency and index size
+per document of the incremental TF-IDF store, BM25 with and without early
+termination, and dense search over quantized latent vectors with and without
+a cluster pre-filter, plus how many of TF-IDF's top-k documents each backend
+also returns.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_retrieval --sizes 1000 10000 100000
+"""
+
+import argparse
+import itertools
+import json
+import math
+
+from benchmarks.bench_hot_paths import QUERIES, make_documents, measure
+from utils.vector_store import VectorStore
+
+def make_stores(size, dimensions=128):
+    """Return stores of every backend over the same case study plus synthetic documents."""
+    clusters = max(1, int(math.sqrt(size)))
+    stores = {
+        "tfidf": VectorStore(incremental=True),
+        "bm25": VectorStore(backend="bm25"),
+        "dense-int8": VectorStore(incremental=True, backend="dense", dimensions=dimensions),
+        "dense-float16": VectorStore(incremental=True, backend="dense", dimensions=dimensions,
+                                     quantization="float16"),
+        f"dense-int8-ivf{clusters}": VectorStore(incremental=True, backend="dense", dimensions=dimensions,
+                                                 clusters=clusters),
+    }
+    documents = make_documents(max(0, size - len(stores["tfidf"])), seed=size)
+    for store in stores.values():
+        if documents:
+            store.add_documents(documents)
+        store.search("warm up")
+    return stores
+
+def index_bytes(store):
+    """Return the memory held by a store's search structures, excluding document texts."""
+    if store.backend == "dense":
+        return store._dense.nbytes
+    if store.backend == "bm25":
+        return None
+    vectors = store.vectors
+    return vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes
+
+def run(sizes, top_k, min_time, dimensions):
+    """
+    Time every backend at each corpus size.
+
+    Returns:
+        A list of result dicts, one per backend and corpus size.
+    """
+    results = []
+    for size in sizes:
+        stores = make_stores(size, dimensions)
+        searches = {name: store.search for name, store in stores.items()}
+        bm25 = stores["bm25"]._bm25
+        searches["bm25-exhaustive"] = lambda query, top_k: bm25.search(query, top_k, exhaustive=True)
+
+        expected = {query: {doc for doc, _ in stores["tfidf"].search_many([query], top_k, threshold=0.0)[0]}
+                    for query in QUERIES}
+
+        for name, search in searches.items():
+            queries = itertools.cycle(QUERIES)
+            result = {"documents": size, "backend": name, "top_k": top_k}
+            result["p50_ms"] = measure(lambda: search(next(queries), top_k), min_time)["p50_ms"]
+
+            store = stores.get(name)
+            nbytes = index_bytes(store) if store is not None else None
+            result["bytes_per_document"] = round(nbytes / size, 1) if nbytes is not None else None
+
+            # Share of TF-IDF's top-k the backend also returns
+            if store is not None:
+                shared = sum(len(expected[query] & {doc for doc, _ in store.search_many([query], top_k, 0.0)[0]})
+                             for query in QUERIES)
+                total = sum(len(documents) for documents in expected.values())
+                result["overlap"] = round(shared / total, 3) if total else None
+            results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Corpus sizes")
+    parser.add_argument("--top-k", type=int, default=3, help="Documents returned per query")
+    parser.add_argument("--dimensions", type=int, default=128, help="Latent dimensions of the dense backends")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent timing each backend")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    print(f"{'documents':>10}  {'backend':<24}{'p50 ms':>10}{'bytes/doc':>12}{'overlap':>10}")
+    results = run(sorted(set(args.sizes)), args.top_k, args.min_time, args.dimensions)
+    for result in results:
+        bytes_per_document = result["bytes_per_document"]
+        overlap = result.get("overlap")
+        print(f"{result['documents']:>10}  {result['backend']:<24}{result['p50_ms']:>10.3f}"
+              f"{bytes_per_document if bytes_per_document is not None else '-':>12}"
+              f"{overlap if overlap is not None else '-':>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark semantic cache lookups as the number of cached questions grows.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_semantic_cache --sizes 1000 10000 50000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks.pdf_fixtures import WORDS
+from utils.semantic_cache import SemanticCache
+
+QUESTION_STARTS = ["what is the", "how does the", "why did the", "should rubber bumper change the", "what drives"]
+
+def make_questions(count, seed=0):
+    """Return count distinct synthetic questions."""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(QUESTION_STARTS)} {' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8)))} item{i}"
+        for i in range(count)
+    ]
+
+def run(sizes, lookups, seed=0):
+    """
+    Fill a cache with each number of questions, then time mixed lookups and additions.
+
+    Returns:
+        A list of result dicts, one per cache size.
+    """
+    results = []
+    for size in sizes:
+        questions = make_questions(size + lookups, seed)
+        cache = SemanticCache(max_entries=size + lookups)
+
+        start = time.perf_counter()
+        for question in questions[:size]:
+            cache.add(question, question)
+        fill_time = time.perf_counter() - start
+
+        # Interleave lookups of reworded old questions with new questions, like live traffic
+        rng = random.Random(seed)
+        timings = []
+        hits = 0
+        for new_question in questions[size:]:
+            words = rng.choice(questions[:size]).split()
+            rng.shuffle(words)
+            start = time.perf_counter()
+            hits += cache.lookup(" ".join(words) + "?") is not None
+            if cache.lookup(new_question) is None:
+                cache.add(new_question, new_question)
+            timings.append(time.perf_counter() - start)
+
+        timings.sort()
+        results.append({
+            "questions": size,
+            "fill_seconds": round(fill_time, 3),
+            "request_ms_p50": round(timings[len(timings) // 2] * 1000, 3),
+            "request_ms_p99": round(timings[int(len(timings) * 0.99)] * 1000, 3),
+            "hit_rate": round(hits / lookups, 3),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="Numbers of cached questions to benchmark")
+    parser.add_argument("--lookups", type=int, default=500, help="Lookups timed per size")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(sorted(set(args.sizes)), args.lookups)
+
+    print(f"{'questions':>10}{'fill s':>9}{'p50 ms':>9}{'p99 ms':>9}{'hit rate':>10}")
+    for result in results:
+        print(f"{result['questions']:>10}{result['fill_seconds']:>9.2f}{result['request_ms_p50']:>9.2f}"
+              f"{result['request_ms_p99']:>9.2f}{result['hit_rate']:>10.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+class FakeGroqServer:
+    """
+    Local HTTP server that mimics the Groq chat completions API.
+
+    Point a Groq or AsyncGroq client at it with base_url=server.url (or the
+    GROQ_BASE_URL environment variable) to exercise the LLM path offline.
+    Responses can be delayed by a fixed or random latency and can fail at a
+    configurable rate.
+    """
+
+    def __init__(self, answer=None, latency=0.0, error_rate=0.0, host="127.0.0.1", port=0, seed=None):
+        """
+        Initialize the server. Call start() or use it as a context manager.
+
+        Args:
+            answer: Answer text, or a callable taking the user message and returning it.
+            latency: Seconds to wait before answering, or a callable returning seconds.
+            error_rate: Fraction of requests answered with HTTP 500.
+            host: Interface to listen on.
+            port: Port to listen on; 0 picks a free port.
+            seed: Seed for the random error generator.
+        """
+        self.answer = answer or (lambda message: f"Rubber Bumper Co answer to: {message}")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(_CompletionsHandler):
+            fake = server
+
+        self._httpd = _Server((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to pass to the Groq client."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _next_latency(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def _answer_for(self, message):
+        return self.answer(message) if callable(self.answer) else self.answer
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 refuses bursts of concurrent connections,
+    # which clients that don't retry report as connection errors
+    request_queue_size = 1024
+
+class _CompletionsHandler(BaseHTTPRequestHandler):
+    """Request handler for POST /openai/v1/chat/completions."""
+
+    protocol_version = "HTTP/1.1"
+    fake = None
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        time.sleep(self.fake._next_latency())
+
+        if self.fake._should_fail():
+            self._send_json(500, {"error": {"message": "Simulated upstream failure", "type": "internal_server_error"}})
+            return
+
+        user_messages = [m.get("content", "") for m in request.get("messages", []) if m.get("role") == "user"]
+        answer = self.fake._answer_for(user_messages[-1] if user_messages else "")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "fake-model")
+        created = int(time.time())
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(answer.split()), "total_tokens": len(answer.split())},
+            })
+            return
+
+        # Stream the answer word by word as Server-Sent Events
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+        self.close_connection = True
@@ -0,0 +1,303 @@
+"""
+Load test /chat-api under different gunicorn worker models.
+
+Starts a local fake Groq server with a log-normal latency distribution and a
+configurable error rate, then for each worker model starts the application,
+sends a mix of cached, direct-match and LLM-bound questions at a fixed rate
+and reports throughput, latency percentiles and errors.
+
+Requests are sent on a fixed schedule whether or not earlier ones have
+finished, and latency is measured from the scheduled send time, so a
+saturated server shows up as growing latency rather than a lower send rate.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --rate 50 --duration 30 --configs sync:4 gthread:4x16 uvicorn:2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_groq import FakeGroqServer
+
+# Repeated questions, answered from the response cache after their first request
+CACHED_QUESTIONS = [
+    "what products do you make",
+    "tell me about the company",
+    "who are the competitors",
+    "what is the market share",
+    "how big is the condom market",
+]
+
+# Direct-match questions made unique so they skip the response cache
+DIRECT_TEMPLATES = [
+    "what products does rubber bumper sell, question {n}",
+    "tell me about the factory conversion {n}",
+    "who are your competitors in {n}",
+]
+
+# Questions no canned answer matches; the number keeps the semantic cache from reusing answers
+LLM_TEMPLATES = [
+    "how will tariffs affect the rubber business in year {n}",
+    "could latex supply shortages hurt margins by {n} percent",
+    "is it wise to hire {n} more sales staff",
+]
+
+ANSWER_PATH_PATTERN = re.compile(r'^chatbot_answers_total\{path="(\w+)"\} (\S+)$', re.MULTILINE)
+
+WORKER_MODELS = {
+    # name: (arguments for a "<name>:<workers>[x<threads>]" config, application)
+    "sync": (lambda workers, threads: ["-w", str(workers)], "main:app"),
+    "gthread": (lambda workers, threads: ["-w", str(workers), "-k", "gthread", "--threads", str(threads or 8)], "main:app"),
+    "uvicorn": (lambda workers, threads: ["-w", str(workers), "-k", "uvicorn.workers.UvicornWorker"], "asgi:app"),
+}
+
+def lognormal_latency(median, p99, seed=None):
+    """
+    Return a function drawing log-normally distributed latencies.
+
+    Args:
+        median: Median latency in seconds.
+        p99: 99th percentile latency in seconds.
+        seed: Seed for the random generator.
+    """
+    rng = random.Random(seed)
+    sigma = math.log(p99 / median) / 2.326 if p99 > median else 0.0
+    return lambda: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+def parse_mix(text):
+    """Parse "cache=0.5,direct=0.2,llm=0.3" into normalized weights."""
+    weights = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("cache", "direct", "llm"):
+            raise argparse.ArgumentTypeError(f"Unknown question kind {kind!r}; use cache, direct or llm")
+        weights[kind.strip()] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("Mix weights must add up to more than zero")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+def parse_config(text):
+    """Parse "gthread:4x16" into (model, workers, threads)."""
+    model, _, size = text.partition(":")
+    if model not in WORKER_MODELS:
+        raise argparse.ArgumentTypeError(f"Unknown worker model {model!r}; use one of {', '.join(WORKER_MODELS)}")
+    workers, _, threads = (size or "1").partition("x")
+    return model, int(workers), int(threads) if threads else None
+
+def make_requests(count, mix, seed=0):
+    """Return count (kind, question) pairs drawn from the mix."""
+    rng = random.Random(seed)
+    kinds = list(mix)
+    requests = []
+    for n in range(count):
+        kind = rng.choices(kinds, weights=[mix[k] for k in kinds])[0]
+        if kind == "cache":
+            question = rng.choice(CACHED_QUESTIONS)
+        elif kind == "direct":
+            question = rng.choice(DIRECT_TEMPLATES).format(n=n)
+        else:
+            question = rng.choice(LLM_TEMPLATES).format(n=n)
+        requests.append((kind, question))
+    return requests
+
+def free_port():
+    """Return a TCP port that is currently free on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(config, groq_url, metrics_dir, startup_timeout=120):
+    """
+    Start gunicorn with the given worker model and wait until it answers /health.
+
+    Returns:
+        The gunicorn process and the application's base URL.
+    """
+    model, workers, threads = config
+    arguments, application = WORKER_MODELS[model]
+    port = free_port()
+    env = dict(
+        os.environ,
+        GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "load-test"),
+        GROQ_BASE_URL=groq_url,
+        METRICS_DIR=metrics_dir,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+         *arguments(workers, threads), application],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not answer /health within {startup_timeout} seconds")
+
+def stop_app(process):
+    """Stop gunicorn, killing it if it doesn't exit in time."""
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def drive(url, requests, rate, timeout, max_connections):
+    """
+    Send the requests at a fixed rate.
+
+    Returns:
+        A list of (kind, latency in seconds, outcome) tuples, where outcome is
+        "ok", an HTTP status code or an exception class name.
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    results = []
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def send(kind, question, scheduled):
+            try:
+                response = await client.post("/chat-api", json={"message": question})
+                outcome = "ok" if response.status_code == 200 else str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            results.append((kind, time.perf_counter() - scheduled, outcome))
+
+        start = time.perf_counter()
+        tasks = []
+        for i, (kind, question) in enumerate(requests):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(kind, question, scheduled)))
+        await asyncio.gather(*tasks)
+
+    return results
+
+def percentile(sorted_values, fraction):
+    """Return the value at the given fraction of an ascending list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def summarize(latencies):
+    """Return latency percentiles in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        f"p{int(fraction * 100)}_ms": round(percentile(latencies, fraction) * 1000, 1) if latencies else None
+        for fraction in (0.5, 0.95, 0.99)
+    }
+
+def answer_paths(url):
+    """Read the answer path counters from the application's /metrics endpoint."""
+    try:
+        text = httpx.get(f"{url}/metrics", timeout=10).text
+    except httpx.HTTPError:
+        return {}
+    return {path: int(float(value)) for path, value in ANSWER_PATH_PATTERN.findall(text)}
+
+def run_config(config, groq_url, requests, args):
+    """Load test one worker model and return its result dict."""
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        process, url = start_app(config, groq_url, metrics_dir)
+        try:
+            start = time.perf_counter()
+            results = asyncio.run(drive(url, requests, args.rate, args.timeout, args.max_connections))
+            elapsed = time.perf_counter() - start
+            # Workers write metric snapshots at most once a second
+            time.sleep(1.5)
+            paths = answer_paths(url)
+        finally:
+            stop_app(process)
+
+    model, workers, threads = config
+    ok = [latency for _, latency, outcome in results if outcome == "ok"]
+    errors = {}
+    for _, _, outcome in results:
+        if outcome != "ok":
+            errors[outcome] = errors.get(outcome, 0) + 1
+
+    return {
+        "config": f"{model}:{workers}" + (f"x{threads}" if threads else ""),
+        "model": model,
+        "workers": workers,
+        "threads": threads,
+        "target_rps": args.rate,
+        "requests": len(results),
+        "throughput_rps": round(len(ok) / elapsed, 1),
+        **summarize(ok),
+        "by_kind": {
+            kind: {"requests": sum(1 for k, _, _ in results if k == kind),
+                   **summarize([latency for k, latency, outcome in results if k == kind and outcome == "ok"])}
+            for kind in sorted({kind for kind, _, _ in results})
+        },
+        "errors": errors,
+        "answer_paths": paths,
+    }
+
+def format_row(result):
+    """Format a result as one line of the printed table."""
+    latencies = "".join(f"{result[key] if result[key] is not None else float('nan'):>10.1f}"
+                        for key in ("p50_ms", "p95_ms", "p99_ms"))
+    return (f"{result['config']:<16}{result['target_rps']:>8.1f}{result['throughput_rps']:>8.1f}{latencies}"
+            f"{sum(result['errors'].values()):>8}{result['answer_paths'].get('fallback', 0):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--configs", type=parse_config, nargs="+",
+                        default=[parse_config(c) for c in ("sync:4", "gthread:4x16", "uvicorn:2")],
+                        help="Worker models as <sync|gthread|uvicorn>:<workers>[x<threads>]")
+    parser.add_argument("--rate", type=float, default=20, help="Requests per second to send")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to send requests for, per config")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("cache=0.5,direct=0.2,llm=0.3"),
+                        help="Relative shares of cached, direct-match and LLM-bound questions")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Median fake Groq latency")
+    parser.add_argument("--latency-p99-ms", type=float, default=3000, help="99th percentile fake Groq latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake Groq calls that fail")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request in seconds")
+    parser.add_argument("--max-connections", type=int, default=1000, help="Maximum concurrent client connections")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the question mix and fake Groq server")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    requests = make_requests(int(args.rate * args.duration), args.mix, args.seed)
+    latency = lognormal_latency(args.latency_ms / 1000, args.latency_p99_ms / 1000, args.seed)
+
+    print(f"{'config':<16}{'target':>8}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'fallback':>10}")
+    results = []
+    with FakeGroqServer(latency=latency, error_rate=args.error_rate, seed=args.seed) as groq:
+        for config in args.configs:
+            result = run_config(config, groq.url, requests, args)
+            results.append(result)
+            print(format_row(result), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Synthetic PDF documents and text for benchmarks.
+
+Builds minimal, valid PDF files with a text content stream per page, so
+extraction can be benchmarked without shipping large binary fixtures.
+"""
+
+import random
+
+WORDS = (
+    "rubber bumper factory condom market profit margin payback conversion risk growth "
+    "sales overhead revenue competitor plant capacity demand recommendation president"
+).split()
+
+def make_text(size_bytes, seed=0):
+    """Return roughly size_bytes of synthetic prose."""
+    rng = random.Random(seed)
+    sentences = []
+    total = 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 20))).capitalize() + "."
+        sentences.append(sentence)
+        total += len(sentence) + 1
+    return " ".join(sentences)
+
+def make_pdf(page_count, sentences_per_page=40, seed=0):
+    """
+    Build a PDF document with random sentences on each page.
+
+    Args:
+        page_count: Number of pages.
+        sentences_per_page: Number of sentences written on each page.
+        seed: Seed for the random sentence generator.
+
+    Returns:
+        The PDF file as bytes.
+    """
+    rng = random.Random(seed)
+
+    # Object 1 is the catalog, 2 the page tree, 3 the font, then a page and its content per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count)), page_count
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    for page_num in range(page_count):
+        lines = []
+        for _ in range(sentences_per_page):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(4, 14))]
+            lines.append(" ".join(words).capitalize() + ".")
+
+        content = ("BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) '" for line in lines) + " ET").encode()
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>".format(5 + 2 * page_num).encode()
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    return bytes(output)
@@ -0,0 +1,120 @@
+"""
+Report the cold start cost of the application: import time per package and
+the time to answer the first request.
+
+Each measurement runs in a fresh interpreter. With --budget-ms the command
+exits with status 1 if importing the app takes longer, so it can guard
+cold start in CI.
+
+Run from the repository root:
+
+    python -m benchmarks.startup_time --module app --budget-ms 500
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+FIRST_REQUEST_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from app import app
+response = app.test_client().post("/chat-api", json={{"message": "what products"}})
+assert response.status_code == 200, response.status_code
+print(json.dumps({{"import_ms": (imported - start) * 1000, "first_request_ms": (time.perf_counter() - imported) * 1000}}))
+"""
+
+def parse_import_times(stderr):
+    """
+    Parse the output of python -X importtime.
+
+    Returns:
+        A list of (module, self microseconds, cumulative microseconds, depth) tuples, in import order.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+def measure_imports(module):
+    """Import module in a fresh interpreter and return its parsed import times."""
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, check=True)
+    return parse_import_times(process.stderr)
+
+def measure_first_request(module):
+    """Import module and answer one /chat-api request in a fresh interpreter."""
+    process = subprocess.run([sys.executable, "-c", FIRST_REQUEST_SCRIPT.format(module=module)],
+                             capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def run(module, repeat):
+    """
+    Measure cold start repeat times and keep the fastest run.
+
+    Returns:
+        A result dict with the total import time, the import time of each
+        top-level package and the time to answer the first request.
+    """
+    best = None
+    for _ in range(repeat):
+        modules = measure_imports(module)
+        total_us = next(cumulative for name, _, cumulative, _ in reversed(modules) if name == module)
+        if best is None or total_us < best[0]:
+            best = (total_us, modules)
+    total_us, modules = best
+
+    # Attribute each module's own import time to its top-level package
+    packages = {}
+    for name, self_us, _, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    first_request = min((measure_first_request(module) for _ in range(repeat)),
+                        key=lambda r: r["import_ms"] + r["first_request_ms"])
+
+    return {
+        "module": module,
+        "import_ms": round(total_us / 1000, 1),
+        "first_request_ms": round(first_request["first_request_ms"], 1),
+        "modules_imported": len(modules),
+        "packages": {package: round(us / 1000, 1)
+                     for package, us in sorted(packages.items(), key=lambda item: -item[1])},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app", help="Module to import, e.g. app, main or asgi")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages listed")
+    parser.add_argument("--budget-ms", type=float, help="Fail if importing the module takes longer")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    result = run(args.module, args.repeat)
+
+    print(f"import {result['module']}: {result['import_ms']:.1f} ms ({result['modules_imported']} modules)")
+    print(f"first /chat-api request: {result['first_request_ms']:.1f} ms")
+    print(f"\n{'package':<32}{'ms':>10}")
+    for package, ms in list(result["packages"].items())[:args.top]:
+        print(f"{package:<32}{ms:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.budget_ms is not None and result["import_ms"] > args.budget_ms:
+        print(f"\nImport time {result['import_ms']:.1f} ms exceeds the budget of {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
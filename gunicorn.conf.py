@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for the Rubber Bumper chatbot, read automatically when
+gunicorn is started from the repository root.
+
+Importing the app is cheap: the vector store is built and the Groq SDK is
+loaded on the first request. Start gunicorn with --preload to do that work
+once in the master process instead, before the workers are forked:
+
+    gunicorn --bind 0.0.0.0:5000 --preload -w 4 main:app
+"""
+
+def when_ready(server):
+    """Warm up the preloaded app before any worker is forked."""
+    if server.cfg.preload_app:
+        from app import warm_up
+        warm_up()
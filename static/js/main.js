@@ -516,10 +516,23 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 50);
 
         // Add to history
-        chatHistory.push({ role, content, timestamp });
+        const historyEntry = { role, content, timestamp };
+        chatHistory.push(historyEntry);
 
         // Scroll to bottom
         scrollToBottom();
+
+        return { row: messageRow, entry: historyEntry };
+    }
+
+    // Function to replace the content of a message that is still being streamed
+    function updateMessage(message, content) {
+        const paragraph = message.row.querySelector('.message-bubble p');
+        if (paragraph) {
+            paragraph.innerHTML = formatMessage(content);
+        }
+        message.entry.content = content;
+        scrollToBottom();
     }
 
     // Function to format message content (with markdown-like features)
@@ -584,8 +597,115 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // Function to fetch chat response from backend
+    // Function to fetch a streamed chat response, rendering tokens as they arrive
     function fetchChatResponse(message) {
+        // Fall back to a single JSON response where streaming isn't supported
+        if (!window.ReadableStream || !window.TextDecoder) {
+            fetchChatResponseOnce(message);
+            return;
+        }
+
+        // Start request time
+        const requestStartTime = new Date();
+        let botMessage = null;
+        let text = '';
+
+        function showText(content) {
+            if (!botMessage) {
+                removeTypingIndicator();
+                botMessage = addMessageToChat('bot', content);
+            } else {
+                updateMessage(botMessage, content);
+            }
+        }
+
+        function handleEvent(rawEvent) {
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    eventName = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+            if (!data) {
+                return;
+            }
+
+            const payload = JSON.parse(data);
+            if (eventName === 'token') {
+                text += payload.token;
+                showText(text);
+            } else if (eventName === 'done') {
+                showText(payload.response);
+
+                // Calculate response time
+                const responseTime = (new Date() - requestStartTime) / 1000;
+                console.log(`Response received in ${responseTime.toFixed(2)}s`);
+                if (payload.processing_time) {
+                    console.log(`Server processing time: ${payload.processing_time}s`);
+                }
+            } else if (eventName === 'error') {
+                showText(payload.fallback_response || `Error: ${payload.error}`);
+            }
+        }
+
+        fetch('/chat-api/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ message })
+        })
+        .then(response => {
+            if (!response.ok || !response.body) {
+                throw new Error('Network response was not ok');
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            function read() {
+                return reader.read().then(({ done, value }) => {
+                    if (done) {
+                        return;
+                    }
+                    buffer += decoder.decode(value, { stream: true });
+
+                    // Events are separated by a blank line
+                    let boundary;
+                    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                        handleEvent(buffer.slice(0, boundary));
+                        buffer = buffer.slice(boundary + 2);
+                    }
+                    return read();
+                });
+            }
+            return read();
+        })
+        .then(() => {
+            if (!botMessage) {
+                throw new Error('Stream ended without a response');
+            }
+        })
+        .catch(error => {
+            // Remove typing indicator
+            removeTypingIndicator();
+
+            const fallback = 'Sorry, I encountered an error processing your request. Please try asking about Rubber Bumper\'s products, market position, or factory conversion options.';
+            if (botMessage) {
+                updateMessage(botMessage, text || fallback);
+            } else {
+                addMessageToChat('bot', fallback);
+            }
+            console.error('Error:', error);
+        });
+    }
+
+    // Function to fetch chat response from backend as a single JSON response
+    function fetchChatResponseOnce(message) {
         // Start request time
         const requestStartTime = new Date();
 
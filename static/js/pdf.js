@@ -82,6 +82,7 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             return response.json();
         })
+        .then(job => waitForJob(job.status_url))
         .then(data => {
             // Hide loading overlay
             loadingOverlay.classList.add('d-none');
@@ -104,7 +105,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 </div>
                 <div class="message-content">
                     <div class="message-bubble">
-                        <p>I've processed "${data.filename}" with ${data.chunks} text chunks. You can now ask me questions about the content!</p>
+                        <p></p>
                     </div>
                     <div class="message-info">
                         <span class="message-time">${timestamp}</span>
@@ -112,6 +113,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 </div>
             `;
             
+            messageRow.querySelector('.message-bubble p').textContent =
+                `I've processed "${data.filename}" with ${data.chunks_added} text chunks. ` +
+                'You can now ask me questions about the content!';
+            
             messageElement.appendChild(messageRow);
             
             // Scroll to bottom
@@ -127,6 +132,27 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Poll an ingestion job until it finishes
+    function waitForJob(statusUrl) {
+        return fetch(statusUrl)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Network response was not ok');
+                }
+                return response.json();
+            })
+            .then(job => {
+                if (job.status === 'done') {
+                    return job;
+                }
+                if (job.status === 'failed') {
+                    throw new Error(job.error || 'Processing failed');
+                }
+                return new Promise(resolve => setTimeout(resolve, 1000))
+                    .then(() => waitForJob(statusUrl));
+            });
+    }
+    
     // Add document to the list
     function addDocumentToList(filename) {
         // Remove empty state if present
@@ -143,10 +169,11 @@ document.addEventListener('DOMContentLoaded', function() {
             <div class="document-icon">
                 <i class="fas fa-file-pdf"></i>
             </div>
-            <div class="document-name" title="${filename}">
-                ${filename}
-            </div>
+            <div class="document-name"></div>
         `;
+        const documentName = documentItem.querySelector('.document-name');
+        documentName.textContent = filename;
+        documentName.title = filename;
         
         // Add to list
         documentList.appendChild(documentItem);
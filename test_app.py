@@ -0,0 +1,455 @@
+"""
+Test script for the Rubber Bumper Flask endpoints.
+This script exercises the HTTP API through Flask's test client.
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Keep state shared between workers, such as uploaded documents, out of the project's instance directory
+os.environ.setdefault("INSTANCE_DIR", tempfile.mkdtemp(prefix="chatbot-test-"))
+
+import httpx
+import nltk
+import asgi
+from app import app
+from utils.chat import response_cache
+from utils.ingest import IngestionLog, IngestionQueue
+from utils.metrics import MetricsRegistry
+from utils.namespaces import NamespaceRegistry
+from utils.vector_store import VectorStore
+from utils.assets import build as build_assets, minify_css, minify_js
+from benchmarks.pdf_fixtures import make_pdf
+
+def _has_punkt():
+    try:
+        nltk.sent_tokenize("Punkt check. Second sentence.")
+        return True
+    except LookupError:
+        return False
+
+class TestChatStreamEndpoint(unittest.TestCase):
+    """Test cases for the streaming chat endpoint."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.client = app.test_client()
+
+    def test_direct_answer_stream(self):
+        """A direct answer is delivered as a single done event."""
+        response = self.client.post('/chat-api/stream', json={"message": "what products"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/event-stream'))
+
+        events = [event for event in response.get_data(as_text=True).split("\n\n") if event]
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0].startswith("event: done"))
+        payload = json.loads(events[0].split("data: ", 1)[1])
+        self.assertEqual(payload["response"], "Rubber Bumper Co sells two products: rubber bands and condoms.")
+
+    def test_missing_message(self):
+        """Requests without a message are rejected."""
+        response = self.client.post('/chat-api/stream', json={})
+        self.assertEqual(response.status_code, 400)
+
+class TestBatchEndpoint(unittest.TestCase):
+    """Test cases for the batch chat endpoint."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.client = app.test_client()
+        response_cache.clear()
+
+    def test_batch_validation(self):
+        """Batches must be a non-empty list of strings."""
+        self.assertEqual(self.client.post('/chat-api/batch', json={}).status_code, 400)
+        self.assertEqual(self.client.post('/chat-api/batch', json={"messages": []}).status_code, 400)
+        self.assertEqual(self.client.post('/chat-api/batch', json={"messages": ["ok", 3]}).status_code, 400)
+
+    def test_direct_answers(self):
+        """Direct answers come back in input order with their source."""
+        response = self.client.post('/chat-api/batch', json={"messages": ["what products", "what is the company name"]})
+        self.assertEqual(response.status_code, 200)
+
+        results = response.json["results"]
+        self.assertEqual(response.json["count"], 2)
+        self.assertEqual([result["source"] for result in results], ["direct", "direct"])
+        self.assertEqual(results[1]["response"], "Rubber Bumper Co.")
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Test cases for the Prometheus metrics endpoint."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.client = app.test_client()
+        response_cache.clear()
+
+    def _sample(self, text, line_start):
+        for line in text.splitlines():
+            if line.startswith(line_start + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    def test_answer_paths_and_stages(self):
+        """Answer paths and stage timings are exposed in Prometheus text format."""
+        before = self.client.get('/metrics').get_data(as_text=True)
+        self.client.post('/chat-api', json={"message": "what products"})
+        self.client.post('/chat-api', json={"message": "what products"})
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+
+        for path in ("direct", "cache"):
+            sample = f'chatbot_answers_total{{path="{path}"}}'
+            self.assertEqual(self._sample(text, sample) - self._sample(before, sample), 1)
+        self.assertIn("# TYPE chatbot_stage_duration_seconds histogram", text)
+        self.assertIn('chatbot_stage_duration_seconds_bucket{stage="direct_match",le="+Inf"}', text)
+        self.assertIn('chatbot_stage_duration_seconds_count{stage="serialization"}', text)
+        self.assertIn('chatbot_request_duration_seconds_count{endpoint="/chat-api"}', text)
+
+    def test_aggregation_across_workers(self):
+        """Registries sharing a directory report the sum of all workers."""
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [MetricsRegistry(directory=directory) for _ in range(2)]
+            for count, registry in enumerate(workers, start=1):
+                answers = registry.counter("answers_total", "Answers", ["path"])
+                latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+                for _ in range(count):
+                    answers.inc(path="llm")
+                    latency.observe(0.5)
+                registry.flush()
+
+            text = workers[0].render()
+            for registry in workers:
+                registry.close()
+
+        self.assertIn('answers_total{path="llm"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3', text)
+        self.assertIn('latency_seconds_count 3', text)
+        self.assertIn('latency_seconds_sum 1.5', text)
+
+    def test_exited_workers_are_retired(self):
+        """Snapshots of exited workers are added into the retired snapshot and deleted."""
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = {"answers_total": {"type": "counter", "help": "Answers", "labelnames": ["path"],
+                                          "buckets": [], "samples": [[["llm"], 2]]}}
+            for suffix in ("0123abcd", "4567abcd"):
+                with open(os.path.join(directory, f"{socket.gethostname()}-{exited.pid}-{suffix}.json"), "w") as f:
+                    json.dump(snapshot, f)
+
+            registry = MetricsRegistry(directory=directory)
+            registry.counter("answers_total", "Answers", ["path"]).inc(path="llm")
+            first = registry.render()
+            files = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+            second = registry.render()
+            registry.close()
+
+        self.assertIn('answers_total{path="llm"} 5', first)
+        self.assertEqual(files, sorted([f"{registry._process_id}.json", "retired.json"]))
+        self.assertIn('answers_total{path="llm"} 5', second)
+
+class TestAsgiApp(unittest.TestCase):
+    """Test cases for the ASGI entry point."""
+
+    def request(self, method, path, **kwargs):
+        async def send():
+            transport = httpx.ASGITransport(app=asgi.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                return await client.request(method, path, **kwargs)
+        return asyncio.run(send())
+
+    def test_async_chat_api(self):
+        """The async chat endpoint answers like the Flask one."""
+        response = self.request("POST", "/chat-api", json={"message": "what products"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["response"], "Rubber Bumper Co sells two products: rubber bands and condoms.")
+
+        self.assertEqual(self.request("POST", "/chat-api", json={}).status_code, 400)
+        self.assertEqual(self.request("POST", "/chat-api", content=b"not json").status_code, 400)
+
+    def test_startup_builds_store_off_the_event_loop(self):
+        """The lifespan startup builds the vector store on a thread before reporting completion."""
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent, build_threads = [], []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def run():
+            await asgi.app({"type": "lifespan"}, receive, send)
+            return threading.get_ident()
+
+        with mock.patch("asgi.get_vector_store", side_effect=lambda: build_threads.append(threading.get_ident())):
+            loop_thread = asyncio.run(run())
+
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        self.assertEqual(len(build_threads), 1)
+        self.assertNotEqual(build_threads[0], loop_thread)
+
+    def test_other_routes_use_flask(self):
+        """Routes other than /chat-api are served by the Flask app."""
+        response = self.request("GET", "/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ok")
+
+class TestUploadEndpoint(unittest.TestCase):
+    """Test cases for the asynchronous upload endpoint."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.client = app.test_client()
+
+    def test_upload_validation(self):
+        """Uploads without a PDF are rejected and unknown jobs return 404."""
+        response = self.client.post('/upload', data={}, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/upload', data={'file': (io.BytesIO(b'text'), 'notes.txt')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.get('/upload/unknown').status_code, 404)
+
+    @unittest.skipUnless(_has_punkt(), "NLTK punkt data is not installed")
+    def test_upload_job(self):
+        """An uploaded PDF is queued, processed in the background and reported."""
+        response = self.client.post('/upload', data={'file': (io.BytesIO(make_pdf(5)), 'case.pdf')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json['status_url']
+
+        for _ in range(100):
+            job = self.client.get(status_url).json
+            if job['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['pages_processed'], 5)
+        self.assertGreater(job['chunks_added'], 0)
+
+    def test_uploads_reach_every_worker(self):
+        """A job run by one worker is reported by and applied to another, and clearing reaches both."""
+        from utils.vector_store import VectorStore
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch("utils.pdf_processor.SENTENCE_SPLITTER", "regex"):
+            path = os.path.join(tmpdir, "ingestion.sqlite3")
+            worker, other_worker = IngestionLog(path), IngestionLog(path)
+            store = VectorStore(incremental=True, preload=False)
+
+            pdf_path = os.path.join(tmpdir, "case.pdf")
+            with open(pdf_path, "wb") as f:
+                f.write(make_pdf(3))
+            queue = IngestionQueue(worker)
+            job = queue.submit("case.pdf", pdf_path, "case-study")
+            queue.shutdown()
+
+            status = IngestionQueue(other_worker).get(job.id).to_dict()
+            self.assertEqual(status["status"], "done")
+            self.assertEqual(status["pages_processed"], 3)
+            self.assertEqual(other_worker.sync("case-study", store), status["chunks_added"])
+            self.assertEqual(other_worker.sync("case-study", store), 0)
+            self.assertEqual(len(store), status["chunks_added"])
+
+            # Chunks from a job still running when its namespace is cleared are refused
+            generation = worker.generation("case-study")
+            worker.reset("case-study")
+            with self.assertRaises(RuntimeError):
+                worker.append("case-study", generation, ["A late chunk."])
+            other_worker.sync("case-study", store)
+            self.assertEqual(len(store), 0)
+
+class TestVectorStoreSnapshot(unittest.TestCase):
+    """Test cases for loading the vector store snapshot at startup."""
+
+    def test_unusable_snapshot_is_rebuilt(self):
+        """A corrupt snapshot, or one saved with another backend, is rebuilt instead of crashing startup."""
+        from app import build_vector_store
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "snapshot")
+            with mock.patch.dict(os.environ, {"VECTOR_STORE_SNAPSHOT": path, "VECTOR_STORE_BACKEND": "bm25"}):
+                self.assertEqual(build_vector_store().backend, "bm25")
+                with open(os.path.join(path, "meta.json"), "w") as f:
+                    f.write("{not json")
+                self.assertEqual(build_vector_store().backend, "bm25")
+
+            with mock.patch.dict(os.environ, {"VECTOR_STORE_SNAPSHOT": path, "VECTOR_STORE_BACKEND": "tfidf"}):
+                store = build_vector_store()
+                self.assertEqual(store.backend, "tfidf")
+                self.assertIsNotNone(store.vectorizer)
+
+class TestNamespaces(unittest.TestCase):
+    """Test cases for routing requests to namespaces."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.client = app.test_client()
+
+    def test_namespace_validation(self):
+        """Invalid namespace names are rejected and unknown namespaces return 404."""
+        response = self.client.post('/chat-api', json={"message": "Hello", "namespace": "Bad Name!"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/chat-api', json={"message": "Hello", "namespace": "no-such-case"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.post('/clear', json={"namespace": "no-such-case"}).status_code, 404)
+
+        response = self.client.post('/upload', data={'file': (io.BytesIO(b'%PDF'), 'case.pdf'), 'namespace': '../x'},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_namespace_chat(self):
+        """Questions about a namespace are answered from its own documents."""
+        import app as app_module
+        from utils.chat import namespace_cache_key
+        log = app_module.get_ingestion_log()
+        generation = log.generation("test-case")
+        log.append("test-case", generation, ["Acme Tyres recycles rubber into floor mats."])
+        with app_module.get_namespaces().use("test-case") as store:
+            self.assertIn("Acme Tyres", store.search("floor mats", top_k=1)[0][0])
+
+        response = self.client.post('/chat-api', json={"message": "Hello", "namespace": "test-case"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("test-case", self.client.get('/health').json["namespaces"]["namespaces"])
+
+        # A Rubber Bumper question can't share a cache key with a namespace's question
+        response_cache.set("test-case:who recycles", "Rubber Bumper answer")
+        response_cache.set(namespace_cache_key("test-case", "Who recycles"), "Acme answer")
+        self.assertNotEqual(namespace_cache_key("test-case", "Who recycles"), "test-case:who recycles")
+
+        # Deleting the namespace evicts only its answers, and uploads still running into it fail
+        self.assertEqual(self.client.post('/clear', json={"namespace": "test-case"}).status_code, 200)
+        self.assertNotIn("test-case", app_module.get_namespaces())
+        self.assertIsNone(response_cache.get(namespace_cache_key("test-case", "Who recycles")))
+        self.assertEqual(response_cache.get("test-case:who recycles"), "Rubber Bumper answer")
+        with self.assertRaises(RuntimeError):
+            log.append("test-case", generation, ["A late chunk."])
+
+    def test_namespace_deleted_by_another_worker(self):
+        """A worker forgets a namespace another worker deleted, and a new one of the same name starts empty."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log = IngestionLog(os.path.join(tmpdir, "ingestion.sqlite3"))
+            snapshot_dir = os.path.join(tmpdir, "namespaces")
+            workers = [NamespaceRegistry(lambda name: VectorStore(preload=False), snapshot_dir,
+                                         exists=lambda name: log.position(name) is not None, refresh=log.sync)
+                       for _ in range(2)]
+            log.append("case-study", log.generation("case-study"), ["Acme Tyres recycles rubber."])
+            store = workers[0].get("case-study")
+            self.assertEqual(len(store), 1)
+            workers[0].spill("case-study")
+            # The other worker loads the snapshot from the shared directory
+            self.assertEqual(len(workers[1].get("case-study")), 1)
+            self.assertEqual(workers[1].stats()["reloads"], 1)
+
+            workers[1].drop("case-study")
+            log.drop("case-study")
+            self.assertNotIn("case-study", workers[0])
+            with self.assertRaises(KeyError):
+                workers[0].get("case-study")
+
+            log.append("case-study", log.generation("case-study"), ["Acme Tyres makes floor mats."])
+            self.assertEqual([doc for doc, _ in workers[1].get("case-study").search("acme", top_k=5)],
+                             ["Acme Tyres makes floor mats."])
+
+class TestAssets(unittest.TestCase):
+    """Test cases for the static asset bundles and HTTP caching."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.client = app.test_client()
+
+    def test_minifiers(self):
+        """Minification removes comments and whitespace but not the contents of literals."""
+        script = "// setup\nconst a = 'x // y';\n\n    /* note */ let b = `\n  kept  `;\nc = d.replace(/\\*(.*?)\\*/g, '');\n"
+        self.assertEqual(minify_js(script),
+                         "const a = 'x // y';\nlet b = `\n  kept  `;\nc = d.replace(/\\*(.*?)\\*/g, '');")
+        self.assertEqual(minify_css("/* c */ a :hover , b > p {\n  content: ' ; ';\n  margin: 0 auto;\n}\n"),
+                         "a :hover,b>p{content:' ; ';margin:0 auto}")
+
+    def test_built_bundles(self):
+        """Pages load fingerprinted bundles, which are served precompressed with long-lived caching."""
+        self.assertIn("js/main.js", self.client.get('/chat').get_data(as_text=True))
+
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.dict(app.config, {"ASSET_DIR": tmpdir}):
+            manifest = build_assets(output_dir=tmpdir)
+            html = self.client.get('/chat').get_data(as_text=True)
+            url = f"/assets/{manifest['chat.js']}"
+            self.assertIn(url, html)
+            self.assertNotIn("js/main.js", html)
+
+            plain = self.client.get(url)
+            self.assertEqual(plain.status_code, 200)
+            self.assertNotIn("Content-Encoding", plain.headers)
+            self.assertIn("immutable", plain.headers["Cache-Control"])
+            self.assertIn("max-age=31536000", plain.headers["Cache-Control"])
+
+            compressed = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+            self.assertEqual(compressed.headers["Vary"], "Accept-Encoding")
+            self.assertTrue(compressed.headers["Content-Type"].startswith("text/javascript"))
+            self.assertEqual(gzip.decompress(compressed.data), plain.data)
+            plain.close()
+            compressed.close()
+
+    def test_predefined_answer_etag(self):
+        """Predefined answers to GET requests carry an ETag and are revalidated with 304 Not Modified."""
+        response = self.client.get('/chat-api', query_string={"message": "what products"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response.headers["Cache-Control"])
+        etag = response.headers["ETag"]
+
+        response = self.client.get('/chat-api', query_string={"message": "what products"},
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/chat-api', query_string={"message": "hello"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_get_never_calls_groq(self):
+        """GET requests for questions without a predefined answer get 404 instead of a generated answer."""
+        with mock.patch("app.get_chat_response") as get_chat_response:
+            response = self.client.get('/chat-api', query_string={"message": "how will tariffs affect rubber prices"})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("no-store", response.headers["Cache-Control"])
+        get_chat_response.assert_not_called()
+
+class TestColdStart(unittest.TestCase):
+    """Test that importing the app defers its heavy dependencies."""
+
+    def test_import_does_not_load_heavy_modules(self):
+        """Importing app and asgi leaves scikit-learn, NLTK, PyPDF2 and the Groq SDK unloaded."""
+        script = ("import sys, app, asgi; "
+                  "print(' '.join(m for m in ('sklearn', 'nltk', 'PyPDF2', 'groq') if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_vector_store_built_on_first_use(self):
+        """The vector store is created by the first request that needs it and then reused."""
+        import app as app_module
+        store = app_module.get_vector_store()
+        self.assertIs(app_module.get_vector_store(), store)
+        self.assertIs(app_module.vector_store, store)
+        self.assertGreater(len(store), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,32 @@ Test script for the Rubber Bumper chatbot.
 This script tests the chat functionality to ensure the improvements are working correctly.
 """
 
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 import unittest
+from types import SimpleNamespace
+from unittest import mock
+from groq import Groq
+
+# Keep state shared between workers, such as metrics snapshots, out of the project's instance directory
+os.environ.setdefault("INSTANCE_DIR", tempfile.mkdtemp(prefix="chatbot-test-"))
+
 from utils.vector_store import VectorStore
+from utils import chat
 from utils.chat import get_direct_response, get_groq_response, get_chat_response, response_cache
+from utils.intent_matcher import IntentMatcher
+from utils.cache import ResponseCache, SQLiteResponseCache
+from benchmarks.fake_groq import FakeGroqServer
+from utils.singleflight import SingleFlight
+from utils.circuit_breaker import CircuitBreaker
+from utils.deadline import Deadline
+from utils.semantic_cache import SemanticCache
+from utils.context import build_context
+from utils.pdf_processor import count_tokens, split_sentences
 
 class TestChatFunctionality(unittest.TestCase):
     """Test cases for the chat functionality."""
@@ -31,6 +54,22 @@ class TestChatFunctionality(unittest.TestCase):
         response = get_direct_response("something completely unrelated")
         self.assertIsNone(response)
     
+    def test_intent_matcher(self):
+        """Test the inverted-index intent matcher."""
+        matcher = IntentMatcher({"market share": "share", "market growth": "growth"})
+
+        # Exact and partial matches
+        self.assertEqual(matcher.match("market growth"), "growth")
+        self.assertEqual(matcher.match("how is market growth looking"), "growth")
+
+        # Ties go to the key registered first
+        self.assertEqual(matcher.best_match("market")[0], "share")
+
+        # Intents can be registered at runtime
+        self.assertIsNone(matcher.match("payback period"))
+        matcher.add_intent("payback period", "5 years")
+        self.assertEqual(matcher.match("what is the payback period"), "5 years")
+
     def test_response_cache(self):
         """Test the response caching functionality."""
         # First request should not be cached
@@ -61,5 +100,509 @@ class TestChatFunctionality(unittest.TestCase):
         self.assertIsNotNone(response)
         self.assertTrue(len(response) > 0)
 
+class FakeGroqClient:
+    """Stand-in for the Groq client that returns a fixed answer, optionally in pieces."""
+
+    def __init__(self, answer, piece_size=7):
+        self.answer = answer
+        self.piece_size = piece_size
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        if not stream:
+            message = SimpleNamespace(content=self.answer)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        pieces = [self.answer[i:i + self.piece_size] for i in range(0, len(self.answer), self.piece_size)]
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                     for piece in pieces])
+
+class TestStreamingResponse(unittest.TestCase):
+    """Test cases for token streaming."""
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_stream_matches_blocking_response(self):
+        """Streamed tokens add up to the same answer the blocking call returns and caches."""
+        long_paragraph = "The conversion pays back in five years. " * 10
+        answers = [
+            "  Short answer about the factory.\n\nSecond paragraph.  ",
+            long_paragraph + "\n\nThis second paragraph is dropped.",
+            "   ",
+        ]
+        question = "what is the payback on the factory conversion"
+
+        for answer in answers:
+            with mock.patch.object(chat, "groq_client", FakeGroqClient(answer)):
+                response_cache.clear()
+                expected = get_groq_response(question, context=None)
+
+                response_cache.clear()
+                events = list(chat.stream_groq_response(question))
+
+            tokens = "".join(text for event, text in events if event == "token")
+            self.assertEqual(events[-1], ("done", expected))
+            self.assertEqual(tokens, expected)
+            self.assertEqual(response_cache.get(question), expected)
+
+    def test_direct_answer_is_single_event(self):
+        """Direct answers are sent as one immediate event."""
+        events = list(chat.stream_chat_response("what products", None))
+        self.assertEqual(events, [("done", "Rubber Bumper Co sells two products: rubber bands and condoms.")])
+
+class TestAsyncResponse(unittest.TestCase):
+    """Test cases for the async Groq request path."""
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_concurrent_requests(self):
+        """Many slow Groq calls overlap instead of queueing behind each other."""
+        questions = [f"what is the payback on factory conversion option {i}" for i in range(50)]
+
+        async def ask_all():
+            try:
+                return await asyncio.gather(*(chat.get_groq_response_async(q) for q in questions))
+            finally:
+                await chat.close_async_groq_client()
+
+        with FakeGroqServer(latency=0.2) as server, mock.patch.dict(os.environ, {"GROQ_BASE_URL": server.url}):
+            start = time.perf_counter()
+            answers = asyncio.run(ask_all())
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(server.requests, len(questions))
+        self.assertEqual(answers[7], f"Rubber Bumper Co answer to: {questions[7]}")
+        self.assertEqual(response_cache.get(questions[7]), answers[7])
+        self.assertLess(elapsed, 0.2 * len(questions) / 3)
+
+    def test_upstream_error_falls_back(self):
+        """Failed Groq calls return the retrieved context, or the fallback answer without context."""
+        question = "how will tariffs affect the rubber business"
+        store = VectorStore()
+        with FakeGroqServer(error_rate=1.0) as server, mock.patch.dict(os.environ, {"GROQ_BASE_URL": server.url}), \
+                mock.patch.object(chat, "groq_breaker", CircuitBreaker()):
+            answer = asyncio.run(chat.get_chat_response_async(question, store))
+            response_cache.clear()
+            no_context_answer = asyncio.run(chat.get_groq_response_async(question))
+
+        self.assertEqual(answer, chat.answer_from_context(chat.retrieve_context(question, store)))
+        self.assertIn("$2MM", answer)
+        self.assertEqual(no_context_answer, chat.FALLBACK_RESPONSE)
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for coalescing duplicate in-flight Groq requests."""
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_concurrent_duplicates_share_one_call(self):
+        """Threads asking the same question at once trigger a single Groq call."""
+        client = FakeGroqClient("The conversion pays back in five years.")
+        calls = []
+        release = threading.Event()
+
+        def slow_create(**kwargs):
+            calls.append(kwargs)
+            release.wait(5)
+            return FakeGroqClient.create(client, **kwargs)
+
+        client.chat.completions.create = slow_create
+        question = "what is the payback on the factory conversion"
+        flight = SingleFlight()
+        answers = []
+
+        with mock.patch.object(chat, "groq_client", client), mock.patch.object(chat, "groq_flight", flight):
+            threads = [threading.Thread(target=lambda: answers.append(get_groq_response(question, context="ctx")))
+                       for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            while flight.stats()["executions"] + flight.stats()["coalesced"] < len(threads):
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(answers, ["The conversion pays back in five years."] * 20)
+        self.assertEqual(flight.stats()["coalesced"], 19)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_async_duplicates_share_one_call(self):
+        """Coroutines asking the same question at once trigger a single Groq call."""
+        question = "what is the payback on the factory conversion"
+
+        async def ask_all():
+            try:
+                return await asyncio.gather(*(chat.get_groq_response_async(question) for _ in range(30)))
+            finally:
+                await chat.close_async_groq_client()
+
+        flight = SingleFlight()
+        with FakeGroqServer(latency=0.2) as server, mock.patch.dict(os.environ, {"GROQ_BASE_URL": server.url}), \
+                mock.patch.object(chat, "groq_flight", flight):
+            answers = asyncio.run(ask_all())
+
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(set(answers), {f"Rubber Bumper Co answer to: {question}"})
+        self.assertEqual(flight.stats()["coalesced"], 29)
+
+    def test_errors_reach_every_waiter(self):
+        """Exceptions raised by the shared call are re-raised for all waiters."""
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("upstream down")
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(errors, ["upstream down"] * 2)
+        self.assertEqual(flight.stats()["executions"], 1)
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for the Groq circuit breaker and request deadlines."""
+
+    def setUp(self):
+        response_cache.clear()
+        self.now = 0.0
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: self.now)
+
+    def test_breaker_states(self):
+        """The breaker opens after repeated failures and lets one trial call through after the cool-down."""
+        for _ in range(2):
+            self.assertTrue(self.breaker.allow())
+            self.assertFalse(self.breaker.record_failure())
+        self.breaker.record_success()
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertTrue(self.breaker.record_failure())
+        self.assertFalse(self.breaker.allow())
+
+        self.now = 30
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.assertTrue(self.breaker.record_failure())
+        self.assertFalse(self.breaker.allow())
+
+        self.now = 60
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.cooldown_remaining(), 0)
+        self.assertEqual(self.breaker.stats(), {"state": "closed", "consecutive_failures": 0, "trips": 2,
+                                                "rejected": 3})
+
+    def test_open_breaker_skips_groq(self):
+        """While the breaker is open, questions are answered without calling Groq."""
+        calls = []
+
+        def failing_create(**kwargs):
+            calls.append(kwargs)
+            raise ConnectionError("Groq is down")
+
+        client = FakeGroqClient("unused")
+        client.chat.completions.create = failing_create
+        questions = [f"how will tariffs affect the rubber business in 20{i:02d}" for i in range(5)]
+
+        with mock.patch.object(chat, "groq_client", client), mock.patch.object(chat, "groq_breaker", self.breaker), \
+                mock.patch.object(chat, "semantic_cache", SemanticCache()):
+            answers = [get_groq_response(question, context=None) for question in questions]
+
+            self.assertEqual(len(calls), 3)
+            self.assertEqual(answers, [chat.FALLBACK_RESPONSE] * 5)
+            self.assertEqual(self.breaker.stats()["rejected"], 2)
+
+            # Fallbacks are only cached once the breaker is open
+            self.assertIsNone(response_cache.get(questions[1]))
+            self.assertEqual(response_cache.get(questions[2]), chat.FALLBACK_RESPONSE)
+            self.assertEqual(self.breaker.cooldown_remaining(), 30)
+
+            # After the cool-down, a successful trial call closes the breaker
+            self.now = 30
+            client.chat.completions.create = FakeGroqClient("Tariffs raise costs.").create
+            self.assertEqual(get_groq_response("how will tariffs change rubber band prices", context=None), "Tariffs raise costs.")
+            self.assertEqual(self.breaker.state, "closed")
+
+    def test_deadline_bounds_groq_call(self):
+        """The Groq call gets the time left in the request budget, and is skipped when too little is left."""
+        calls = []
+        client = FakeGroqClient("The conversion pays back in five years.")
+        client.chat.completions.create = lambda **kwargs: calls.append(kwargs) or FakeGroqClient.create(client, **kwargs)
+
+        with mock.patch.object(chat, "groq_client", client), mock.patch.object(chat, "groq_breaker", self.breaker):
+            answer = get_groq_response("what is the payback on the factory conversion", context=None,
+                                       deadline=Deadline(2.0))
+            self.assertEqual(answer, "The conversion pays back in five years.")
+            self.assertLessEqual(calls[0]["timeout"].read, 2.0)
+
+            answer = get_groq_response("how will tariffs affect the rubber business", context="The bigger plant makes condoms.",
+                                       deadline=Deadline(0.0))
+            self.assertEqual(answer, "The bigger plant makes condoms.")
+            self.assertEqual(len(calls), 1)
+
+class TestBatchResponses(unittest.TestCase):
+    """Test cases for answering a batch of questions."""
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_batch_order_sources_and_concurrency(self):
+        """Batches keep input order, resolve direct answers locally and fan out Groq calls."""
+        questions = [f"how will tariffs affect the rubber business in 20{i:02d}" for i in range(12)]
+        messages = ["what products"] + questions + [questions[0], ""]
+
+        with FakeGroqServer(latency=0.2) as server, \
+                mock.patch.object(chat, "groq_client", Groq(api_key="test", base_url=server.url)), \
+                mock.patch.object(chat, "semantic_cache", SemanticCache()):
+            start = time.perf_counter()
+            results = chat.get_chat_responses_batch(messages, VectorStore(), max_concurrency=6)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), len(messages))
+        self.assertEqual(results[0]["source"], "direct")
+        self.assertEqual(results[-1]["source"], "invalid")
+        for question, result in zip(questions, results[1:13]):
+            self.assertEqual(result["source"], "llm")
+            self.assertEqual(result["response"], f"Rubber Bumper Co answer to: {question}")
+            self.assertGreater(result["timings"]["llm"], 0)
+        self.assertEqual(results[13]["response"], results[1]["response"])
+
+        # Duplicates share a call, and six calls run at a time
+        self.assertEqual(server.requests, len(questions))
+        self.assertLess(elapsed, 0.2 * len(questions) / 2)
+
+        # A second batch is answered from the cache
+        self.assertEqual(chat.get_chat_responses_batch(questions[:2], None)[1]["source"], "cache")
+
+    def test_batch_deadline(self):
+        """Groq calls still queued when the batch deadline passes get fallback answers without a call."""
+        questions = [f"how will tariffs affect the rubber business in 20{i:02d}" for i in range(4)]
+        chat.groq_breaker.reset()
+
+        with FakeGroqServer(latency=0.4) as server, \
+                mock.patch.object(chat, "groq_client", Groq(api_key="test", base_url=server.url)), \
+                mock.patch.object(chat, "semantic_cache", SemanticCache()):
+            results = chat.get_chat_responses_batch(questions, None, max_concurrency=1, deadline=Deadline(0.6))
+
+        self.assertEqual([result["source"] for result in results], ["llm", "fallback", "fallback", "fallback"])
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(chat.groq_breaker.state, CircuitBreaker.CLOSED)
+
+class TestSemanticCache(unittest.TestCase):
+    """Test cases for near-duplicate question matching."""
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_reworded_question_reuses_answer(self):
+        """A reworded question is answered from the cache without calling Groq."""
+        client = FakeGroqClient("The payback period is 4 years.")
+        calls = []
+        client.chat.completions.create = lambda **kwargs: calls.append(kwargs) or FakeGroqClient.create(client, **kwargs)
+
+        with mock.patch.object(chat, "groq_client", client), mock.patch.object(chat, "semantic_cache", SemanticCache()):
+            first = get_groq_response("what is the payback period?", context=None)
+            second = get_groq_response("whats the payback period", context=None)
+
+        self.assertEqual(first, "The payback period is 4 years.")
+        self.assertEqual(second, first)
+        self.assertEqual(len(calls), 1)
+
+    def test_different_questions_do_not_match(self):
+        """Questions differing in one content word or a negation never share an answer."""
+        cache = SemanticCache()
+        pairs = [
+            ("what are the risks of converting the factory", "what are the benefits of converting the factory"),
+            ("how much does the conversion cost", "how much does the conversion earn"),
+            ("what is the revenue of the rubber band factory", "what is the profit of the rubber band factory"),
+            ("what is the payback period of the conversion", "what is not the payback period of the conversion"),
+            ("does the conversion pay back in time", "doesn't the conversion pay back in time"),
+        ]
+        for cached, _ in pairs:
+            cache.add(cached, cached)
+
+        for cached, question in pairs:
+            self.assertIsNone(cache.lookup(question), question)
+            self.assertEqual(cache.lookup(cached)[0], cached)
+        self.assertEqual(cache.lookup("What's the payback period of the conversion?")[0], pairs[3][0])
+
+    def test_matching_rules(self):
+        """Matches need the similarity threshold and the same numbers, and evicted entries are forgotten."""
+        cache = SemanticCache(threshold=0.8, max_entries=3, batch_size=2)
+        cache.add("what was condom revenue in 2016", "k2016")
+        cache.add("how fast is the condom market growing", "kgrowth")
+        cache.add("what is the rubber band factory overhead", "koverhead")
+
+        self.assertEqual(cache.lookup("condom revenue in 2016?")[0], "k2016")
+        self.assertIsNone(cache.lookup("what was condom revenue in 2017"))
+        self.assertEqual(cache.lookup("How fast is the condom market growing?")[0], "kgrowth")
+        self.assertIsNone(cache.lookup("who is the president"))
+
+        cache.add("what margin do condoms make", "kmargin")
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.lookup("condom revenue in 2016?"))
+
+        cache.discard("kgrowth")
+        self.assertIsNone(cache.lookup("how fast is the condom market growing"))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+        # A question re-added under a new key no longer belongs to the old one
+        cache.add("what margin do condoms make", "kmargin-new")
+        cache.discard("kmargin")
+        self.assertEqual(cache.lookup("what margin do condoms make")[0], "kmargin-new")
+
+class TestContextBuilder(unittest.TestCase):
+    """Test cases for token-budgeted prompt context."""
+
+    DOCUMENTS = [
+        ("The payback period of the conversion is 5 years. The company target is 4 years. "
+         "Rubber Bumper is family owned.", 0.6),
+        ("The company target is 4 years. Converting the factory costs $2M and takes one year.", 0.4),
+    ]
+
+    def test_budget_and_relevance(self):
+        """Only the most relevant sentences that fit the budget are kept, in document order."""
+        context = build_context("what is the payback period of the conversion", self.DOCUMENTS, token_budget=12)
+        self.assertEqual(context, "The payback period of the conversion is 5 years.")
+        self.assertLessEqual(count_tokens(context), 12)
+
+    def test_overlapping_text_is_deduplicated(self):
+        """A sentence repeated by overlapping documents appears once."""
+        context = build_context("company target years", self.DOCUMENTS, token_budget=200)
+        self.assertEqual(context.count("The company target is 4 years."), 1)
+
+    def test_vector_store_scoring(self):
+        """Context is drawn from the retrieved documents and is never longer than them or the budget."""
+        store = VectorStore(incremental=True)
+        question = "what is the payback of converting the rubber band factory"
+        context = chat.get_context_from_vector_store(question, store)
+        whole = " ".join(" ".join(doc.split()) for doc, score in store.search(question, top_k=2) if score > 0.2)
+
+        self.assertTrue(context)
+        for sentence in split_sentences(context, "regex"):
+            self.assertIn(sentence, whole)
+        self.assertLessEqual(count_tokens(context), min(chat.CONTEXT_TOKEN_BUDGET, count_tokens(whole)))
+
+    def test_prompt_tokens_recorded(self):
+        """Each prompt's token counts are recorded per part."""
+        def total_count():
+            samples = chat.metrics.snapshot()["chatbot_prompt_tokens"]["samples"]
+            return sum(count for labels, _, _, count in samples if labels == ["total"])
+
+        before = total_count()
+        chat.build_messages("what is the payback period", "The payback period is 5 years.")
+        self.assertEqual(total_count(), before + 1)
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the bounded response cache."""
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_limit(self):
+        """Entries are evicted to stay within the byte budget."""
+        cache = ResponseCache(max_entries=None, max_bytes=10)
+        cache.set("k1", "aaaa")
+        cache.set("k2", "bbbb")
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+
+    def test_ttl_and_stats(self):
+        """Entries with a TTL expire while others stay."""
+        cache = ResponseCache()
+        cache.set("llm", "answer", ttl=0)
+        cache.set("direct", "answer")
+
+        self.assertIsNone(cache.get("llm"))
+        self.assertEqual(cache.get("direct"), "answer")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["expirations"], 1)
+
+def _store_in_shared_cache(path):
+    SQLiteResponseCache(path).set("from worker", "shared answer")
+
+
+class TestSQLiteResponseCache(unittest.TestCase):
+    """Test cases for the cache shared between worker processes."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_shared_between_processes(self):
+        """Entries written by one process are visible to another, and clear() invalidates both."""
+        cache = SQLiteResponseCache(self.path, max_entries=2)
+
+        worker = multiprocessing.get_context("spawn").Process(target=_store_in_shared_cache, args=(self.path,))
+        worker.start()
+        worker.join()
+
+        self.assertEqual(cache.get("from worker"), "shared answer")
+
+        SQLiteResponseCache(self.path).clear()
+        self.assertNotIn("from worker", cache)
+
+    def test_eviction_and_ttl(self):
+        """The shared cache enforces its limits and TTLs like the in-memory cache."""
+        cache = SQLiteResponseCache(self.path, max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        cache.set("llm", "answer", ttl=0)
+        self.assertIsNone(cache.get("llm"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_lookups_are_buffered(self):
+        """Cache hits don't write to the database until the buffer is flushed."""
+        cache = SQLiteResponseCache(self.path, flush_every=100, flush_interval=60)
+        cache.set("a", "1")
+        for _ in range(3):
+            self.assertEqual(cache.get("a"), "1")
+        cache.get("missing")
+
+        self.assertEqual(SQLiteResponseCache(self.path).stats()["hits"], 0)
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,122 @@
+"""
+Test script for the PDF processing pipeline.
+This script checks that streaming ingestion produces the same chunks as processing whole documents.
+"""
+
+import io
+import tempfile
+import unittest
+import nltk
+from benchmarks.pdf_fixtures import make_pdf, make_text
+from utils.pdf_processor import (clean_text, count_tokens, iter_chunk_spans, iter_chunks, iter_clean_pages,
+                                 iter_clean_pages_parallel, iter_pdf_pages, iter_sentence_spans, iter_sentences,
+                                 split_sentences, split_text_into_chunks)
+
+def _has_punkt():
+    try:
+        nltk.sent_tokenize("Punkt check. Second sentence.")
+        return True
+    except LookupError:
+        return False
+
+PAGES = [
+    "Rubber Bumper Co makes rubber bands.\n\nIt also  makes condoms. The condom market\n",
+    "   \n",
+    "grew 30% from 2011 to 2017. The rubber band market is flat.\n",
+]
+
+class TestPdfProcessor(unittest.TestCase):
+    """Test cases for the streaming PDF pipeline."""
+
+    def test_clean_pages_match_whole_text(self):
+        """Cleaning page by page gives the same text as cleaning the whole document."""
+        self.assertEqual(" ".join(iter_clean_pages(PAGES)), clean_text("".join(PAGES)))
+
+    def test_chunks_are_streamed(self):
+        """Chunks are yielded before the sentence stream is exhausted."""
+        consumed = []
+
+        def sentences():
+            for i in range(100):
+                consumed.append(i)
+                yield f"Sentence number {i} about the factory conversion."
+
+        chunks = iter_chunks(sentences(), chunk_size=200, overlap=50)
+        first = next(chunks)
+        self.assertLessEqual(len(first), 200)
+        self.assertLess(len(consumed), 100)
+
+        remaining = list(chunks)
+        self.assertTrue(all(len(chunk) <= 250 for chunk in remaining))
+
+    def test_parallel_extraction_matches_sequential(self):
+        """Pages extracted across processes come back complete and in order."""
+        data = make_pdf(9, sentences_per_page=5)
+        expected = list(iter_clean_pages(iter_pdf_pages(io.BytesIO(data))))
+
+        self.assertEqual(len(expected), 9)
+        self.assertEqual(list(iter_clean_pages_parallel(io.BytesIO(data), workers=2, pages_per_task=2)), expected)
+
+        # A stream backed by a file is opened by path in the workers
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(data)
+            f.flush()
+            with open(f.name, "rb") as stream:
+                self.assertEqual(list(iter_clean_pages_parallel(stream, workers=2)), expected)
+
+    @unittest.skipUnless(_has_punkt(), "NLTK punkt data is not installed")
+    def test_streamed_sentences_match_whole_text(self):
+        """Chunking page by page gives the same chunks as chunking the whole text."""
+        text = clean_text("".join(PAGES))
+        streamed = list(iter_chunks(iter_sentences(iter_clean_pages(PAGES)), chunk_size=60, overlap=20))
+        self.assertEqual(streamed, split_text_into_chunks(text, chunk_size=60, overlap=20))
+
+class TestChunker(unittest.TestCase):
+    """Test cases for the regex sentence splitter and offset-based chunking."""
+
+    def test_regex_sentence_splitter(self):
+        """Sentences end at terminal punctuation, but not after abbreviations, decimals or before lowercase."""
+        text = ("Rubber Bumper Co. makes rubber bands. Margins are 2.5 percent! "
+                "Should it convert, e.g. the band plant? \"Maybe.\" said the president. yes.")
+        self.assertEqual(split_sentences(text, "regex"), [
+            "Rubber Bumper Co. makes rubber bands.",
+            "Margins are 2.5 percent!",
+            "Should it convert, e.g. the band plant?",
+            "\"Maybe.\" said the president. yes.",
+        ])
+
+    def test_chunks_are_slices_of_the_text(self):
+        """Character chunks are slices of the input within the size limit that overlap their predecessor."""
+        text = make_text(20000, seed=1)
+        spans = list(iter_chunk_spans(text, iter_sentence_spans(text, "regex"), chunk_size=300, overlap=60))
+
+        self.assertEqual([text[start:end] for start, end in spans],
+                         split_text_into_chunks(text, chunk_size=300, overlap=60, splitter="regex"))
+        self.assertEqual(spans[-1][1], len(text.rstrip()))
+        for (previous_start, previous_end), (start, end) in zip(spans, spans[1:]):
+            self.assertLessEqual(end - start, 300)
+            self.assertTrue(previous_start < start < previous_end)
+            self.assertGreaterEqual(start, previous_end - 60)
+            self.assertTrue(text[start - 1].isspace())
+
+    def test_token_sized_chunks(self):
+        """Token chunks stay within the token budget and start with the last tokens of the previous chunk."""
+        text = make_text(20000, seed=2)
+        spans = list(iter_chunk_spans(text, iter_sentence_spans(text, "regex"), chunk_size=80, overlap=10,
+                                      unit="tokens"))
+
+        self.assertGreater(len(spans), 1)
+        for (_, previous_end), (start, end) in zip(spans, spans[1:]):
+            self.assertLessEqual(count_tokens(text, start, end), 80)
+            self.assertEqual(count_tokens(text, start, previous_end), 10)
+
+    def test_streamed_regex_chunks_match_whole_text(self):
+        """Chunking a stream of sentences gives the same chunks as chunking the whole cleaned text."""
+        text = clean_text(make_text(20000, seed=3))
+        for unit, chunk_size, overlap in (("chars", 250, 50), ("tokens", 60, 12)):
+            streamed = list(iter_chunks(split_sentences(text, "regex"), chunk_size=chunk_size, overlap=overlap, unit=unit))
+            self.assertEqual(streamed, split_text_into_chunks(text, chunk_size=chunk_size, overlap=overlap,
+                                                              splitter="regex", unit=unit))
+
+if __name__ == "__main__":
+    unittest.main()
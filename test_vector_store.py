@@ -0,0 +1,289 @@
+"""
+Test script for the Rubber Bumper vector store.
+This script checks that the indexing modes return consistent search results.
+"""
+
+import math
+import os
+import tempfile
+import threading
+import unittest
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from utils.bm25 import BM25Index
+from utils.namespaces import NamespaceRegistry
+from utils.vector_store import VectorStore
+
+class TestVectorStore(unittest.TestCase):
+    """Test cases for the vector store."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.vector_store = VectorStore()
+        self.incremental_store = VectorStore(incremental=True)
+        self.bm25_store = VectorStore(backend="bm25")
+        self.dense_store = VectorStore(incremental=True, backend="dense")
+
+    def test_incremental_matches_tfidf(self):
+        """Incremental indexing scores documents like a full TF-IDF refit."""
+        for query in ["payback period of the conversion", "condom market growth", "factory overhead"]:
+            expected = self.vector_store.search(query, top_k=3)
+            results = self.incremental_store.search(query, top_k=3)
+
+            self.assertEqual([doc for doc, _ in results], [doc for doc, _ in expected])
+            for (_, score), (_, expected_score) in zip(results, expected):
+                self.assertAlmostEqual(score, expected_score)
+
+    def test_search_many_matches_brute_force(self):
+        """Batched search returns the exact cosine top-k, computed independently with a full sort."""
+        queries = ["payback period", "rubber band market share", "employees retraining", "zzz"]
+        top_k = 3
+
+        for store in (self.vector_store, self.incremental_store):
+            # Duplicate the best match of the first query so its top two scores tie
+            store.add_documents([store.search(queries[0], top_k=1)[0][0]])
+            documents = [store.documents[row] for row in range(len(store.documents))]
+            document_vectors = TfidfVectorizer().fit(documents)
+
+            batched = store.search_many(queries, top_k=top_k)
+            self.assertEqual(len(batched), len(queries))
+            for query, results in zip(queries, batched):
+                scores = cosine_similarity(document_vectors.transform([query]),
+                                           document_vectors.transform(documents))[0]
+                order = np.argsort(-scores, kind="stable")
+                expected = [(documents[row], scores[row]) for row in order if scores[row] > 0.1][:top_k]
+
+                self.assertEqual(len(results), len(expected))
+                for (_, score), (_, expected_score) in zip(results, expected):
+                    self.assertAlmostEqual(score, expected_score)
+                # Tied documents may come back in either order, but each must score what the reference says
+                reference = dict(zip(documents, scores))
+                for document, score in results:
+                    self.assertAlmostEqual(reference[document], score)
+
+            self.assertEqual(batched[-1], [])
+            self.assertEqual(batched[0][0][0], batched[0][1][0])
+
+    def test_update_and_delete(self):
+        """Documents can be replaced and deleted by ID without a rebuild."""
+        for store in (self.vector_store, self.incremental_store, self.bm25_store, self.dense_store):
+            ids = store.add_documents(["Rubber Bumper plans a new warehouse in Ohio."], ids=["warehouse"])
+            self.assertEqual(ids, ["warehouse"])
+            self.assertIn("Ohio", store.search("warehouse in Ohio", top_k=1)[0][0])
+
+            store.update_document("warehouse", "Rubber Bumper plans a new warehouse in Texas.")
+            self.assertIn("Texas", store.search("warehouse", top_k=1)[0][0])
+
+            store.delete_document("warehouse")
+            self.assertEqual(store.search("warehouse Texas Ohio"), [])
+            self.assertEqual(len(store), 12)
+
+            store.compact()
+            self.assertEqual(len(store.documents), 12)
+
+    def test_snapshot_round_trip(self):
+        """A saved index loads memory-mapped and returns the same results."""
+        queries = ["payback period", "condom market growth", "warehouse"]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for store in (self.vector_store, self.incremental_store, self.bm25_store, self.dense_store):
+                store.add_documents(["Rubber Bumper plans a new warehouse."], ids=["warehouse"])
+                store.delete_document(0)
+                path = os.path.join(tmpdir, f"snapshot-{store.backend}-{store.incremental}")
+                store.save(path)
+
+                loaded = VectorStore.load(path, mmap=True)
+                self.assertEqual(loaded.incremental, store.incremental)
+                self.assertEqual(loaded.backend, store.backend)
+                self.assertEqual(len(loaded), len(store))
+                self.assertEqual(loaded.search_many(queries), store.search_many(queries))
+
+                # A loaded store can still be modified
+                loaded.update_document("warehouse", "Rubber Bumper plans a new distribution center.")
+                self.assertIn("distribution", loaded.search("distribution center", top_k=1)[0][0])
+
+    def test_snapshot_replaced_atomically(self):
+        """Saving again swaps the snapshot link to a new version and prunes all but the previous one."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "snapshot")
+            for count in range(3):
+                self.bm25_store.add_documents([f"Rubber Bumper plans warehouse number {count}."])
+                self.bm25_store.save(path)
+
+            self.assertTrue(os.path.islink(path))
+            self.assertEqual(len(VectorStore._snapshot_versions(path)), 2)
+            self.assertEqual(len(VectorStore.load(path)), len(self.bm25_store))
+
+            VectorStore.delete_snapshot(path)
+            self.assertEqual(os.listdir(tmpdir), [])
+
+    def test_bm25_scores(self):
+        """BM25 search returns the documents with the highest Okapi BM25 scores."""
+        documents = [
+            "rubber bands rubber bands",
+            "condom market growth",
+            "rubber band factory overhead and rubber prices",
+            "the condom factory",
+        ]
+        index = BM25Index(k1=1.2, b=0.75)
+        index.add(documents)
+
+        tokens = [index.analyze(document) for document in documents]
+        average_length = sum(len(t) for t in tokens) / len(tokens)
+
+        def bm25(query, doc_tokens):
+            score = 0.0
+            for term in set(index.analyze(query)):
+                df = sum(term in t for t in tokens)
+                tf = doc_tokens.count(term)
+                if tf:
+                    idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+                    score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(doc_tokens) / average_length))
+            return score
+
+        for query in ["rubber factory", "condom growth", "bands"]:
+            expected = sorted(((row, bm25(query, t)) for row, t in enumerate(tokens)), key=lambda r: -r[1])
+            expected = [(row, score) for row, score in expected if score > 0][:2]
+            results = index.search(query, top_k=2)
+            self.assertEqual([row for row, _ in results], [row for row, _ in expected])
+            for (_, score), (_, expected_score) in zip(results, expected):
+                self.assertAlmostEqual(score, expected_score)
+
+    def test_bm25_early_termination_is_exact(self):
+        """Stopping early returns the same top-k as scoring every posting."""
+        words = ["rubber", "band", "condom", "market", "factory", "payback", "profit", "growth", "the", "of"]
+        documents = [" ".join(words[(i * j + j * j) % len(words)] for j in range(3 + i % 17)) for i in range(2000)]
+        self.bm25_store.add_documents(documents)
+        for doc_id in range(20, 2000, 7):
+            self.bm25_store.delete_document(doc_id)
+
+        index = self.bm25_store._bm25
+        for query in ["payback of the factory", "rubber market growth", "the of", "condom profit payback"]:
+            for top_k in (1, 3, 10):
+                results = index.search(query, top_k)
+                expected = index.search(query, top_k, exhaustive=True)
+                self.assertEqual([row for row, _ in results], [row for row, _ in expected])
+                self.assertTrue(all(row not in range(20, 2000, 7) for row, _ in results))
+
+    def test_bm25_scores_are_normalized(self):
+        """BM25 store scores are divided by the query's highest possible score, like cosine similarities."""
+        documents = ["rubber bands rubber bands", "condom market growth", "the condom factory", "the factory"]
+        self.bm25_store.add_documents(documents)
+        index = self.bm25_store._bm25
+
+        for query in ["condom market growth", "the factory overhead", "rubber"]:
+            raw = index.search(query, top_k=3)
+            results = self.bm25_store.search_many([query], top_k=3, threshold=0.0)[0]
+            self.assertEqual([doc for doc, _ in results], [self.bm25_store.documents[row] for row, _ in raw])
+            for (_, score), (_, raw_score) in zip(results, raw):
+                self.assertAlmostEqual(score, raw_score / index.max_score(query))
+                self.assertTrue(0 < score <= 1.0 + 1e-9)
+
+    def test_dense_quantization(self):
+        """Quantized dense vectors rank documents like unquantized ones."""
+        queries = ["payback period of the conversion", "condom market growth", "factory overhead"]
+        exact = VectorStore(incremental=True, backend="dense", quantization="float32")
+        clustered = VectorStore(incremental=True, backend="dense", clusters=3)
+        self.assertIn("payback period", self.dense_store.search(queries[0], top_k=1)[0][0])
+
+        for query in queries:
+            expected = exact.search(query, top_k=3)
+            for store in (self.dense_store, VectorStore(incremental=True, backend="dense", quantization="float16")):
+                results = store.search(query, top_k=3)
+                self.assertEqual([doc for doc, _ in results], [doc for doc, _ in expected])
+                for (_, score), (_, expected_score) in zip(results, expected):
+                    self.assertAlmostEqual(score, expected_score, delta=0.02)
+
+            # Probing every cluster scores every document
+            self.assertEqual(clustered.search(query, top_k=3), self.dense_store.search(query, top_k=3))
+
+        # One byte per dimension plus a scale per row
+        self.assertEqual(self.dense_store._dense.codes.itemsize, 1)
+        self.assertLess(self.dense_store._dense.nbytes, exact._dense.nbytes / 2)
+
+    def test_namespace_eviction(self):
+        """Namespaces over the memory budget are spilled least recently used first and reloaded on use."""
+        def factory(name):
+            if name == "rubber-bumper":
+                return self.incremental_store
+            return VectorStore(incremental=True, n_features=2**12, preload=False)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            registry = NamespaceRegistry(factory, tmpdir)
+            for name in ("case-a", "case-b"):
+                with registry.use(name, create=True) as store:
+                    store.add_documents([f"{name} sells tyres and payback period notes"])
+            registry.max_bytes = registry.memory_usage() - 1
+
+            # Using case-a makes case-b the least recently used namespace, so it is spilled first
+            registry.get("case-a")
+            with registry._lock:
+                registry._enforce_budget()
+            registry._save_spilled()
+            stats = registry.stats()
+            self.assertFalse(stats["namespaces"]["case-b"]["loaded"])
+            self.assertTrue(stats["namespaces"]["case-a"]["loaded"])
+            self.assertEqual(stats["spills"], 1)
+
+            # The default namespace is never spilled, even when it alone is over the budget
+            registry.get("rubber-bumper")
+            stats = registry.stats()
+            self.assertTrue(stats["namespaces"]["rubber-bumper"]["loaded"])
+            self.assertFalse(stats["namespaces"]["case-a"]["loaded"])
+            self.assertEqual(stats["spills"], 2)
+
+            with registry.use("case-b") as store:
+                self.assertIn("case-b", store.search("tyres", top_k=1)[0][0])
+            self.assertEqual(registry.stats()["reloads"], 1)
+            self.assertIs(registry.get("rubber-bumper"), self.incremental_store)
+
+            # A new registry finds spilled namespaces in the snapshot directory
+            self.assertIn("case-a", NamespaceRegistry(factory, tmpdir))
+
+            registry.drop("case-b")
+            self.assertNotIn("case-b", registry)
+            with self.assertRaises(KeyError):
+                registry.get("case-b")
+            with self.assertRaises(ValueError):
+                registry.get("Not a name")
+            with self.assertRaises(ValueError):
+                registry.drop("rubber-bumper")
+
+    def test_spill_does_not_block_other_namespaces(self):
+        """Other namespaces stay usable while a snapshot is written, and the spilled one waits for it."""
+        def factory(name):
+            return VectorStore(incremental=True, n_features=2**12, preload=False)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            registry = NamespaceRegistry(factory, tmpdir)
+            for name in ("case-a", "case-b"):
+                with registry.use(name, create=True) as store:
+                    store.add_documents([f"{name} sells tyres"])
+
+            saving, release = threading.Event(), threading.Event()
+            store = registry.get("case-a")
+            save = store.save
+            store.save = lambda path: (saving.set(), release.wait(5), save(path))
+            spill = threading.Thread(target=registry.spill, args=("case-a",))
+            spill.start()
+            self.assertTrue(saving.wait(5))
+
+            # The lock isn't held while the snapshot is written
+            self.assertIn("case-b", registry.get("case-b").search("tyres", top_k=1)[0][0])
+            self.assertIn("case-a", registry.names())
+            reloaded = []
+            waiter = threading.Thread(target=lambda: reloaded.append(registry.get("case-a")))
+            waiter.start()
+            waiter.join(0.2)
+            self.assertEqual(reloaded, [])
+
+            release.set()
+            spill.join()
+            waiter.join()
+            self.assertIn("case-a", reloaded[0].search("tyres", top_k=1)[0][0])
+            self.assertEqual(registry.stats()["spills"], 1)
+            self.assertEqual(registry.stats()["reloads"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import gzip
+import hashlib
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+
+# Bundle name -> source files under static/, in the order the pages load them
+BUNDLES = {
+    "chat.css": ["css/styles.css", "css/dark-mode.css", "css/custom.css", "css/animations.css",
+                 "css/mobile-optimizations.css"],
+    "landing.css": ["css/styles.css", "css/dark-mode.css", "css/landing-page.css", "css/animations.css"],
+    "chat.js": ["js/dark-mode.js", "js/page-transitions.js", "js/main.js", "js/pdf.js"],
+    "landing.js": ["js/dark-mode.js", "js/page-transitions.js", "js/landing-page.js"],
+}
+
+# Strings and comments are matched together so comment markers inside strings are left alone
+CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r"\s+")
+CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+def minify_css(source):
+    """
+    Remove comments and redundant whitespace from a stylesheet.
+
+    Spaces before ':' are kept, as "a :hover" and "a:hover" select different elements.
+    """
+    parts = []
+    text = ""   # source since the last string, with comments replaced by a space
+    position = 0
+    for match in CSS_TOKENS.finditer(source):
+        text += source[position:match.start()]
+        if match.group(1):
+            parts.append(_compact_css(text))
+            parts.append(match.group(1))
+            text = ""
+        else:
+            text += " "
+        position = match.end()
+    parts.append(_compact_css(text + source[position:]))
+    return "".join(parts).replace(";}", "}").strip()
+
+def _compact_css(text):
+    text = CSS_SPACE.sub(" ", text)
+    text = CSS_PUNCTUATION.sub(r"\1", text)
+    return text.replace(": ", ":")
+
+# Characters after which a '/' starts a regular expression literal rather than a division
+JS_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^\n")
+JS_REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw")
+
+def minify_js(source):
+    """
+    Remove comments, indentation and blank lines from a script.
+
+    Strings, template literals and regular expression literals are copied
+    unchanged, and line breaks are kept so automatic semicolon insertion
+    still applies. This is deliberately conservative: it never joins
+    tokens, so it can't change what the script does, and gzip or brotli
+    take care of the remaining redundancy.
+    """
+    out = []
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        following = source[i + 1] if i + 1 < length else ""
+
+        if char in "'\"`":
+            end = _string_end(source, i, char)
+            out.append(source[i:end])
+            i = end
+        elif char == "/" and following == "/":
+            i = source.find("\n", i)
+            i = length if i == -1 else i
+        elif char == "/" and following == "*":
+            end = source.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            _append_space(out, " ")
+        elif char == "/" and _starts_regex(out):
+            end = _regex_end(source, i)
+            out.append(source[i:end])
+            i = end
+        elif char in " \t\r\n":
+            end = i
+            while end < length and source[end] in " \t\r\n":
+                end += 1
+            _append_space(out, "\n" if "\n" in source[i:end] else " ")
+            i = end
+        else:
+            out.append(char)
+            i += 1
+
+    return "".join(out).strip()
+
+def _append_space(out, space):
+    """Append a space or line break to the output, merging it with whitespace already there."""
+    if out and out[-1] in (" ", "\n"):
+        if space == "\n":
+            out[-1] = "\n"
+    else:
+        out.append(space)
+
+def _string_end(source, start, quote):
+    """Return the index just past the string or template literal starting at start."""
+    i = start + 1
+    while i < len(source):
+        if source[i] == "\\":
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    return len(source)
+
+def _starts_regex(out):
+    """Return whether a '/' following the output so far begins a regular expression literal."""
+    previous = "".join(out[-12:]).rstrip(" ")
+    if not previous:
+        return True
+    if previous[-1] in JS_REGEX_PRECEDERS:
+        return True
+    word = re.search(r"[A-Za-z_$]+$", previous)
+    return word is not None and word.group() in JS_REGEX_KEYWORDS
+
+def _regex_end(source, start):
+    """Return the index just past the regular expression literal (and its flags) starting at start."""
+    i = start + 1
+    in_class = False
+    while i < len(source) and source[i] != "\n":
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(source) and source[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return i
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+def build_bundle(name, sources, static_dir=STATIC_DIR):
+    """
+    Concatenate and minify the sources of a bundle.
+
+    Args:
+        name: The bundle name; its extension selects the minifier.
+        sources: Source file paths relative to static_dir.
+        static_dir: The static files directory.
+
+    Returns:
+        The minified bundle as bytes.
+    """
+    minify = MINIFIERS[os.path.splitext(name)[1]]
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_dir, source), encoding="utf-8") as f:
+            parts.append(minify(f.read()))
+    # Scripts are separated by ';' in case one doesn't end its last statement
+    separator = "\n;\n" if name.endswith(".js") else "\n"
+    return (separator.join(parts) + "\n").encode("utf-8")
+
+def build(bundles=None, static_dir=STATIC_DIR, output_dir=DIST_DIR):
+    """
+    Build every bundle with a content-hash filename and precompressed variants.
+
+    Each bundle is written to output_dir as <stem>.<hash>.<ext>, where hash
+    is the start of the SHA-256 of its content, so its URL changes whenever
+    its content does and it can be cached indefinitely. A .gz variant is
+    written next to it, and a .br variant if the brotli package is
+    installed. The bundle names are mapped to the written files in
+    manifest.json, which is replaced last so a running app never sees a
+    manifest pointing at missing files.
+
+    Args:
+        bundles: Dict of bundle name to source files; defaults to BUNDLES.
+        static_dir: The static files directory the sources are read from.
+        output_dir: Directory the bundles and the manifest are written to.
+
+    Returns:
+        The manifest dict.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.info("brotli is not installed; writing gzip variants only")
+
+    os.makedirs(output_dir, exist_ok=True)
+    previous = load_manifest(output_dir)
+    manifest = {}
+    for name, sources in (bundles or BUNDLES).items():
+        content = build_bundle(name, sources, static_dir)
+        stem, extension = os.path.splitext(name)
+        filename = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+        variants = {"": content, ".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(content, quality=11)
+        for suffix, data in variants.items():
+            with open(os.path.join(output_dir, filename + suffix), "wb") as f:
+                f.write(data)
+
+        manifest[name] = filename
+        source_bytes = sum(os.path.getsize(os.path.join(static_dir, source)) for source in sources)
+        logger.info(f"Built {filename}: {source_bytes} bytes in {len(sources)} files -> {len(content)} minified, "
+                    + ", ".join(f"{len(data)} {suffix[1:]}" for suffix, data in variants.items() if suffix))
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    # Keep the previous build for pages rendered before the manifest changed, and delete older ones
+    current = set(manifest.values()) | set(previous.values())
+    for filename in os.listdir(output_dir):
+        base = re.sub(r"\.(gz|br)$", "", filename)
+        if filename != MANIFEST_NAME and base not in current:
+            os.remove(os.path.join(output_dir, filename))
+    return manifest
+
+def load_manifest(output_dir=DIST_DIR):
+    """Return the manifest written by build(), or an empty dict if the assets haven't been built."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle, minify and precompress the static assets.")
+    parser.add_argument("--output", default=DIST_DIR, help="Directory to write the bundles to")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    build(output_dir=args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import re
+from collections import Counter
+import numpy as np
+
+# Same tokens as TfidfVectorizer's default analyzer
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+class BM25Index:
+    """
+    An inverted index scoring documents with Okapi BM25.
+
+    Each term maps to a postings list of the rows containing it and their
+    term frequencies, appended to as documents are added. On first use after
+    a change, a term's postings are turned into arrays of rows and per-posting
+    BM25 impacts, along with the term's highest impact, and cached.
+
+    Top-k queries use MaxScore-style early termination: terms are scored in
+    order of their highest impact, and once the k-th best score so far is
+    above the sum of the highest impacts of the remaining terms, no document
+    not already a candidate can reach the top k. The remaining terms are then
+    only looked up for the surviving candidates instead of being scanned, so
+    query cost follows the postings of the discriminating terms rather than
+    the size of the corpus.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation.
+            b: Strength of document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings = {}         # term -> (rows, term frequencies), rows ascending
+        self._impacts = {}          # term -> (rows array, impacts array, highest impact)
+        self._lengths = []          # row -> number of tokens
+        self._lengths_array = None
+        self._deleted = set()
+        self._live = 0
+        self._total_length = 0
+
+    @staticmethod
+    def analyze(text):
+        """Split text into lowercase word tokens."""
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def __len__(self):
+        """Return the number of rows, including deleted ones."""
+        return len(self._lengths)
+
+    def add(self, documents):
+        """
+        Index documents as the next rows.
+
+        Args:
+            documents: A list of strings.
+        """
+        for document in documents:
+            row = len(self._lengths)
+            counts = Counter(self.analyze(document or ""))
+            for term, frequency in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = ([], [])
+                postings[0].append(row)
+                postings[1].append(frequency)
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._live += 1
+            self._total_length += length
+        self._invalidate()
+
+    def remove(self, row):
+        """Exclude a row from scoring and from the collection statistics."""
+        if row in self._deleted:
+            return
+        self._deleted.add(row)
+        self._live -= 1
+        self._total_length -= self._lengths[row]
+        self._invalidate()
+
+    def memory_usage(self):
+        """Approximate bytes held by the postings lists, cached impacts and document lengths."""
+        # Each posting is two list slots pointing at small, shared ints
+        postings = sum(len(rows) for rows, _ in self._postings.values()) * 16
+        impacts = sum(rows.nbytes + scores.nbytes for rows, scores, _ in filter(None, self._impacts.values()))
+        return postings + impacts + len(self._lengths) * 8
+
+    def _invalidate(self):
+        # Document counts and the average length changed, so every impact did too
+        self._impacts = {}
+        self._lengths_array = None
+
+    def _term_impacts(self, term):
+        """Return the rows, BM25 impacts and highest impact of a term, or None if no live row has it."""
+        cached = self._impacts.get(term)
+        if cached is not None or term in self._impacts:
+            return cached
+
+        postings = self._postings.get(term)
+        impacts = None
+        if postings is not None:
+            rows = np.asarray(postings[0], dtype=np.int64)
+            frequencies = np.asarray(postings[1], dtype=np.float64)
+            if self._deleted:
+                keep = ~np.isin(rows, np.fromiter(self._deleted, dtype=np.int64))
+                rows, frequencies = rows[keep], frequencies[keep]
+
+            if len(rows):
+                if self._lengths_array is None:
+                    self._lengths_array = np.asarray(self._lengths, dtype=np.float64)
+                average_length = self._total_length / self._live if self._total_length else 1.0
+                document_frequency = len(rows)
+                idf = np.log(1 + (self._live - document_frequency + 0.5) / (document_frequency + 0.5))
+                norms = self.k1 * (1 - self.b + self.b * self._lengths_array[rows] / average_length)
+                scores = idf * frequencies * (self.k1 + 1) / (frequencies + norms)
+                impacts = (rows, scores, float(scores.max()))
+
+        self._impacts[term] = impacts
+        return impacts
+
+    def max_score(self, query):
+        """
+        Return the highest score any document could get for a query.
+
+        This is the sum of the highest impact of each query term, so dividing
+        a document's score by it gives a score between 0 and 1. A term no live
+        document contains counts with the impact it would have occurring once
+        in a document of average length, so a query only partly covered by
+        the corpus can't reach a score of 1.
+        """
+        total = 0.0
+        for term, count in Counter(self.analyze(query)).items():
+            impacts = self._term_impacts(term)
+            if impacts is not None:
+                total += impacts[2] * count
+            else:
+                # With a term frequency of 1 and average length the impact is the IDF
+                total += np.log(1 + (self._live + 0.5) / 0.5) * count
+        return float(total)
+
+    def search(self, query, top_k=3, exhaustive=False):
+        """
+        Return the top_k rows by BM25 score.
+
+        Args:
+            query: The query string.
+            top_k: Number of rows to return.
+            exhaustive: Score every posting of every query term instead of
+                terminating early. The results are the same; this is for
+                testing and benchmarking.
+
+        Returns:
+            A list of (row, score) tuples, best first.
+        """
+        if top_k <= 0:
+            return []
+
+        terms = []
+        for term, count in Counter(self.analyze(query)).items():
+            impacts = self._term_impacts(term)
+            if impacts is not None:
+                rows, scores, highest = impacts
+                terms.append((rows, scores * count if count > 1 else scores, highest * count))
+        if not terms:
+            return []
+
+        # Highest-impact terms first; remaining[i] bounds what terms i.. can add to any document
+        terms.sort(key=lambda term: -term[2])
+        remaining = np.cumsum([term[2] for term in terms][::-1])[::-1].tolist() + [0.0]
+
+        candidates = np.empty(0, dtype=np.int64)
+        totals = np.empty(0, dtype=np.float64)
+        threshold = 0.0
+        position = 0
+
+        # Essential terms: any document may still enter the top k, so scan their postings
+        while position < len(terms):
+            if not exhaustive and len(candidates) >= top_k and threshold > remaining[position]:
+                break
+            rows, scores, _ = terms[position]
+            candidates, inverse = np.unique(np.concatenate((candidates, rows)), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate((totals, scores)), minlength=len(candidates))
+            if len(candidates) >= top_k:
+                threshold = np.partition(totals, len(totals) - top_k)[len(totals) - top_k]
+            position += 1
+
+        # Non-essential terms: only candidates that can still reach the threshold are looked up
+        while position < len(terms):
+            keep = totals + remaining[position] >= threshold
+            candidates, totals = candidates[keep], totals[keep]
+            rows, scores, _ = terms[position]
+            found = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+            hit = rows[found] == candidates
+            totals[hit] += scores[found[hit]]
+            threshold = np.partition(totals, len(totals) - top_k)[len(totals) - top_k]
+            position += 1
+
+        # Keep everything tied with the k-th score so ties go to the lowest rows
+        if len(totals) > top_k:
+            top = totals >= np.partition(totals, len(totals) - top_k)[len(totals) - top_k]
+            candidates, totals = candidates[top], totals[top]
+        order = np.lexsort((candidates, -totals))[:top_k]
+        return [(int(candidates[i]), float(totals[i])) for i in order]
@@ -0,0 +1,482 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Per-deployment state shared by every worker (Flask's default instance folder)
+INSTANCE_DIR = os.environ.get(
+    "INSTANCE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance")
+)
+
+
+class ResponseCache:
+    """
+    A bounded, thread-safe LRU cache for chat responses.
+
+    Entries are evicted least-recently-used first once either the entry or
+    byte limit is exceeded. Each entry may carry its own time-to-live so that
+    generated answers can expire while predefined answers stay cached.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None, default_ttl=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries to keep, or None for no limit.
+            max_bytes: Maximum total size of keys and values in bytes, or None for no limit.
+            default_ttl: Default time-to-live in seconds, or None for entries that never expire.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_size(key, value):
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+    def _remove(self, key):
+        # Caller must hold the lock
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key):
+        # Caller must hold the lock; returns the value or None, dropping expired entries
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+
+        return value
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for a key and mark it as recently used.
+
+        Args:
+            key: The cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or default.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting least-recently-used entries if over a limit.
+
+        Args:
+            key: The cache key.
+            value: The string value to cache.
+            ttl: Time-to-live in seconds; defaults to the cache's default_ttl.
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = self._entry_size(key, value)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            # Values larger than the whole byte budget are never cached
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove a key from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def delete_prefix(self, prefix):
+        """
+        Remove every key starting with a prefix.
+
+        Returns:
+            The number of entries removed.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """Remove all entries. Statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            A dict with entry count, size in bytes, limits and hit/miss/eviction counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteResponseCache:
+    """
+    A response cache shared between processes through a SQLite database.
+
+    Gunicorn workers pointing at the same file see each other's entries, so a
+    question answered by one worker is a cache hit for all of them, and
+    clear() invalidates the cache for every worker at once. The interface
+    matches ResponseCache.
+
+    Lookups are plain reads, which in WAL mode run alongside a writer.
+    Recency and hit/miss counters are buffered in the process and written
+    in batches (on the next set(), on stats(), or once flush_every lookups
+    or flush_interval seconds have accumulated), so a cache hit normally
+    takes no write lock at all. Only expiring an entry writes immediately.
+    LRU order between workers is therefore approximate to within a batch.
+    """
+
+    def __init__(self, path=None, max_entries=1000, max_bytes=None, default_ttl=None, timeout=5.0,
+                 flush_every=64, flush_interval=1.0):
+        """
+        Initialize the cache, creating the database if needed.
+
+        Args:
+            path: Path to the SQLite database file; defaults to a file in the instance directory.
+            max_entries: Maximum number of entries to keep, or None for no limit.
+            max_bytes: Maximum total size of keys and values in bytes, or None for no limit.
+            default_ttl: Default time-to-live in seconds, or None for entries that never expire.
+            timeout: Seconds to wait for a lock held by another worker.
+            flush_every: Buffered lookups that trigger a write of recency and counters.
+            flush_interval: Seconds after which buffered lookups are written regardless.
+        """
+        if path is None:
+            os.makedirs(INSTANCE_DIR, exist_ok=True)
+            path = os.path.join(INSTANCE_DIR, "response_cache.sqlite3")
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        # Connections are per thread and must not be reused across a fork
+        self._local = threading.local()
+
+        # Lookups not yet written to the database: keys in the order they were hit, and counter deltas
+        self._pending_lock = threading.Lock()
+        self._touched = OrderedDict()
+        self._counts = Counter()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, "
+                "size INTEGER NOT NULL, last_access INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                [("hits",), ("misses",), ("evictions",), ("expirations",)],
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+    @staticmethod
+    def _increment(conn, name, amount=1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for a key and mark it as recently used.
+
+        Args:
+            key: The cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or default.
+        """
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is not None and row[1] is not None and row[1] <= now:
+            with self._transaction() as conn:
+                # Another worker may have replaced the entry since it was read
+                deleted = conn.execute(
+                    "DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now)
+                ).rowcount
+                if deleted:
+                    self._increment(conn, "expirations")
+            row = None
+
+        self._record_lookup(key if row is not None else None)
+        return default if row is None else row[0]
+
+    def _record_lookup(self, key):
+        """Buffer a hit on key (or a miss if key is None), flushing the buffer when it is due."""
+        with self._pending_lock:
+            if key is None:
+                self._counts["misses"] += 1
+            else:
+                self._counts["hits"] += 1
+                self._touched.pop(key, None)
+                self._touched[key] = None
+            self._pending += 1
+            due = (self._pending >= self.flush_every
+                   or time.monotonic() - self._flushed_at >= self.flush_interval)
+        if due:
+            with self._transaction() as conn:
+                self._flush(conn)
+
+    def _flush(self, conn):
+        # Caller must hold a write transaction
+        with self._pending_lock:
+            touched, counts = list(self._touched), self._counts
+            self._touched, self._counts = OrderedDict(), Counter()
+            self._pending = 0
+            self._flushed_at = time.monotonic()
+
+        conn.executemany(
+            "UPDATE entries SET last_access = (SELECT MAX(last_access) + 1 FROM entries) WHERE key = ?",
+            [(key,) for key in touched],
+        )
+        for name, amount in counts.items():
+            self._increment(conn, name, amount)
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting least-recently-used entries if over a limit.
+
+        Args:
+            key: The cache key.
+            value: The string value to cache.
+            ttl: Time-to-live in seconds; defaults to the cache's default_ttl.
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        size = ResponseCache._entry_size(key, value)
+
+        # Values larger than the whole byte budget are never cached
+        if self.max_bytes is not None and size > self.max_bytes:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return
+
+        with self._transaction() as conn:
+            # Recency from buffered lookups must be applied before choosing what to evict
+            self._flush(conn)
+            # last_access is a sequence number rather than a timestamp so LRU order has no ties
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(last_access), 0) + 1 FROM entries))",
+                (key, value, expires_at, size),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # Caller must hold a write transaction
+        count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        over_entries = self.max_entries is not None and count > self.max_entries
+        over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+        if not (over_entries or over_bytes):
+            return
+
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if not ((self.max_entries is not None and count > self.max_entries)
+                    or (self.max_bytes is not None and total_bytes > self.max_bytes)):
+                break
+            evicted.append((key,))
+            count -= 1
+            total_bytes -= size
+
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._increment(conn, "evictions", len(evicted))
+
+    def delete(self, key):
+        """Remove a key from the cache if present."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        """
+        Remove every key starting with a prefix, for every worker sharing the database.
+
+        Returns:
+            The number of entries removed.
+        """
+        with self._transaction() as conn:
+            # substr() rather than LIKE, so '%' and '_' in the prefix match literally
+            return conn.execute(
+                "DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            ).rowcount
+
+    def clear(self):
+        """Remove all entries for every worker sharing the database. Statistics are kept."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """
+        Return cache statistics aggregated across all workers.
+
+        Returns:
+            A dict with entry count, size in bytes, limits and hit/miss/eviction counters.
+        """
+        with self._transaction() as conn:
+            self._flush(conn)
+        conn = self._connection()
+        count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "backend": "sqlite",
+            "entries": count,
+            "bytes": total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "evictions": counters["evictions"],
+            "expirations": counters["expirations"],
+        }
+
+    def __contains__(self, key):
+        row = self._connection().execute(
+            "SELECT 1 FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class _ImmediateTransaction:
+    """Context manager running a block inside a BEGIN IMMEDIATE transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+def create_response_cache(backend="memory", **kwargs):
+    """
+    Create a response cache for the given backend.
+
+    Args:
+        backend: "memory" for a per-process cache or "sqlite" for a cache shared between workers.
+        **kwargs: Passed to the cache constructor.
+
+    Returns:
+        A ResponseCache or SQLiteResponseCache.
+    """
+    if backend == "sqlite":
+        return SQLiteResponseCache(**kwargs)
+    if backend == "memory":
+        kwargs.pop("path", None)
+        return ResponseCache(**kwargs)
+    raise ValueError(f"Unknown response cache backend: {backend}")
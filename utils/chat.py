@@ -1,9 +1,21 @@
 import os
 import json
 import re
-from groq import Groq
+import asyncio
+import hashlib
 import logging
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.intent_matcher import IntentMatcher
+from utils.singleflight import SingleFlight
+from utils.circuit_breaker import CircuitBreaker
+from utils.deadline import Deadline
+from utils.cache import INSTANCE_DIR, create_response_cache
+from utils.semantic_cache import SemanticCache
+from utils.metrics import MetricsRegistry
+from utils.context import build_context
+from utils.pdf_processor import count_tokens, iter_regex_sentence_spans
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,13 +23,90 @@ logger = logging.getLogger(__name__)
 
 # Set up Groq API for better responses
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "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")
-groq_client = Groq(api_key=GROQ_API_KEY)
 
-# Thread-local storage for context
-thread_context = threading.local()
-
-# Cache for storing previous responses to prevent duplicates
-response_cache = {}
+# Explicit timeouts so a slow Groq API can't hold a request for the SDK's default 60 seconds.
+# GROQ_BASE_URL (read by the SDK) points the clients at another server, e.g. benchmarks.fake_groq.
+GROQ_READ_TIMEOUT = float(os.environ.get("GROQ_READ_TIMEOUT", "30"))
+GROQ_CONNECT_TIMEOUT = float(os.environ.get("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_MAX_CONNECTIONS = int(os.environ.get("GROQ_MAX_CONNECTIONS", "200"))
+
+# The SDK's own retries would multiply the time a failing call takes; the request budget and the
+# circuit breaker below decide instead when to stop waiting for Groq.
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "0"))
+
+# Each chat request has CHAT_REQUEST_BUDGET seconds in total. The Groq call gets what is left after
+# retrieval, and isn't made at all if less than GROQ_MIN_CALL_SECONDS remain.
+CHAT_REQUEST_BUDGET = float(os.environ.get("CHAT_REQUEST_BUDGET", "10"))
+GROQ_MIN_CALL_SECONDS = 0.25
+
+# Budget for a whole /chat-api/batch request; Groq calls still queued when it runs out get fallbacks
+BATCH_REQUEST_BUDGET = float(os.environ.get("BATCH_REQUEST_BUDGET", "30"))
+
+# After GROQ_BREAKER_FAILURES consecutive failed or timed out calls, Groq isn't called for
+# GROQ_BREAKER_COOLDOWN seconds and questions get the fallback answer straight away
+groq_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get("GROQ_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.environ.get("GROQ_BREAKER_COOLDOWN", "30")),
+)
+
+# The Groq SDK takes a few hundred milliseconds to import, so its clients are created on first use.
+# groq_client is still available as a module attribute (see __getattr__ below) and can be patched in tests.
+_groq_client_lock = threading.Lock()
+
+# One pooled async client per event loop, created on first use
+_async_groq_clients = {}
+
+# Concurrent identical questions wait on one shared Groq call
+groq_flight = SingleFlight()
+
+# Maximum number of Groq calls made concurrently for one batch request
+BATCH_LLM_CONCURRENCY = int(os.environ.get("BATCH_LLM_CONCURRENCY", "8"))
+
+# Latency and answer path metrics, served on /metrics.
+# Directory shared by all gunicorn workers, so /metrics reports totals for the whole server; set it
+# to an empty string to report the serving worker only
+metrics = MetricsRegistry(directory=os.environ.get("METRICS_DIR", os.path.join(INSTANCE_DIR, "metrics")))
+stage_seconds = metrics.histogram(
+    "chatbot_stage_duration_seconds", "Time spent in each stage of answering a chat message", ["stage"]
+)
+answers_total = metrics.counter(
+    "chatbot_answers_total", "Chat answers by the path that produced them", ["path"]
+)
+groq_requests_total = metrics.counter(
+    "chatbot_groq_requests_total", "Calls made to the Groq API by outcome", ["outcome"]
+)
+groq_breaker_trips_total = metrics.counter(
+    "chatbot_groq_breaker_trips_total", "Times the Groq circuit breaker opened"
+)
+fallbacks_total = metrics.counter(
+    "chatbot_fallbacks_total", "Fallback answers served instead of a Groq answer, by reason", ["reason"]
+)
+prompt_tokens = metrics.histogram(
+    "chatbot_prompt_tokens", "Approximate tokens in each prompt sent to the Groq API, by part", ["part"],
+    buckets=(25, 50, 100, 200, 400, 800, 1600, 3200, 6400),
+)
+
+# Retrieved documents are cut down to their most relevant sentences, up to this many tokens of context
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "250"))
+CONTEXT_MAX_DOCUMENTS = int(os.environ.get("CONTEXT_MAX_DOCUMENTS", "2"))
+
+# Cache for storing previous responses to prevent duplicates.
+# Predefined answers never expire; generated answers expire after LLM_CACHE_TTL seconds.
+# Set RESPONSE_CACHE_BACKEND=sqlite to share the cache between gunicorn workers.
+LLM_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_LLM_TTL", "3600"))
+response_cache = create_response_cache(
+    os.environ.get("RESPONSE_CACHE_BACKEND", "memory"),
+    path=os.environ.get("RESPONSE_CACHE_PATH"),
+    max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+)
+
+# Near-duplicate questions ("whats the payback period") reuse the answer cached for an earlier phrasing.
+# Off unless SEMANTIC_CACHE_MAX_ENTRIES is set, as a wrong match serves the answer to another question.
+semantic_cache = SemanticCache(
+    threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.8")),
+    max_entries=int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "0")),
+)
 
 # System prompt with case study context for Groq LLM
 SYSTEM_PROMPT = """You are a specialized assistant for the Rubber Bumper case study.
@@ -36,6 +125,111 @@ Here's key information about Rubber Bumper Co:
 - Payback period would be 5 years (company target is 4 years)
 - Key risks: uncertain market growth, marketing challenges, employee training
 """
+SYSTEM_PROMPT_TOKENS = count_tokens(SYSTEM_PROMPT)
+
+# System prompt for case studies uploaded to other namespaces, which only have retrieved context
+NAMESPACE_SYSTEM_PROMPT = """You are a specialized assistant for the "{namespace}" case study.
+Provide direct, concise answers with no unnecessary text.
+Answer only from the context provided with each question; if it doesn't contain the answer, say so.
+Just give the direct answer to the question in a single short sentence or paragraph.
+"""
+NAMESPACE_FALLBACK_RESPONSE = "I'm having trouble answering right now. Please try again in a moment."
+
+# Greetings and common phrases answered before the predefined questions
+GREETINGS = ("hello", "hi ", "hey", "greetings", "howdy", "good morning", "good afternoon", "good evening")
+THANKS = ("thank you", "thanks", "appreciate", "grateful")
+BOT_QUESTIONS = ("who are you", "what are you", "what can you do", "how do you work", "what do you know")
+
+# Comprehensive dictionary of predefined questions and direct answers
+QA_DICT = {
+    # Company information
+    "company name": "Rubber Bumper Co.",
+    "name of the company": "Rubber Bumper Co.",
+    "what is the company": "Rubber Bumper Co.",
+    "who is the company": "Rubber Bumper Co.",
+    "about the company": "Rubber Bumper Co is a small family-owned producer of rubber products.",
+    "tell me about rubber bumper": "Rubber Bumper Co is a small family-owned producer of rubber products that sells rubber bands and condoms with highest quality on the market.",
+    "what does rubber bumper do": "Rubber Bumper Co produces and sells rubber bands and condoms.",
+    "what type of company": "Rubber Bumper Co is a small family-owned manufacturing company.",
+    "company size": "Rubber Bumper Co is a small family-owned company with two factories.",
+
+    # Products
+    "what products": "Rubber Bumper Co sells two products: rubber bands and condoms.",
+    "what product": "Rubber Bumper Co sells two products: rubber bands and condoms.",
+    "what does rubber bumper make": "Rubber Bumper Co makes rubber bands and condoms.",
+    "what does rubber bumper sell": "Rubber Bumper Co sells rubber bands and condoms.",
+    "how many products": "Rubber Bumper Co sells two products: rubber bands and condoms.",
+    "compare products": "Rubber Bumper Co sells rubber bands and condoms. The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
+
+    # Market position
+    "market position": "Rubber Bumper is the market leader in both their product industries (rubber bands and condoms).",
+    "market share": "In the rubber band market, Rubber Bumper's share has decreased from 4 million pounds in 2011 to 2 million pounds in 2017. In the condom market, they've grown from 1 million units in 2011 to 10 million in 2017.",
+    "industry position": "Rubber Bumper is the market leader in both their product industries.",
+    "leader": "Rubber Bumper is the market leader in both their product industries.",
+
+    # Sales
+    "topline sales": "Topline sales have remained relatively stable over the last 3 years.",
+    "sales trend": "Topline sales have remained relatively stable over the last 3 years, despite decreasing profits.",
+    "sales history": "Rubber band sales have decreased from 4 million pounds in 2011 to 2 million pounds in 2017. Condom sales have increased from 1 million units in 2011 to 10 million in 2017.",
+
+    # Profitability
+    "decreasing profits": "Rubber Bumper has experienced decreasing profits over the last couple of years, despite stable sales.",
+    "profit": "The condom factory had a profit of $4.5 million in 2017, while the rubber band factory had a profit of $4 million.",
+    "margin": "The condom factory has a 60% profit margin, while the rubber band factory has a 40% profit margin.",
+    "profit margin": "The condom factory has a 60% profit margin, while the rubber band factory has a 40% profit margin.",
+    "profitability": "The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
+    "which is more profitable": "The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
+    "compare profitability": "The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
+
+    # Markets
+    "rubber band market": "The rubber band market has been flat (around 30-31 million pounds annually). Rubber Bumper's share has decreased from 4 million pounds in 2011 to 2 million pounds in 2017. The dominant player (Max Rubber) has increased from 17 to 24 million pounds.",
+    "condom market": "The condom market has grown from 350 million units in 2011 to 450 million in 2017 (30% growth). Rubber Bumper's sales grew from 1 million to 10 million units but have plateaued since 2014.",
+    "market growth": "The rubber band market has been flat, while the condom market has grown 30% from 2011 to 2017.",
+    "market trend": "The rubber band market has been flat, while the condom market has shown strong growth (30% from 2011 to 2017).",
+    "market trends": "The rubber band market has been flat, while the condom market has shown strong growth (30% from 2011 to 2017).",
+    "what are the market trends": "The rubber band market has been flat, while the condom market has shown strong growth (30% from 2011 to 2017).",
+
+    # Factories
+    "factory": "Rubber Bumper has two factories: a larger rubber band factory with $4 million annual overhead, and a smaller condom factory with $2 million annual overhead.",
+    "factories": "Rubber Bumper has two factories: a larger rubber band factory with $4 million annual overhead, and a smaller condom factory with $2 million annual overhead.",
+    "production": "Rubber Bumper produces rubber bands in one factory and condoms in another factory.",
+    "how many factories": "Rubber Bumper has two factories - one for rubber bands and one for condoms.",
+
+    # Factory conversion
+    "convert factory": "Converting the rubber band factory to produce condoms would cost $2 million and take 1 year. After conversion, the factory could produce 20 million condoms total, with a potential profit of $11 million. The payback period would be approximately 5 years.",
+    "convert the factory": "Converting the rubber band factory to produce condoms would cost $2 million and take 1 year. After conversion, the factory could produce 20 million condoms total, with a potential profit of $11 million. The payback period would be approximately 5 years.",
+    "conversion": "Converting the rubber band factory to produce condoms would cost $2 million and take 1 year. After conversion, the factory could produce 20 million condoms total, with a potential profit of $11 million. The payback period would be approximately 5 years.",
+    "should they convert": "Converting the factory has long-term benefits but the 5-year payback period exceeds the company's 4-year target. Market research to verify demand for increased condom production is recommended.",
+    "should they convert the factory": "Converting the factory has long-term benefits but the 5-year payback period exceeds the company's 4-year target. Market research to verify demand for increased condom production is recommended.",
+
+    # Recommendations
+    "recommendation": "The company should first invest in market research to verify demand for increased condom production, while also exploring ways to reduce conversion costs to improve project economics.",
+    "what should they do": "The company should first invest in market research to verify demand for increased condom production, while also exploring ways to reduce conversion costs to improve project economics.",
+    "best option": "The best option is to first verify market demand for increased condom production before committing to the factory conversion, as the payback period currently exceeds their target.",
+
+    # Risks
+    "risk": "Key risks include: assuming Rubber Bumper can triple condom sales immediately, potential rebound in rubber band demand, political changes affecting the condom market, less product diversification, and employee resistance.",
+    "risks": "Key risks include: assuming Rubber Bumper can triple condom sales immediately, potential rebound in rubber band demand, political changes affecting the condom market, less product diversification, and employee resistance.",
+    "concern": "Key concerns include: the 5-year payback period exceeds the company's 4-year target, the assumption of tripling condom sales immediately may be unrealistic, and loss of product diversification increases market risk.",
+
+    # Competitors
+    "competitor": "In rubber bands, the main competitor is Max Rubber (24 million pounds in 2017). In condoms, major competitors are Spartan (115 million units) and Durable (170 million units).",
+    "competitors": "In rubber bands, the main competitor is Max Rubber (24 million pounds in 2017). In condoms, major competitors are Spartan (115 million units) and Durable (170 million units).",
+    "who are the competitors": "In rubber bands, the main competitor is Max Rubber. In condoms, major competitors are Spartan and Durable.",
+
+    # Financial details
+    "revenue": "The rubber band factory generates $10 million in revenue. The condom factory generates $7.5 million in revenue.",
+    "cost": "Variable costs for the rubber band factory are $2 million, with $4 million overhead. Variable costs for the condom factory are $1 million, with $2 million overhead.",
+    "overhead": "The rubber band factory has $4 million in annual overhead. The condom factory has $2 million in annual overhead.",
+
+    # President
+    "president": "The company has recently appointed a new President who noticed decreasing profits over the last couple of years.",
+    "new president": "The company has recently appointed a new President who noticed decreasing profits over the last couple of years.",
+    "who is the president": "The case study mentions that Rubber Bumper Co has recently appointed a new President who noticed decreasing profits."
+}
+
+# Matcher built once at import; extra intents can be registered with intent_matcher.add_intent
+intent_matcher = IntentMatcher(QA_DICT)
 
 def get_direct_response(user_message):
     """
@@ -51,269 +245,717 @@ def get_direct_response(user_message):
     message_lower = user_message.lower().strip()
 
     # Check if we've seen this exact question before
-    if message_lower in response_cache:
+    cached_response = response_cache.get(message_lower)
+    if cached_response is not None:
         logger.info(f"Using cached response for: {message_lower}")
-        return response_cache[message_lower]
+        return cached_response
+
+    return match_direct_response(message_lower)
+
+def match_direct_response(message_lower):
+    """
+    Match a message against the predefined questions, without checking the cache first.
+
+    Args:
+        message_lower: The lowercased, stripped user message.
 
+    Returns:
+        A string containing the response if a matching question is found, otherwise None.
+    """
     # Handle greetings and common phrases
-    greetings = ["hello", "hi ", "hey", "greetings", "howdy", "good morning", "good afternoon", "good evening"]
-    for greeting in greetings:
+    for greeting in GREETINGS:
         if greeting in message_lower and len(message_lower) < len(greeting) + 5:
             response = "Hello! I'm your Rubber Bumper case study assistant. How can I help you?"
             response_cache[message_lower] = response
             return response
 
     # Handle thank you messages
-    thanks = ["thank you", "thanks", "appreciate", "grateful"]
-    for thank in thanks:
+    for thank in THANKS:
         if thank in message_lower and len(message_lower) < len(thank) + 10:
             response = "You're welcome!"
             response_cache[message_lower] = response
             return response
 
     # Handle questions about the chatbot
-    bot_questions = ["who are you", "what are you", "what can you do", "how do you work", "what do you know"]
-    for question in bot_questions:
+    for question in BOT_QUESTIONS:
         if question in message_lower:
             response = "I'm a specialized assistant for the Rubber Bumper case study. I can answer questions about their products, market position, financial data, and strategic options."
             response_cache[message_lower] = response
             return response
 
-    # Comprehensive dictionary of predefined questions and direct answers
-    qa_dict = {
-        # Company information
-        "company name": "Rubber Bumper Co.",
-        "name of the company": "Rubber Bumper Co.",
-        "what is the company": "Rubber Bumper Co.",
-        "who is the company": "Rubber Bumper Co.",
-        "about the company": "Rubber Bumper Co is a small family-owned producer of rubber products.",
-        "tell me about rubber bumper": "Rubber Bumper Co is a small family-owned producer of rubber products that sells rubber bands and condoms with highest quality on the market.",
-        "what does rubber bumper do": "Rubber Bumper Co produces and sells rubber bands and condoms.",
-        "what type of company": "Rubber Bumper Co is a small family-owned manufacturing company.",
-        "company size": "Rubber Bumper Co is a small family-owned company with two factories.",
-
-        # Products
-        "what products": "Rubber Bumper Co sells two products: rubber bands and condoms.",
-        "what product": "Rubber Bumper Co sells two products: rubber bands and condoms.",
-        "what does rubber bumper make": "Rubber Bumper Co makes rubber bands and condoms.",
-        "what does rubber bumper sell": "Rubber Bumper Co sells rubber bands and condoms.",
-        "how many products": "Rubber Bumper Co sells two products: rubber bands and condoms.",
-        "compare products": "Rubber Bumper Co sells rubber bands and condoms. The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
-
-        # Market position
-        "market position": "Rubber Bumper is the market leader in both their product industries (rubber bands and condoms).",
-        "market share": "In the rubber band market, Rubber Bumper's share has decreased from 4 million pounds in 2011 to 2 million pounds in 2017. In the condom market, they've grown from 1 million units in 2011 to 10 million in 2017.",
-        "industry position": "Rubber Bumper is the market leader in both their product industries.",
-        "leader": "Rubber Bumper is the market leader in both their product industries.",
-
-        # Sales
-        "topline sales": "Topline sales have remained relatively stable over the last 3 years.",
-        "sales trend": "Topline sales have remained relatively stable over the last 3 years, despite decreasing profits.",
-        "sales history": "Rubber band sales have decreased from 4 million pounds in 2011 to 2 million pounds in 2017. Condom sales have increased from 1 million units in 2011 to 10 million in 2017.",
-
-        # Profitability
-        "decreasing profits": "Rubber Bumper has experienced decreasing profits over the last couple of years, despite stable sales.",
-        "profit": "The condom factory had a profit of $4.5 million in 2017, while the rubber band factory had a profit of $4 million.",
-        "margin": "The condom factory has a 60% profit margin, while the rubber band factory has a 40% profit margin.",
-        "profit margin": "The condom factory has a 60% profit margin, while the rubber band factory has a 40% profit margin.",
-        "profitability": "The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
-        "which is more profitable": "The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
-        "compare profitability": "The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin.",
-
-        # Markets
-        "rubber band market": "The rubber band market has been flat (around 30-31 million pounds annually). Rubber Bumper's share has decreased from 4 million pounds in 2011 to 2 million pounds in 2017. The dominant player (Max Rubber) has increased from 17 to 24 million pounds.",
-        "condom market": "The condom market has grown from 350 million units in 2011 to 450 million in 2017 (30% growth). Rubber Bumper's sales grew from 1 million to 10 million units but have plateaued since 2014.",
-        "market growth": "The rubber band market has been flat, while the condom market has grown 30% from 2011 to 2017.",
-        "market trend": "The rubber band market has been flat, while the condom market has shown strong growth (30% from 2011 to 2017).",
-        "market trends": "The rubber band market has been flat, while the condom market has shown strong growth (30% from 2011 to 2017).",
-        "what are the market trends": "The rubber band market has been flat, while the condom market has shown strong growth (30% from 2011 to 2017).",
-
-        # Factories
-        "factory": "Rubber Bumper has two factories: a larger rubber band factory with $4 million annual overhead, and a smaller condom factory with $2 million annual overhead.",
-        "factories": "Rubber Bumper has two factories: a larger rubber band factory with $4 million annual overhead, and a smaller condom factory with $2 million annual overhead.",
-        "production": "Rubber Bumper produces rubber bands in one factory and condoms in another factory.",
-        "how many factories": "Rubber Bumper has two factories - one for rubber bands and one for condoms.",
-
-        # Factory conversion
-        "convert factory": "Converting the rubber band factory to produce condoms would cost $2 million and take 1 year. After conversion, the factory could produce 20 million condoms total, with a potential profit of $11 million. The payback period would be approximately 5 years.",
-        "convert the factory": "Converting the rubber band factory to produce condoms would cost $2 million and take 1 year. After conversion, the factory could produce 20 million condoms total, with a potential profit of $11 million. The payback period would be approximately 5 years.",
-        "conversion": "Converting the rubber band factory to produce condoms would cost $2 million and take 1 year. After conversion, the factory could produce 20 million condoms total, with a potential profit of $11 million. The payback period would be approximately 5 years.",
-        "should they convert": "Converting the factory has long-term benefits but the 5-year payback period exceeds the company's 4-year target. Market research to verify demand for increased condom production is recommended.",
-        "should they convert the factory": "Converting the factory has long-term benefits but the 5-year payback period exceeds the company's 4-year target. Market research to verify demand for increased condom production is recommended.",
-
-        # Recommendations
-        "recommendation": "The company should first invest in market research to verify demand for increased condom production, while also exploring ways to reduce conversion costs to improve project economics.",
-        "what should they do": "The company should first invest in market research to verify demand for increased condom production, while also exploring ways to reduce conversion costs to improve project economics.",
-        "best option": "The best option is to first verify market demand for increased condom production before committing to the factory conversion, as the payback period currently exceeds their target.",
-
-        # Risks
-        "risk": "Key risks include: assuming Rubber Bumper can triple condom sales immediately, potential rebound in rubber band demand, political changes affecting the condom market, less product diversification, and employee resistance.",
-        "risks": "Key risks include: assuming Rubber Bumper can triple condom sales immediately, potential rebound in rubber band demand, political changes affecting the condom market, less product diversification, and employee resistance.",
-        "concern": "Key concerns include: the 5-year payback period exceeds the company's 4-year target, the assumption of tripling condom sales immediately may be unrealistic, and loss of product diversification increases market risk.",
-
-        # Competitors
-        "competitor": "In rubber bands, the main competitor is Max Rubber (24 million pounds in 2017). In condoms, major competitors are Spartan (115 million units) and Durable (170 million units).",
-        "competitors": "In rubber bands, the main competitor is Max Rubber (24 million pounds in 2017). In condoms, major competitors are Spartan (115 million units) and Durable (170 million units).",
-        "who are the competitors": "In rubber bands, the main competitor is Max Rubber. In condoms, major competitors are Spartan and Durable.",
-
-        # Financial details
-        "revenue": "The rubber band factory generates $10 million in revenue. The condom factory generates $7.5 million in revenue.",
-        "cost": "Variable costs for the rubber band factory are $2 million, with $4 million overhead. Variable costs for the condom factory are $1 million, with $2 million overhead.",
-        "overhead": "The rubber band factory has $4 million in annual overhead. The condom factory has $2 million in annual overhead.",
-
-        # President
-        "president": "The company has recently appointed a new President who noticed decreasing profits over the last couple of years.",
-        "new president": "The company has recently appointed a new President who noticed decreasing profits over the last couple of years.",
-        "who is the president": "The case study mentions that Rubber Bumper Co has recently appointed a new President who noticed decreasing profits."
-    }
-
-    # First check for exact matches with the whole question
-    if message_lower in qa_dict:
-        response = qa_dict[message_lower]
+    # Exact match first, then score-based matching for partial matches
+    response = intent_matcher.match(message_lower)
+    if response:
         response_cache[message_lower] = response
         return response
 
-    # Score-based matching for partial matches
-    best_match = None
-    best_score = 0
+    # No good match found
+    return None
 
-    # Split the user message into words for better matching
-    message_words = set(message_lower.split())
+# Terms that mark a longer question as being about Rubber Bumper
+RUBBER_TERMS = ("rubber", "bumper", "band", "condom", "factory", "profit", "market",
+                "competitor", "conversion", "president", "margin", "payback", "company",
+                "product", "sales", "recommendation", "risk", "convert")
 
-    for key, answer in qa_dict.items():
-        # Skip very short keys that might cause false matches
-        if len(key) < 4:
-            continue
+INVALID_MESSAGE_RESPONSE = "Please ask me a question about Rubber Bumper Co."
+OFF_TOPIC_RESPONSE = "I can only answer questions about Rubber Bumper Co."
+EMPTY_ANSWER_RESPONSE = "Rubber Bumper Co makes rubber bands and condoms."
+FALLBACK_RESPONSE = "The rubber band market has been flat, while the condom market has grown 30% from 2011 to 2017. The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin."
 
-        # Calculate match score based on word overlap
-        key_words = set(key.split())
-        overlap = message_words.intersection(key_words)
+# Answers longer than this are cut to their first paragraph
+MAX_ANSWER_LENGTH = 300
 
-        # Score is based on number of matching words and their proportion to key length
-        if overlap:
-            score = len(overlap) / max(len(message_words), len(key_words))
+GROQ_COMPLETION_PARAMS = {
+    "model": "llama3-8b-8192",  # Using Llama 3 model for fast, efficient responses
+    "temperature": 0.2,         # Low temperature for more factual responses
+    "max_tokens": 300,          # Limit response length for conciseness
+    "top_p": 0.95,              # High precision for accurate answers
+}
 
-            # Boost score for keys that are fully contained in the message
-            if key in message_lower:
-                score += 0.5
+def is_off_topic(message_lower):
+    """Return True for longer messages that don't mention any Rubber Bumper term."""
+    # Only enforce Rubber Bumper relevance for longer queries
+    return len(message_lower.split()) > 3 and not any(term in message_lower for term in RUBBER_TERMS)
 
-            # Update best match if this score is higher
-            if score > best_score:
-                best_score = score
-                best_match = answer
+def build_messages(user_message, context=None, system_prompt=None):
+    """
+    Build the chat messages sent to Groq.
 
-    # Return the best match if it exceeds a threshold
-    if best_score > 0.4:
-        response_cache[message_lower] = best_match
-        return best_match
+    Args:
+        user_message: A string containing the user's message.
+        context: Optional retrieved context appended to the system prompt.
+        system_prompt: System prompt to use instead of the Rubber Bumper one.
 
-    # No good match found
+    Returns:
+        A list of message dicts.
+    """
+    base_prompt = SYSTEM_PROMPT if system_prompt is None else system_prompt
+    if context:
+        logger.info("Using enhanced prompt with context")
+        system_prompt = base_prompt + "\n\nAdditional context for this question:\n" + context
+    else:
+        system_prompt = base_prompt
+
+    counts = {"system": SYSTEM_PROMPT_TOKENS if base_prompt is SYSTEM_PROMPT else count_tokens(base_prompt),
+              "context": count_tokens(context) if context else 0,
+              "message": count_tokens(user_message)}
+    for part, tokens in counts.items():
+        prompt_tokens.observe(tokens, part=part)
+    prompt_tokens.observe(sum(counts.values()), part="total")
+    logger.info(f"Prompt tokens: {sum(counts.values())} ({counts['context']} context)")
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+def finalize_answer(answer):
+    """
+    Clean up a generated answer.
+
+    Args:
+        answer: The raw generated text.
+
+    Returns:
+        The stripped answer, cut to its first paragraph if it is too long.
+    """
+    answer = answer.strip()
+
+    # Make sure the answer is concise - take first paragraph only if needed
+    if len(answer) > MAX_ANSWER_LENGTH:
+        answer = answer.split('\n\n')[0]
+
+    return answer
+
+def answer_from_context(context):
+    """
+    Build an answer from retrieved context, for when the Groq API can't be used.
+
+    Args:
+        context: The retrieved context, or None.
+
+    Returns:
+        The leading sentences of the best matching document, up to about
+        MAX_ANSWER_LENGTH characters, or None if there is no context.
+    """
+    if not context:
+        return None
+
+    paragraph = context.split("\n\n")[0]
+    answer = ""
+    for start, end in iter_regex_sentence_spans(paragraph):
+        sentence = paragraph[start:end].strip()
+        if answer and len(answer) + 1 + len(sentence) > MAX_ANSWER_LENGTH:
+            break
+        answer = f"{answer} {sentence}".strip()
+    return answer or None
+
+def get_fallback_response(user_message, context=None):
+    """
+    Get a response when the Groq API fails or isn't called.
+
+    The answer is cached only while the circuit breaker is open, until it
+    would try Groq again, so questions get generated answers once it has
+    recovered; a fallback for a failure the breaker tolerates isn't cached,
+    so the next request for the question tries Groq again.
+
+    Args:
+        user_message: A string containing the user's message.
+        context: Optional retrieved context to answer from.
+
+    Returns:
+        A direct response if one matches, otherwise the leading sentences of
+        the retrieved context, otherwise a general default response.
+    """
+    # Try to get a direct response
+    direct_response = get_direct_response(user_message)
+    if direct_response:
+        return direct_response
+
+    # If no direct response, answer from the retrieved context or with a default response
+    answer = answer_from_context(context) or FALLBACK_RESPONSE
+    cooldown = groq_breaker.cooldown_remaining()
+    if cooldown > 0:
+        response_cache.set(user_message.lower().strip(), answer, ttl=cooldown)
+    return answer
+
+def groq_call_timeout(deadline):
+    """
+    Decide whether a Groq call may be made now, and with which timeout.
+
+    Args:
+        deadline: The request's Deadline, or None for no request budget.
+
+    Returns:
+        A (timeout, reason) tuple: the httpx timeout for the call and None, or
+        None and the fallback reason ("deadline" or "circuit_open") if no call
+        should be made.
+    """
+    read_timeout = GROQ_READ_TIMEOUT
+    if deadline is not None:
+        read_timeout = min(read_timeout, deadline.remaining())
+        if read_timeout < GROQ_MIN_CALL_SECONDS:
+            return None, "deadline"
+
+    # Checked last, as a half-open breaker lets only one trial call through
+    if not groq_breaker.allow():
+        return None, "circuit_open"
+    return groq_timeout(read_timeout), None
+
+def record_groq_success():
+    """Count a successful Groq call."""
+    groq_requests_total.inc(outcome="ok")
+    groq_breaker.record_success()
+
+def record_groq_failure(error):
+    """
+    Count a failed Groq call, opening the circuit breaker after repeated failures.
+
+    Args:
+        error: The exception raised by the Groq client.
+
+    Returns:
+        The fallback reason, "timeout" or "error".
+    """
+    reason = "timeout" if is_timeout_error(error) else "error"
+    logger.error(f"Groq API {reason}: {str(error)}")
+    groq_requests_total.inc(outcome=reason)
+    if groq_breaker.record_failure():
+        groq_breaker_trips_total.inc()
+    return reason
+
+def is_timeout_error(error):
+    """Return whether an exception raised by a Groq client is a timeout."""
+    import httpx
+    if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+        return True
+    from groq import APITimeoutError
+    return isinstance(error, APITimeoutError)
+
+def fallback(user_message, context, reason):
+    """
+    Return the fallback answer for a question Groq didn't answer.
+
+    Args:
+        user_message: A string containing the user's message.
+        context: Retrieved context, or None.
+        reason: Why there is no Groq answer: "error", "timeout", "deadline" or "circuit_open".
+
+    Returns:
+        An (answer, "fallback") tuple.
+    """
+    if reason in ("deadline", "circuit_open"):
+        logger.warning(f"Skipping Groq API call ({reason}): {user_message}")
+    fallbacks_total.inc(reason=reason)
+    return get_fallback_response(user_message, context), "fallback"
+
+def answer_without_llm(message_lower):
+    """
+    Return a cached or off-topic answer that makes a Groq call unnecessary.
+
+    Args:
+        message_lower: The lowercased, stripped user message.
+
+    Returns:
+        An (answer, path) tuple where path is "cache" or "off_topic", or
+        (None, None) if the question needs the Groq API.
+    """
+    # Check if we've seen this exact question before in the cache
+    cached_response = response_cache.get(message_lower)
+    if cached_response is not None:
+        logger.info(f"Using cached Groq response for: {message_lower}")
+        return cached_response, "cache"
+
+    return answer_similar_or_off_topic(message_lower)
+
+def answer_similar_or_off_topic(message_lower):
+    """
+    Return the cached answer to a similar question, or the off-topic answer.
+
+    Args:
+        message_lower: The lowercased, stripped user message.
+
+    Returns:
+        An (answer, path) tuple where path is "cache" or "off_topic", or
+        (None, None) if the question needs the Groq API.
+    """
+    # Check for an earlier answer to a differently worded version of the question
+    match = semantic_cache.lookup(message_lower)
+    if match is not None:
+        key, similarity = match
+        cached_response = response_cache.get(key)
+        if cached_response is not None:
+            logger.info(f"Using cached Groq response for similar question ({similarity:.2f}): {key}")
+            return cached_response, "cache"
+        # The answer has expired or been evicted
+        semantic_cache.discard(key)
+
+    # Check if the user message is related to Rubber Bumper
+    if is_off_topic(message_lower):
+        response_cache.set(message_lower, OFF_TOPIC_RESPONSE, ttl=LLM_CACHE_TTL)
+        return OFF_TOPIC_RESPONSE, "off_topic"
+
+    return None, None
+
+def answer_locally(user_message):
+    """
+    Answer a message without the vector store or the LLM, if possible.
+
+    Checks the response cache, the predefined answers, similar cached
+    questions and the off-topic rule in that order, timing each stage.
+
+    Args:
+        user_message: A string containing the user's message.
+
+    Returns:
+        An (answer, path) tuple where path is "invalid", "cache", "direct" or
+        "off_topic", or (None, None) if the question needs the Groq API.
+    """
+    # Check if the message is empty or too short
+    if not user_message or len(user_message.strip()) < 2:
+        return INVALID_MESSAGE_RESPONSE, "invalid"
+
+    message_lower = user_message.lower().strip()
+
+    with stage_seconds.time(stage="cache_lookup"):
+        cached_response = response_cache.get(message_lower)
+    if cached_response is not None:
+        logger.info(f"Using cached response for: {message_lower}")
+        return cached_response, "cache"
+
+    # Try to get a direct response to common questions first
+    with stage_seconds.time(stage="direct_match"):
+        direct_response = match_direct_response(message_lower)
+    if direct_response:
+        return direct_response, "direct"
+
+    with stage_seconds.time(stage="semantic_lookup"):
+        return answer_similar_or_off_topic(message_lower)
+
+def get_predefined_response(user_message):
+    """
+    Return the predefined answer to a message, or None.
+
+    Predefined answers depend only on the message, so unlike generated
+    answers they can be cached by browsers and proxies.
+
+    Args:
+        user_message: A string containing the user's message.
+
+    Returns:
+        A string containing the predefined answer, or None if no question matches.
+    """
+    if not user_message or len(user_message.strip()) < 2:
+        return None
+
+    with stage_seconds.time(stage="direct_match"):
+        answer = match_direct_response(user_message.lower().strip())
+    if answer:
+        answers_total.inc(path="direct")
+        return answer
     return None
 
-def get_groq_response(user_message):
+def completion_text(response):
+    """Return the cleaned-up text of a Groq completion, or a default answer if it is empty."""
+    answer = None
+    if response and response.choices and len(response.choices) > 0 and response.choices[0].message:
+        answer = response.choices[0].message.content
+
+    return finalize_answer(answer) if answer and answer.strip() else EMPTY_ANSWER_RESPONSE
+
+def answer_from_completion(message_lower, response):
+    """
+    Extract, clean up and cache the answer from a Groq completion.
+
+    Args:
+        message_lower: The lowercased, stripped user message used as cache key.
+        response: A chat completion returned by the Groq client.
+
+    Returns:
+        A string containing the answer.
+    """
+    answer = completion_text(response)
+
+    # Cache the response for future use
+    response_cache.set(message_lower, answer, ttl=LLM_CACHE_TTL)
+    semantic_cache.add(message_lower, message_lower)
+    return answer
+
+def flight_key(message_lower, context):
+    """
+    Return the key identifying duplicate in-flight Groq requests.
+
+    Args:
+        message_lower: The lowercased, stripped user message.
+        context: The retrieved context sent with the message, or None.
+
+    Returns:
+        A hashable key; requests with the same message and context share it.
+    """
+    context_digest = hashlib.sha1(context.encode("utf-8")).hexdigest() if context else None
+    return (" ".join(message_lower.split()), context_digest)
+
+def get_groq_response(user_message, context=None, deadline=None):
     """
     Get a response from the Groq API for Rubber Bumper questions.
 
+    Concurrent requests for the same message and context share one Groq call.
+
     Args:
         user_message: A string containing the user's message.
+        context: Optional retrieved context to answer from.
+        deadline: Optional Deadline bounding the Groq call.
 
     Returns:
         A string containing the generated response.
     """
-    # Check if we've seen this exact question before in the cache
     message_lower = user_message.lower().strip()
-    if message_lower in response_cache:
-        logger.info(f"Using cached Groq response for: {message_lower}")
-        return response_cache[message_lower]
+    with stage_seconds.time(stage="semantic_lookup"):
+        answer, path = answer_without_llm(message_lower)
 
-    try:
-        # Check if the user message is related to Rubber Bumper
-        rubber_terms = ["rubber", "bumper", "band", "condom", "factory", "profit", "market",
-                       "competitor", "conversion", "president", "margin", "payback", "company",
-                       "product", "sales", "recommendation", "risk", "convert"]
-
-        # Only enforce Rubber Bumper relevance for longer queries
-        if len(message_lower.split()) > 3 and not any(term in message_lower for term in rubber_terms):
-            response = "I can only answer questions about Rubber Bumper Co."
-            response_cache[message_lower] = response
-            return response
+    if answer is None:
+        answer, path = ask_groq(user_message, message_lower, context, deadline)
+
+    answers_total.inc(path=path)
+    return answer
+
+def ask_groq(user_message, message_lower, context, deadline=None):
+    """
+    Get an answer from Groq, sharing the call with concurrent identical requests.
+
+    Requests that join a call already in flight wait for it even if their
+    own deadline is earlier.
+
+    Args:
+        user_message: A string containing the user's message.
+        message_lower: The lowercased, stripped user message used as cache key.
+        context: Retrieved context appended to the system prompt, or None.
+        deadline: Optional Deadline bounding the Groq call.
+
+    Returns:
+        An (answer, path) tuple where path is "llm" or "fallback".
+    """
+    with stage_seconds.time(stage="groq"):
+        return groq_flight.do(
+            flight_key(message_lower, context),
+            lambda: request_groq_answer(user_message, message_lower, context, deadline),
+        )
+
+def request_groq_answer(user_message, message_lower, context, deadline=None):
+    """
+    Call the Groq API and return the cleaned-up answer, or a fallback.
 
+    The fallback is used without calling Groq when the deadline is too close
+    or the circuit breaker is open, and when the call fails or times out.
+
+    Args:
+        user_message: A string containing the user's message.
+        message_lower: The lowercased, stripped user message used as cache key.
+        context: Retrieved context appended to the system prompt, or None.
+        deadline: Optional Deadline bounding the Groq call.
+
+    Returns:
+        An (answer, path) tuple where path is "llm" or "fallback".
+    """
+    timeout, reason = groq_call_timeout(deadline)
+    if timeout is None:
+        return fallback(user_message, context, reason)
+
+    try:
         # Get response from Groq API
         logger.info(f"Sending request to Groq API: {user_message}")
+        response = get_groq_client().chat.completions.create(
+            messages=build_messages(user_message, context),
+            timeout=timeout,
+            **GROQ_COMPLETION_PARAMS
+        )
+    except Exception as e:
+        # If API fails, fall back to a direct or context answer
+        return fallback(user_message, context, record_groq_failure(e))
 
-        # Get context from thread local storage if available
-        context = getattr(thread_context, 'context', None)
-
-        # Prepare messages with context if available
-        if context:
-            enhanced_prompt = SYSTEM_PROMPT + "\n\nAdditional context for this question:\n" + context
-            messages = [
-                {"role": "system", "content": enhanced_prompt},
-                {"role": "user", "content": user_message}
-            ]
-            logger.info("Using enhanced prompt with context")
-        else:
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_message}
-            ]
-
-        response = groq_client.chat.completions.create(
-            model="llama3-8b-8192",  # Using Llama 3 model for fast, efficient responses
-            messages=messages,
-            temperature=0.2,  # Low temperature for more factual responses
-            max_tokens=300,   # Limit response length for conciseness
-            top_p=0.95        # High precision for accurate answers
+    record_groq_success()
+    return answer_from_completion(message_lower, response), "llm"
+
+def groq_timeout(read_timeout=None):
+    """
+    Return the connect and read timeouts for Groq API calls.
+
+    Args:
+        read_timeout: Optional read timeout in seconds, shorter than GROQ_READ_TIMEOUT.
+    """
+    import httpx
+    read_timeout = GROQ_READ_TIMEOUT if read_timeout is None else read_timeout
+    return httpx.Timeout(read_timeout, connect=min(GROQ_CONNECT_TIMEOUT, read_timeout))
+
+def get_groq_client():
+    """Return the shared Groq client, creating it on first use."""
+    global groq_client
+    client = globals().get("groq_client")
+    if client is None:
+        with _groq_client_lock:
+            client = globals().get("groq_client")
+            if client is None:
+                from groq import Groq
+                client = groq_client = Groq(api_key=GROQ_API_KEY, timeout=groq_timeout(),
+                                           max_retries=GROQ_MAX_RETRIES)
+    return client
+
+def __getattr__(name):
+    if name == "groq_client":
+        return get_groq_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_async_groq_client():
+    """
+    Return the pooled async Groq client for the running event loop.
+
+    The client shares one HTTP connection pool between all requests served
+    by the loop, so a single process can keep many Groq calls in flight.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_groq_clients.get(loop)
+    if client is None:
+        # Drop clients belonging to loops that have been closed
+        for old_loop in [old_loop for old_loop in _async_groq_clients if old_loop.is_closed()]:
+            del _async_groq_clients[old_loop]
+
+        import httpx
+        from groq import AsyncGroq
+        timeout = groq_timeout()
+        http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=GROQ_MAX_CONNECTIONS,
+                                max_keepalive_connections=GROQ_MAX_CONNECTIONS),
         )
+        client = AsyncGroq(api_key=GROQ_API_KEY, timeout=timeout, http_client=http_client,
+                           max_retries=GROQ_MAX_RETRIES)
+        _async_groq_clients[loop] = client
+    return client
+
+async def close_async_groq_client():
+    """Close the async Groq client of the running event loop, if any."""
+    client = _async_groq_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+async def get_groq_response_async(user_message, context=None, deadline=None):
+    """
+    Get a response from the Groq API without blocking the event loop.
 
-        # Extract and return the generated text
-        if response and response.choices and len(response.choices) > 0 and response.choices[0].message:
-            answer = response.choices[0].message.content
-            if answer:
-                answer = answer.strip()
-
-                # Make sure the answer is concise - take first paragraph only if needed
-                if len(answer) > 300:
-                    # Try to find the first paragraph break
-                    paragraphs = answer.split('\n\n')
-                    if paragraphs:
-                        answer = paragraphs[0]
-
-                # Cache the response for future use
-                response_cache[message_lower] = answer
-                return answer
-            else:
-                default_response = "Rubber Bumper Co makes rubber bands and condoms."
-                response_cache[message_lower] = default_response
-                return default_response
-        else:
-            default_response = "Rubber Bumper Co makes rubber bands and condoms."
-            response_cache[message_lower] = default_response
-            return default_response
+    Async counterpart of get_groq_response, using the pooled async client.
+    Concurrent requests for the same message and context share one Groq call.
+
+    Args:
+        user_message: A string containing the user's message.
+        context: Optional retrieved context appended to the system prompt.
+        deadline: Optional Deadline bounding the Groq call.
+
+    Returns:
+        A string containing the generated response.
+    """
+    message_lower = user_message.lower().strip()
+    with stage_seconds.time(stage="semantic_lookup"):
+        answer, path = answer_without_llm(message_lower)
 
+    if answer is None:
+        answer, path = await ask_groq_async(user_message, message_lower, context, deadline)
+
+    answers_total.inc(path=path)
+    return answer
+
+async def ask_groq_async(user_message, message_lower, context, deadline=None):
+    """Async counterpart of ask_groq."""
+    with stage_seconds.time(stage="groq"):
+        return await groq_flight.do_async(
+            flight_key(message_lower, context),
+            lambda: request_groq_answer_async(user_message, message_lower, context, deadline),
+        )
+
+async def request_groq_answer_async(user_message, message_lower, context, deadline=None):
+    """Async counterpart of request_groq_answer, using the pooled async client."""
+    timeout, reason = groq_call_timeout(deadline)
+    if timeout is None:
+        return fallback(user_message, context, reason)
+
+    try:
+        logger.info(f"Sending async request to Groq API: {user_message}")
+        response = await get_async_groq_client().chat.completions.create(
+            messages=build_messages(user_message, context),
+            timeout=timeout,
+            **GROQ_COMPLETION_PARAMS
+        )
     except Exception as e:
-        # If API fails, log the error and fall back to direct response
-        logger.error(f"Groq API error: {str(e)}")
+        # If API fails, fall back to a direct or context answer
+        return fallback(user_message, context, record_groq_failure(e))
 
-        # Try to get a direct response
-        direct_response = get_direct_response(user_message)
-        if direct_response:
-            return direct_response
+    record_groq_success()
+    return answer_from_completion(message_lower, response), "llm"
 
-        # If no direct response, return a default response
-        default_response = "The rubber band market has been flat, while the condom market has grown 30% from 2011 to 2017. The condom business is more profitable with a 60% margin compared to the rubber band business with a 40% margin."
-        response_cache[message_lower] = default_response
-        return default_response
+def stream_groq_response(user_message, context=None, deadline=None):
+    """
+    Stream a response from the Groq API as tokens arrive.
 
+    Cached and off-topic answers are produced as a single event. Generated
+    text is forwarded as it arrives, except that text after the first
+    paragraph break is held back until it is known whether the answer will be
+    cut to its first paragraph, so the streamed text always matches the final
+    answer that get_groq_response would return and cache.
 
-def get_context_from_vector_store(user_message, vector_store, max_results=2):
+    Args:
+        user_message: A string containing the user's message.
+        context: Optional retrieved context appended to the system prompt.
+        deadline: Optional Deadline bounding the wait for the Groq response.
+
+    Yields:
+        ("token", text) tuples as text becomes available, then one ("done", answer) tuple.
+    """
+    message_lower = user_message.lower().strip()
+    with stage_seconds.time(stage="semantic_lookup"):
+        answer, path = answer_without_llm(message_lower)
+
+    if answer is not None:
+        answers_total.inc(path=path)
+        yield "done", answer
+        return
+
+    start_time = time.perf_counter()
+    path = yield from stream_groq_answer(user_message, message_lower, context, deadline)
+    stage_seconds.observe(time.perf_counter() - start_time, stage="groq")
+    answers_total.inc(path=path)
+
+def stream_groq_answer(user_message, message_lower, context, deadline=None):
+    """
+    Stream an answer from the Groq API; the streaming part of stream_groq_response.
+
+    The deadline bounds the wait for the response and for each chunk, not
+    the whole stream, so long answers aren't cut off once text is flowing.
+
+    Args:
+        user_message: A string containing the user's message.
+        message_lower: The lowercased, stripped user message used as cache key.
+        context: Retrieved context appended to the system prompt, or None.
+        deadline: Optional Deadline bounding the wait for the Groq response.
+
+    Yields:
+        ("token", text) tuples as text becomes available, then one ("done", answer) tuple.
+
+    Returns:
+        "llm", or "fallback" if the Groq API failed before any text was sent.
+    """
+    timeout, reason = groq_call_timeout(deadline)
+    if timeout is None:
+        answer, path = fallback(user_message, context, reason)
+        yield "done", answer
+        return path
+
+    logger.info(f"Streaming request to Groq API: {user_message}")
+    try:
+        stream = get_groq_client().chat.completions.create(
+            messages=build_messages(user_message, context),
+            stream=True,
+            timeout=timeout,
+            **GROQ_COMPLETION_PARAMS
+        )
+    except Exception as e:
+        answer, path = fallback(user_message, context, record_groq_failure(e))
+        yield "done", answer
+        return path
+
+    raw = ""
+    emitted = 0
+    failed = False
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            raw += delta
+            text = raw.lstrip()
+
+            # Text up to the first paragraph break is always part of the answer;
+            # trailing whitespace is held in case it ends the answer
+            paragraph_end = text.find('\n\n')
+            if paragraph_end != -1 and len(text.strip()) > MAX_ANSWER_LENGTH:
+                # The answer will be cut to its first paragraph, so stop reading
+                break
+            safe_end = len(text.rstrip()) if paragraph_end == -1 else min(paragraph_end, len(text.rstrip()))
+
+            if safe_end > emitted:
+                yield "token", text[emitted:safe_end]
+                emitted = safe_end
+    except Exception as e:
+        reason = record_groq_failure(e)
+        if not emitted:
+            answer, path = fallback(user_message, context, reason)
+            yield "done", answer
+            return path
+        failed = True
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()
+
+    answer = finalize_answer(raw) if raw.strip() else EMPTY_ANSWER_RESPONSE
+    if len(answer) > emitted:
+        yield "token", answer[emitted:]
+
+    # Don't cache an answer cut short by an error
+    if not failed:
+        record_groq_success()
+        response_cache.set(message_lower, answer, ttl=LLM_CACHE_TTL)
+        semantic_cache.add(message_lower, message_lower)
+    yield "done", answer
+    return "llm"
+
+
+def get_context_from_vector_store(user_message, vector_store, max_results=None, token_budget=None):
     """
     Get relevant context from the vector store based on the user's message.
 
     Args:
         user_message: A string containing the user's message.
         vector_store: A VectorStore object containing the document vectors.
-        max_results: Maximum number of results to return.
+        max_results: Maximum number of documents to draw sentences from; defaults to CONTEXT_MAX_DOCUMENTS.
+        token_budget: Maximum approximate tokens of context; defaults to CONTEXT_TOKEN_BUDGET.
 
     Returns:
         A string containing the relevant context.
@@ -322,16 +964,48 @@ def get_context_from_vector_store(user_message, vector_store, max_results=2):
         return ""
 
     # Search for relevant documents
-    results = vector_store.search(user_message, top_k=max_results)
+    results = vector_store.search(user_message, top_k=max_results or CONTEXT_MAX_DOCUMENTS)
+    return context_from_documents(user_message, results, vector_store, token_budget)
+
+def context_from_documents(user_message, documents, vector_store=None, token_budget=None):
+    """
+    Build the prompt context from search results.
+
+    Args:
+        user_message: A string containing the user's message.
+        documents: A list of (document, score) tuples from a vector store search.
+        vector_store: The VectorStore searched, used to score sentences.
+        token_budget: Maximum approximate tokens of context; defaults to CONTEXT_TOKEN_BUDGET.
 
-    if not results:
+    Returns:
+        The most relevant sentences of the relevant documents, or "" if none are relevant.
+    """
+    documents = [(doc, score) for doc, score in documents if score > 0.2]
+    if not documents:
         return ""
+    return build_context(user_message, documents, vector_store,
+                         CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget)
+
+def retrieve_context(user_message, vector_store):
+    """
+    Get the vector store context for a message, timing the retrieval stage.
+
+    Args:
+        user_message: A string containing the user's message.
+        vector_store: A VectorStore object containing the document vectors.
+
+    Returns:
+        The context string, or None if too little relevant context was found.
+    """
+    with stage_seconds.time(stage="retrieval"):
+        context = get_context_from_vector_store(user_message, vector_store)
 
-    # Combine the relevant documents into a context string
-    context = "\n\n".join([doc for doc, score in results if score > 0.2])
-    return context
+    if context and len(context) > 50:
+        logger.info(f"Using vector store context for: {user_message}")
+        return context
+    return None
 
-def get_chat_response(user_message, vector_store, max_context_length=None):
+def get_chat_response(user_message, vector_store, max_context_length=None, deadline=None):
     """
     Generate a direct response to a user message about Rubber Bumper.
 
@@ -339,33 +1013,273 @@ def get_chat_response(user_message, vector_store, max_context_length=None):
         user_message: A string containing the user's message.
         vector_store: A VectorStore object containing the document vectors.
         max_context_length: Deprecated parameter, kept for backward compatibility.
+        deadline: Deadline for the whole answer; defaults to CHAT_REQUEST_BUDGET seconds from now.
 
     Returns:
         A string containing the generated response.
     """
-    # Check if the message is empty or too short
+    if deadline is None:
+        deadline = Deadline(CHAT_REQUEST_BUDGET)
+
+    # Cached, predefined and off-topic answers need neither retrieval nor the LLM
+    answer, path = answer_locally(user_message)
+
+    if answer is None:
+        # Get relevant context from the vector store and ask the Groq API with the time left
+        context = retrieve_context(user_message, vector_store)
+        answer, path = ask_groq(user_message, user_message.lower().strip(), context, deadline)
+
+    answers_total.inc(path=path)
+    return answer
+
+def namespace_cache_key(namespace, user_message=""):
+    """
+    Return the response cache key of a question about another namespace.
+
+    Keys of Rubber Bumper questions are the stripped question itself, so
+    they never start with whitespace; these start with a control character
+    Python treats as whitespace, so the two can't collide, and the ':' after
+    the namespace name (which can't contain one) keeps namespaces apart.
+    Called without a question, returns the prefix shared by all keys of the
+    namespace.
+    """
+    return f"\x1f{namespace}:{' '.join(user_message.lower().split())}"
+
+def get_namespace_chat_response(user_message, vector_store, namespace, deadline=None):
+    """
+    Generate a response to a question about the case study in another namespace.
+
+    Rubber Bumper's predefined answers, topic filter and semantic cache don't
+    apply to other case studies: the answer is generated from the
+    namespace's own retrieved context and cached under a key that includes
+    the namespace.
+
+    Args:
+        user_message: A string containing the user's message.
+        vector_store: The namespace's VectorStore.
+        namespace: The namespace name.
+        deadline: Deadline for the whole answer; defaults to CHAT_REQUEST_BUDGET seconds from now.
+
+    Returns:
+        A string containing the generated response.
+    """
+    if deadline is None:
+        deadline = Deadline(CHAT_REQUEST_BUDGET)
+
     if not user_message or len(user_message.strip()) < 2:
-        return "Please ask me a question about Rubber Bumper Co."
+        answers_total.inc(path="invalid")
+        return "Please ask me a question about the case study."
+
+    key = namespace_cache_key(namespace, user_message)
+    with stage_seconds.time(stage="cache_lookup"):
+        answer = response_cache.get(key)
+    if answer is not None:
+        answers_total.inc(path="cache")
+        return answer
+
+    context = retrieve_context(user_message, vector_store)
+    with stage_seconds.time(stage="groq"):
+        answer, path = groq_flight.do(
+            flight_key(key, context),
+            lambda: request_namespace_answer(user_message, key, context, namespace, deadline),
+        )
+    answers_total.inc(path=path)
+    return answer
 
-    # Try to get a direct response to common questions first
-    direct_response = get_direct_response(user_message)
-    if direct_response:
-        return direct_response
+def request_namespace_answer(user_message, key, context, namespace, deadline=None):
+    """
+    Call the Groq API for a question about another namespace's case study.
 
-    # Get relevant context from the vector store
-    context = get_context_from_vector_store(user_message, vector_store)
+    Falls back to the retrieved context like request_groq_answer, without
+    Rubber Bumper's predefined answers and without caching the fallback.
 
-    # If we have relevant context, store it in thread local storage
-    if context and len(context) > 50:
-        # Log that we're using vector store context
-        logger.info(f"Using vector store context for: {user_message}")
+    Args:
+        user_message: A string containing the user's message.
+        key: The response cache key of the question.
+        context: Retrieved context appended to the system prompt, or None.
+        namespace: The namespace name.
+        deadline: Optional Deadline bounding the Groq call.
 
-        # Store context in thread local storage for use in get_groq_response
-        thread_context.context = context
+    Returns:
+        An (answer, path) tuple where path is "llm" or "fallback".
+    """
+    timeout, reason = groq_call_timeout(deadline)
+    if timeout is None:
+        logger.warning(f"Skipping Groq API call for namespace {namespace} ({reason}): {user_message}")
     else:
-        # Clear any previous context
-        if hasattr(thread_context, 'context'):
-            delattr(thread_context, 'context')
+        try:
+            logger.info(f"Sending request to Groq API for namespace {namespace}: {user_message}")
+            response = get_groq_client().chat.completions.create(
+                messages=build_messages(user_message, context, NAMESPACE_SYSTEM_PROMPT.format(namespace=namespace)),
+                timeout=timeout,
+                **GROQ_COMPLETION_PARAMS
+            )
+        except Exception as e:
+            reason = record_groq_failure(e)
+        else:
+            record_groq_success()
+            reason = None
+
+    if reason is not None:
+        fallbacks_total.inc(reason=reason)
+        return answer_from_context(context) or NAMESPACE_FALLBACK_RESPONSE, "fallback"
+
+    answer = completion_text(response)
+    response_cache.set(key, answer, ttl=LLM_CACHE_TTL)
+    return answer, "llm"
+
+async def get_chat_response_async(user_message, vector_store, deadline=None):
+    """
+    Generate a response to a user message without blocking the event loop.
+
+    Async counterpart of get_chat_response: direct answers and retrieval run
+    inline as they are fast, and only the Groq call is awaited.
+
+    Args:
+        user_message: A string containing the user's message.
+        vector_store: A VectorStore object containing the document vectors.
+        deadline: Deadline for the whole answer; defaults to CHAT_REQUEST_BUDGET seconds from now.
+
+    Returns:
+        A string containing the generated response.
+    """
+    if deadline is None:
+        deadline = Deadline(CHAT_REQUEST_BUDGET)
+
+    answer, path = answer_locally(user_message)
+
+    if answer is None:
+        context = retrieve_context(user_message, vector_store)
+        answer, path = await ask_groq_async(user_message, user_message.lower().strip(), context, deadline)
+
+    answers_total.inc(path=path)
+    return answer
+
+def get_chat_responses_batch(user_messages, vector_store, max_concurrency=None, deadline=None):
+    """
+    Generate responses to many user messages at once.
+
+    Direct and cached answers are resolved first. Context for the remaining
+    messages is retrieved with a single vectorized search, and their Groq
+    calls run concurrently on at most max_concurrency threads, with one call
+    per distinct message and context.
+
+    Args:
+        user_messages: A list of strings containing the users' messages.
+        vector_store: A VectorStore object containing the document vectors.
+        max_concurrency: Maximum number of concurrent Groq calls; defaults to BATCH_LLM_CONCURRENCY.
+        deadline: Deadline shared by every Groq call of the batch; defaults to
+            BATCH_REQUEST_BUDGET seconds from now.
+
+    Returns:
+        A list with one dict per message, in input order, holding the
+        "response", its "source" (invalid, cache, direct, off_topic, llm or fallback),
+        the retrieved "sources" with their scores, and per-stage "timings" in seconds.
+    """
+    if max_concurrency is None:
+        max_concurrency = BATCH_LLM_CONCURRENCY
+    if deadline is None:
+        deadline = Deadline(BATCH_REQUEST_BUDGET)
+
+    results = []
+    needs_llm = []
+
+    # Resolve everything that doesn't need the LLM
+    for index, user_message in enumerate(user_messages):
+        start_time = time.time()
+        response, source = answer_locally(user_message)
+        if response is None:
+            needs_llm.append(index)
+        else:
+            answers_total.inc(path=source)
+
+        results.append({
+            "response": response,
+            "source": source,
+            "sources": [],
+            "timings": {"lookup": round(time.time() - start_time, 4), "retrieval": 0.0, "llm": 0.0},
+        })
+
+    if not needs_llm:
+        return results
+
+    # One search over the vector store for every remaining message
+    start_time = time.time()
+    with stage_seconds.time(stage="retrieval"):
+        if vector_store:
+            retrieved = vector_store.search_many([user_messages[index] for index in needs_llm],
+                                                 top_k=CONTEXT_MAX_DOCUMENTS)
+        else:
+            retrieved = [[] for _ in needs_llm]
+        contexts = [context_from_documents(user_messages[index], documents, vector_store)
+                    for index, documents in zip(needs_llm, retrieved)]
+    retrieval_time = round(time.time() - start_time, 4)
+
+    # Group identical questions so each distinct one costs a single Groq call
+    calls = {}
+    for index, documents, context in zip(needs_llm, retrieved, contexts):
+        documents = [(doc, score) for doc, score in documents if score > 0.2]
+        if len(context) <= 50:
+            context = None
+
+        results[index]["sources"] = [{"score": round(float(score), 4), "text": doc.strip()[:200]} for doc, score in documents]
+        results[index]["timings"]["retrieval"] = retrieval_time
+
+        message_lower = user_messages[index].lower().strip()
+        key = flight_key(message_lower, context)
+        if key not in calls:
+            calls[key] = (user_messages[index], message_lower, context, [])
+        calls[key][3].append(index)
+
+    def call_groq(user_message, message_lower, context):
+        start_time = time.time()
+        response, path = ask_groq(user_message, message_lower, context, deadline)
+        return response, path, round(time.time() - start_time, 4)
+
+    logger.info(f"Batch of {len(user_messages)} messages needs {len(calls)} Groq calls")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(calls))), thread_name_prefix="batch-llm") as executor:
+        futures = {
+            executor.submit(call_groq, user_message, message_lower, context): indexes
+            for user_message, message_lower, context, indexes in calls.values()
+        }
+        for future, indexes in futures.items():
+            response, path, llm_time = future.result()
+            for index in indexes:
+                results[index]["response"] = response
+                results[index]["source"] = path
+                results[index]["timings"]["llm"] = llm_time
+                answers_total.inc(path=path)
+
+    return results
+
+def stream_chat_response(user_message, vector_store, deadline=None):
+    """
+    Stream a response to a user message about Rubber Bumper.
+
+    Cached, direct and off-topic answers are produced as a single event;
+    other questions are streamed from the Groq API with vector store context.
+
+    Args:
+        user_message: A string containing the user's message.
+        vector_store: A VectorStore object containing the document vectors.
+        deadline: Deadline for the Groq response to start; defaults to CHAT_REQUEST_BUDGET seconds from now.
+
+    Yields:
+        ("token", text) tuples as text becomes available, then one ("done", answer) tuple.
+    """
+    if deadline is None:
+        deadline = Deadline(CHAT_REQUEST_BUDGET)
+
+    answer, path = answer_locally(user_message)
+    if answer is not None:
+        answers_total.inc(path=path)
+        yield "done", answer
+        return
+
+    # Get relevant context from the vector store
+    context = retrieve_context(user_message, vector_store)
 
-    # If no direct answer in our database, use Groq API
-    return get_groq_response(user_message)
+    start_time = time.perf_counter()
+    path = yield from stream_groq_answer(user_message, user_message.lower().strip(), context, deadline)
+    stage_seconds.observe(time.perf_counter() - start_time, stage="groq")
+    answers_total.inc(path=path)
@@ -0,0 +1,128 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency for a while.
+
+    The breaker starts closed, letting every call through. After
+    failure_threshold consecutive failures it opens, and calls are rejected
+    without being attempted for reset_timeout seconds. It then lets a single
+    trial call through (half-open): if the trial succeeds the breaker closes,
+    and if it fails the breaker opens for another reset_timeout.
+
+    Callers ask allow() before each call and report the outcome with
+    record_success() or record_failure(). Works for threads and coroutines,
+    as no method blocks.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker.
+            reset_timeout: Seconds the breaker stays open before a trial call.
+            clock: Function returning the current time in seconds.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Close the breaker and clear its counters."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started_at = None
+            self._trips = 0
+            self._rejected = 0
+
+    @property
+    def state(self):
+        """The current state: "closed", "open" or "half_open"."""
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def cooldown_remaining(self):
+        """Return the seconds until an open breaker lets a trial call through, or 0 if it isn't open."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow(self):
+        """
+        Return whether a call may be made now.
+
+        In the half-open state only one trial call is allowed at a time; a
+        trial that never reports its outcome is replaced after reset_timeout.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_started_at = None
+
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and (self._trial_started_at is None
+                                                  or now - self._trial_started_at >= self.reset_timeout):
+                self._trial_started_at = now
+                return True
+
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        """Report a successful call, closing the breaker."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_started_at = None
+
+    def record_failure(self):
+        """
+        Report a failed call.
+
+        Returns:
+            True if this failure opened the breaker.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == self.OPEN:
+                return False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_started_at = None
+                self._trips += 1
+                logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures; "
+                               f"retrying in {self.reset_timeout:.0f}s")
+                return True
+            return False
+
+    def stats(self):
+        """Return the state, consecutive failures, trips and rejected calls."""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
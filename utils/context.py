@@ -0,0 +1,109 @@
+import logging
+from utils.pdf_processor import count_tokens, iter_regex_sentence_spans
+
+logger = logging.getLogger(__name__)
+
+def split_context_sentences(documents):
+    """
+    Split retrieved documents into distinct sentences.
+
+    Sentences repeated across documents, or contained in a longer sentence
+    (overlapping PDF chunks often start in the middle of one), are kept
+    only once.
+
+    Args:
+        documents: A list of (document, score) tuples, best match first.
+
+    Returns:
+        A list of (document rank, position, sentence) tuples.
+    """
+    sentences = []
+    seen = set()
+    for rank, (document, _) in enumerate(documents):
+        for position, (start, end) in enumerate(iter_regex_sentence_spans(document)):
+            sentence = " ".join(document[start:end].split())
+            key = sentence.lower()
+            if key and key not in seen:
+                seen.add(key)
+                sentences.append((rank, position, sentence))
+
+    # Drop sentences that are part of a longer one
+    keys = sorted(seen, key=len, reverse=True)
+    contained = {key for i, key in enumerate(keys) if any(key in longer for longer in keys[:i])}
+    return [entry for entry in sentences if entry[2].lower() not in contained]
+
+def score_sentences(query, sentences, vector_store=None):
+    """
+    Score sentences by their similarity to the query.
+
+    Uses the vector store's TF-IDF weighting when it has one, so the scores
+    are on the same scale as retrieval scores, and the share of query words
+    a sentence contains otherwise.
+
+    Args:
+        query: The user's message.
+        sentences: A list of sentence strings.
+        vector_store: Optional VectorStore whose weighting is used.
+
+    Returns:
+        A list of scores, one per sentence.
+    """
+    if not sentences:
+        return []
+
+    vectors = vector_store.transform([query] + sentences) if vector_store is not None else None
+    if vectors is not None:
+        return (vectors[1:] @ vectors[0].T).toarray().ravel().tolist()
+
+    query_words = set(query.lower().split())
+    if not query_words:
+        return [0.0] * len(sentences)
+    return [len(query_words & set(sentence.lower().split())) / len(query_words) for sentence in sentences]
+
+def build_context(query, documents, vector_store=None, token_budget=250, min_relative_score=0.25):
+    """
+    Build prompt context from retrieved documents within a token budget.
+
+    Instead of pasting whole documents into the prompt, the documents are
+    split into sentences, duplicates are removed, and the sentences most
+    similar to the query are kept until the budget is used up. Sentences
+    scoring well below the best one are left out even if they fit. The kept
+    sentences are returned in document order, with a blank line between
+    documents.
+
+    Args:
+        query: The user's message.
+        documents: A list of (document, score) tuples, best match first.
+        vector_store: Optional VectorStore whose weighting scores the sentences.
+        token_budget: Maximum approximate number of tokens in the context.
+        min_relative_score: Sentences scoring below this fraction of the best score are dropped.
+
+    Returns:
+        The context string, empty if no sentence fits the budget.
+    """
+    sentences = split_context_sentences(documents)
+    scores = score_sentences(query, [sentence for _, _, sentence in sentences], vector_store)
+
+    # Best sentences first; ties go to the better document and earlier sentences
+    order = sorted(range(len(sentences)), key=lambda i: (-scores[i], sentences[i][0], sentences[i][1]))
+    min_score = scores[order[0]] * min_relative_score if order else 0.0
+    selected = []
+    used = 0
+    for i in order:
+        if scores[i] < min_score or (scores[i] <= 0 and selected):
+            break
+        tokens = count_tokens(sentences[i][2])
+        if used + tokens <= token_budget:
+            selected.append(sentences[i])
+            used += tokens
+
+    selected.sort()
+    paragraphs = []
+    for rank, _, sentence in selected:
+        if paragraphs and paragraphs[-1][0] == rank:
+            paragraphs[-1][1].append(sentence)
+        else:
+            paragraphs.append((rank, [sentence]))
+
+    logger.debug(f"Selected {len(selected)} of {len(sentences)} context sentences ({used} tokens)")
+    return "\n\n".join(" ".join(paragraph) for _, paragraph in paragraphs)
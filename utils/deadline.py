@@ -0,0 +1,30 @@
+import time
+
+class Deadline:
+    """
+    The time by which a request must be answered.
+
+    Created when a request starts and passed down to each stage, so slow
+    stages leave less time for later ones instead of each stage having its
+    own fixed timeout.
+    """
+
+    def __init__(self, seconds, clock=time.monotonic):
+        """
+        Start a deadline.
+
+        Args:
+            seconds: Time allowed from now.
+            clock: Function returning the current time in seconds.
+        """
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self):
+        """Return the seconds left, or 0 once the deadline has passed."""
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self):
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
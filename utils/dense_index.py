@@ -0,0 +1,196 @@
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+class DenseIndex:
+    """
+    Low-dimensional, quantized document vectors for approximate cosine search.
+
+    The L2-normalized TF-IDF matrix is projected onto its top singular
+    vectors (latent semantic analysis), which folds co-occurring terms
+    together so paraphrases score closer than in the sparse space, and fixes
+    the width of a document vector regardless of vocabulary size. Only the
+    columns of terms that occur in the corpus are kept in the projection, so
+    hashed feature spaces don't produce huge component matrices.
+
+    Document vectors are re-normalized and stored as int8 codes with one
+    float32 scale per row, a quarter of the memory of float32 vectors, and
+    queries are scored with dense dot products over cache-sized blocks, which
+    is about as fast as scoring float32 vectors. float16 halves the memory of
+    float32 but numpy converts it slowly, so it is mainly useful when memory
+    matters more than latency. With clusters set, documents are also grouped by
+    k-means, and a query only scores the documents of the n_probe clusters
+    whose centroids are closest to it.
+    """
+
+    QUANTIZATIONS = ("int8", "float16", "float32")
+    BLOCK_ROWS = 1024   # rows converted to float32 at a time, small enough to stay in cache
+
+    def __init__(self, dimensions=128, quantization="int8", clusters=0, n_probe=8, random_state=0):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimensions: Number of latent dimensions.
+            quantization: Storage type of document vectors, "int8", "float16" or "float32".
+            clusters: Number of k-means clusters used to pre-filter documents; 0 scores every document.
+            n_probe: Number of clusters scored per query.
+            random_state: Seed for the SVD and k-means.
+        """
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.clusters = clusters
+        self.n_probe = n_probe
+        self.random_state = random_state
+
+        self.columns = None         # sparse columns used by the projection
+        self.components = None      # dimensions x len(columns)
+        self._positions = None      # sparse column -> position in columns, -1 if unused
+        self.fitted_rows = 0        # number of documents the projection was fit on
+        self.codes = None           # row -> quantized latent vector
+        self.scales = None          # row -> int8 scale
+        self.centroids = None       # cluster -> unit centroid
+        self.cluster_rows = None    # rows ordered by cluster
+        self.cluster_offsets = None # cluster -> first position in cluster_rows
+
+    def fit(self, vectors):
+        """
+        Fit the projection to a document matrix.
+
+        Args:
+            vectors: A sparse matrix of L2-normalized TF-IDF rows.
+        """
+        vectors = vectors.tocsr()
+        columns = np.unique(vectors.indices)
+        dimensions = max(1, min(self.dimensions, len(columns) - 1, vectors.shape[0] - 1))
+        svd = TruncatedSVD(n_components=dimensions, algorithm="randomized", random_state=self.random_state)
+        svd.fit(vectors[:, columns])
+
+        self.columns = columns
+        self.components = svd.components_.astype(np.float32)
+        self.fitted_rows = vectors.shape[0]
+        self._positions = None
+
+    def project(self, vectors):
+        """Project sparse rows into the latent space and L2-normalize them."""
+        vectors = vectors.tocsr()
+        if vectors.shape[0] > 64:
+            latent = (vectors[:, self.columns] @ self.components.T).astype(np.float32)
+            return normalize(latent, norm="l2", copy=False)
+
+        # Few rows, e.g. queries: look up their nonzero columns instead of slicing the matrix
+        if self._positions is None or len(self._positions) != vectors.shape[1]:
+            positions = np.full(vectors.shape[1], -1, dtype=np.int32)
+            positions[self.columns] = np.arange(len(self.columns))
+            self._positions = positions
+        latent = np.zeros((vectors.shape[0], self.components.shape[0]), dtype=np.float32)
+        for row in range(vectors.shape[0]):
+            start, end = vectors.indptr[row], vectors.indptr[row + 1]
+            positions = self._positions[vectors.indices[start:end]]
+            used = positions >= 0
+            latent[row] = self.components[:, positions[used]] @ vectors.data[start:end][used].astype(np.float32)
+        norms = np.linalg.norm(latent, axis=1, keepdims=True)
+        return np.divide(latent, norms, out=latent, where=norms > 0)
+
+    def build(self, vectors):
+        """
+        Project and quantize every document, fitting the projection first if needed.
+
+        Args:
+            vectors: A sparse matrix of L2-normalized TF-IDF rows, one per document.
+        """
+        if self.components is None:
+            self.fit(vectors)
+        latent = self.project(vectors)
+
+        if self.quantization == "int8":
+            self.scales = np.abs(latent).max(axis=1) / 127
+            self.scales[self.scales == 0] = 1.0
+            self.codes = np.rint(latent / self.scales[:, None]).astype(np.int8)
+            self.scales = self.scales.astype(np.float32)
+        else:
+            self.scales = None
+            self.codes = latent.astype(self.quantization)
+
+        if self.clusters:
+            self._build_clusters(latent)
+        else:
+            self.centroids = self.cluster_rows = self.cluster_offsets = None
+
+    def _build_clusters(self, latent):
+        """Group documents by k-means on their unit latent vectors."""
+        n_clusters = min(self.clusters, len(latent))
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=self.random_state, n_init=3,
+                                 batch_size=4096)
+        labels = kmeans.fit_predict(latent)
+
+        self.centroids = normalize(kmeans.cluster_centers_.astype(np.float32), norm="l2")
+        self.cluster_rows = np.argsort(labels, kind="stable")
+        self.cluster_offsets = np.zeros(n_clusters + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_clusters), out=self.cluster_offsets[1:])
+
+    def _score_rows(self, rows, query):
+        """Return the dot products of a latent query with the given document rows (all rows if None)."""
+        if rows is None:
+            scores = np.empty(len(self.codes), dtype=np.float32)
+            for start in range(0, len(self.codes), self.BLOCK_ROWS):
+                block = self.codes[start:start + self.BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+        else:
+            scores = self.codes[rows].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+    def search(self, query_vectors, top_k=3, deleted_rows=None):
+        """
+        Return the top_k documents for each query.
+
+        Args:
+            query_vectors: A sparse matrix of L2-normalized TF-IDF query rows.
+            top_k: Number of documents to return per query.
+            deleted_rows: Optional array of rows that must not be returned.
+
+        Returns:
+            A list with one entry per query, each a list of (row, score) tuples, best first.
+        """
+        queries = self.project(query_vectors)
+        results = []
+        for query in queries:
+            if not query.any():
+                results.append([])
+                continue
+
+            rows = None
+            if self.centroids is not None:
+                n_probe = min(self.n_probe, len(self.centroids))
+                probed = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+                rows = np.concatenate([self.cluster_rows[self.cluster_offsets[c]:self.cluster_offsets[c + 1]]
+                                       for c in probed])
+            scores = self._score_rows(rows, query)
+            if rows is None:
+                rows = np.arange(len(scores))
+
+            if deleted_rows is not None and len(deleted_rows):
+                keep = ~np.isin(rows, deleted_rows)
+                rows, scores = rows[keep], scores[keep]
+            if len(scores) > top_k:
+                top = np.argpartition(-scores, top_k - 1)[:top_k]
+                rows, scores = rows[top], scores[top]
+            order = np.argsort(-scores, kind="stable")
+            results.append([(int(rows[i]), float(scores[i])) for i in order])
+        return results
+
+    @property
+    def nbytes(self):
+        """Memory held by the document vectors, scales and cluster lists, in bytes."""
+        arrays = (self.codes, self.scales, self.cluster_rows, self.cluster_offsets, self.centroids)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def memory_usage(self):
+        """Bytes held by the document vectors and the projection."""
+        arrays = (self.columns, self.components, self._positions)
+        return self.nbytes + sum(array.nbytes for array in arrays if array is not None)
@@ -0,0 +1,370 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import INSTANCE_DIR, _ImmediateTransaction
+from utils.pdf_processor import ingest_pdf
+
+logger = logging.getLogger(__name__)
+
+# Seconds between status writes while a job reports page progress
+STATUS_INTERVAL = 0.5
+
+class IngestionJob:
+    """Status of a document ingestion job."""
+
+    def __init__(self, filename, path, namespace=None, generation=None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.path = path
+        self.namespace = namespace
+        self.generation = generation
+        self.status = "queued"
+        self.pages_processed = 0
+        self.total_pages = None
+        self.chunks_added = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        """Return the job status as a JSON-serializable dict."""
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "namespace": self.namespace,
+            "status": self.status,
+            "pages_processed": self.pages_processed,
+            "total_pages": self.total_pages,
+            "chunks_added": self.chunks_added,
+            "elapsed_time": round(elapsed, 2),
+            "queued_time": round((self.started_at or time.time()) - self.created_at, 2),
+            "error": self.error,
+        }
+
+    # Attributes saved to the log, from which another worker can rebuild the job for status queries
+    SAVED_FIELDS = ("id", "filename", "namespace", "status", "pages_processed", "total_pages", "chunks_added",
+                    "error", "created_at", "started_at", "finished_at")
+
+    def state(self):
+        """Return the job's saved fields as a dict."""
+        return {field: getattr(self, field) for field in self.SAVED_FIELDS}
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a job saved with state(), without its file."""
+        job = cls(state["filename"], None, state["namespace"])
+        for field in cls.SAVED_FIELDS:
+            setattr(job, field, state[field])
+        return job
+
+class IngestionLog:
+    """
+    Ingested chunks and ingestion job statuses, shared between workers through SQLite.
+
+    Every worker holds its own vector stores in memory, so a document
+    uploaded through one worker has to reach the others. Ingestion jobs
+    append their chunks to this log rather than to a store, and each worker
+    applies the chunks it hasn't seen yet before using a store (see sync()),
+    recording how far it got in the store's metadata so that snapshots
+    resume from the same point.
+
+    Each namespace has a generation, which reset() increments when its
+    documents are cleared: workers then rebuild their store, and jobs still
+    appending to the old generation fail, as do jobs appending to a
+    namespace removed with drop(). A namespace created again after being
+    dropped starts from a new generation, so stores left over from before
+    are rebuilt too. Job statuses are kept alongside so any worker can
+    answer status queries.
+    """
+
+    def __init__(self, path=None, timeout=5.0):
+        """
+        Initialize the log, creating the database if needed.
+
+        Args:
+            path: Path to the SQLite database file; defaults to a file in the instance directory.
+            timeout: Seconds to wait for a lock held by another worker.
+        """
+        if path is None:
+            os.makedirs(INSTANCE_DIR, exist_ok=True)
+            path = os.path.join(INSTANCE_DIR, "ingestion.sqlite3")
+        self.path = path
+        self.timeout = timeout
+
+        # Connections are per thread and must not be reused across a fork
+        self._local = threading.local()
+        # Serializes applying chunks, so two requests don't add the same chunks to a store
+        self._sync_lock = threading.Lock()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS namespaces ("
+                "name TEXT PRIMARY KEY, generation INTEGER NOT NULL, last_seq INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, text TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_namespace ON chunks (namespace, seq)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, state TEXT NOT NULL, finished_at REAL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+    def generation(self, namespace):
+        """Return the current generation of a namespace, registering the namespace if it is new."""
+        with self._transaction() as conn:
+            # New namespaces start from the time, so one dropped and created again never repeats a generation
+            conn.execute("INSERT OR IGNORE INTO namespaces (name, generation, last_seq) VALUES (?, ?, 0)",
+                         (namespace, time.time_ns()))
+            return conn.execute("SELECT generation FROM namespaces WHERE name = ?", (namespace,)).fetchone()[0]
+
+    def position(self, namespace):
+        """Return (generation, last chunk sequence number) of a namespace, or None if it isn't registered."""
+        return self._connection().execute(
+            "SELECT generation, last_seq FROM namespaces WHERE name = ?", (namespace,)
+        ).fetchone()
+
+    def append(self, namespace, generation, documents):
+        """
+        Append chunks to a namespace.
+
+        Raises:
+            RuntimeError: If the namespace was cleared or deleted since generation was read.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT generation FROM namespaces WHERE name = ?", (namespace,)).fetchone()
+            if row is None or row[0] != generation:
+                raise RuntimeError(f"Namespace {namespace} was cleared or deleted during ingestion")
+            conn.executemany("INSERT INTO chunks (namespace, text) VALUES (?, ?)",
+                             [(namespace, document) for document in documents])
+            conn.execute(
+                "UPDATE namespaces SET last_seq = (SELECT MAX(seq) FROM chunks WHERE namespace = ?) WHERE name = ?",
+                (namespace, namespace),
+            )
+
+    def reset(self, namespace):
+        """Delete the chunks of a namespace and start a new generation of it."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+            conn.execute("INSERT OR IGNORE INTO namespaces (name, generation, last_seq) VALUES (?, 0, 0)",
+                         (namespace,))
+            conn.execute("UPDATE namespaces SET generation = generation + 1, last_seq = 0 WHERE name = ?",
+                         (namespace,))
+
+    def drop(self, namespace):
+        """Delete the chunks of a namespace and unregister it."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+            conn.execute("DELETE FROM namespaces WHERE name = ?", (namespace,))
+
+    def sync(self, namespace, store):
+        """
+        Bring a store up to date with the log.
+
+        A store whose metadata shows an older generation is cleared first.
+        A store without a recorded position is assumed to hold none of the
+        namespace's chunks.
+
+        Returns:
+            The number of chunks added to the store.
+        """
+        position = self.position(namespace)
+        if position is None or store.metadata.get("ingestion_log") == list(position):
+            return 0
+
+        with self._sync_lock:
+            # Re-read, as another thread may have synced the store while this one waited
+            generation, last_seq = self.position(namespace)
+            applied = store.metadata.get("ingestion_log")
+            if applied is not None and applied[0] != generation:
+                store.clear()
+                applied = None
+            applied_seq = applied[1] if applied is not None else 0
+            if applied_seq >= last_seq:
+                store.metadata["ingestion_log"] = [generation, applied_seq]
+                return 0
+
+            rows = self._connection().execute(
+                "SELECT seq, text FROM chunks WHERE namespace = ? AND seq > ? ORDER BY seq",
+                (namespace, applied_seq),
+            ).fetchall()
+            if rows:
+                store.add_documents([text for _, text in rows])
+                applied_seq = rows[-1][0]
+            store.metadata["ingestion_log"] = [generation, applied_seq]
+            logger.info(f"Applied {len(rows)} ingested chunks to namespace {namespace}")
+            return len(rows)
+
+    def save_job(self, job):
+        """Save the status of a job."""
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO jobs (id, state, finished_at) VALUES (?, ?, ?)",
+                         (job.id, json.dumps(job.state()), job.finished_at))
+
+    def get_job(self, job_id):
+        """Return a job saved by any worker, or None."""
+        row = self._connection().execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return IngestionJob.from_state(json.loads(row[0])) if row is not None else None
+
+    def prune_jobs(self, max_finished_jobs):
+        """Delete all but the most recently finished jobs."""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND id NOT IN "
+                "(SELECT id FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?)",
+                (max_finished_jobs,),
+            )
+
+class _LogWriter:
+    """Stands in for the vector store given to ingest_pdf(), appending the chunks to the log."""
+
+    def __init__(self, log, namespace, generation):
+        self.log = log
+        self.namespace = namespace
+        self.generation = generation
+
+    def add_documents(self, documents):
+        self.log.append(self.namespace, self.generation, documents)
+
+class IngestionQueue:
+    """
+    Background queue that ingests uploaded PDF files into an IngestionLog.
+
+    Jobs run on a small thread pool so request handlers can return as soon as
+    a file is saved. Chunks are appended to the log, from which every worker
+    applies them to its vector stores, and job statuses are saved there so a
+    status query can be answered by any worker. Finished jobs are kept until
+    more than max_finished_jobs have completed.
+    """
+
+    def __init__(self, log, max_workers=1, extraction_workers=None, batch_size=64, max_finished_jobs=100,
+                 on_finished=None):
+        """
+        Initialize the queue.
+
+        Args:
+            log: The IngestionLog that chunks and job statuses are written to.
+            max_workers: Number of jobs processed concurrently.
+            extraction_workers: Processes used to extract pages of each PDF; None extracts sequentially.
+            batch_size: Number of chunks appended to the log at a time.
+            max_finished_jobs: Number of finished jobs kept for status queries.
+            on_finished: Optional callable invoked with each successful job, e.g. to apply its
+                chunks to this worker's store right away.
+        """
+        self.log = log
+        self.extraction_workers = extraction_workers
+        self.batch_size = batch_size
+        self.max_finished_jobs = max_finished_jobs
+        self.on_finished = on_finished
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, filename, path, namespace):
+        """
+        Enqueue a PDF file for ingestion.
+
+        The queue takes ownership of the file and deletes it once the job
+        finishes. The job fails if the namespace is cleared or deleted before
+        it finishes.
+
+        Args:
+            filename: The original name of the uploaded file.
+            path: Path of the saved file.
+            namespace: The namespace the file is ingested into.
+
+        Returns:
+            The IngestionJob.
+        """
+        job = IngestionJob(filename, path, namespace, self.log.generation(namespace))
+        self.log.save_job(job)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        logger.info(f"Queued ingestion job {job.id} for {filename}")
+        return job
+
+    def get(self, job_id):
+        """Return the job with the given ID, whichever worker runs it, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self.log.get_job(job_id)
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        self.log.save_job(job)
+        saved_at = time.monotonic()
+
+        def on_progress(pages_read, total_pages):
+            nonlocal saved_at
+            job.pages_processed = pages_read
+            job.total_pages = total_pages
+            if time.monotonic() - saved_at >= STATUS_INTERVAL:
+                self.log.save_job(job)
+                saved_at = time.monotonic()
+
+        def on_batch(chunks_added):
+            job.chunks_added = chunks_added
+
+        try:
+            position = self.log.position(job.namespace)
+            if position is None or position[0] != job.generation:
+                raise RuntimeError(f"Namespace {job.namespace} was cleared or deleted before ingestion started")
+            with open(job.path, "rb") as f:
+                ingest_pdf(f, _LogWriter(self.log, job.namespace, job.generation), batch_size=self.batch_size,
+                           workers=self.extraction_workers, progress=on_progress, on_batch=on_batch)
+            job.status = "done"
+            logger.info(f"Ingestion job {job.id} added {job.chunks_added} chunks from {job.filename}")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Ingestion job {job.id} failed: {str(e)}", exc_info=True)
+        finally:
+            job.finished_at = time.time()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+
+        if job.status == "done" and self.on_finished:
+            try:
+                self.on_finished(job)
+            except Exception as e:
+                logger.warning(f"Could not apply ingestion job {job.id} to this worker: {str(e)}")
+
+        # Saved last, so once a poll reports the job done this worker's store already has its chunks
+        self.log.save_job(job)
+        with self._lock:
+            del self._jobs[job.id]
+        self.log.prune_jobs(self.max_finished_jobs)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and optionally wait for queued ones to finish."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,144 @@
+import threading
+
+
+class IntentMatcher:
+    """
+    Word-overlap matcher for predefined questions, backed by an inverted index.
+
+    Keys are tokenized once when they are registered, so matching a message
+    only touches the keys that share at least one word with it instead of
+    scanning every entry.
+    """
+
+    def __init__(self, intents=None, min_key_length=4, threshold=0.4):
+        """
+        Initialize the matcher.
+
+        Args:
+            intents: An optional dict mapping question keys to answers.
+            min_key_length: Keys shorter than this are ignored for partial matches.
+            threshold: Minimum score a partial match must exceed to be returned.
+        """
+        self.min_key_length = min_key_length
+        self.threshold = threshold
+
+        self._answers = {}      # key -> answer, exact match lookup
+        self._keys = []         # key position -> key, in registration order
+        self._key_words = []    # key position -> frozenset of the key's words
+        self._positions = {}    # key -> key position
+        self._index = {}        # word -> list of key positions containing it
+        self._lock = threading.Lock()
+
+        if intents:
+            self.add_intents(intents)
+
+    def __len__(self):
+        return len(self._answers)
+
+    def __contains__(self, key):
+        return key in self._answers
+
+    def add_intent(self, key, answer):
+        """
+        Register a question key and its answer.
+
+        Re-registering an existing key replaces its answer but keeps its
+        original position, which is used to break ties between equal scores.
+
+        Args:
+            key: A lowercase question string.
+            answer: The answer returned when the key matches.
+        """
+        with self._lock:
+            if key in self._answers:
+                self._answers[key] = answer
+                return
+
+            position = len(self._keys)
+            words = frozenset(key.split())
+
+            self._keys.append(key)
+            self._key_words.append(words)
+            self._positions[key] = position
+            self._answers[key] = answer
+
+            # Short keys only take part in exact matching
+            if len(key) < self.min_key_length:
+                return
+
+            for word in words:
+                self._index.setdefault(word, []).append(position)
+
+    def add_intents(self, intents):
+        """
+        Register several question keys at once.
+
+        Args:
+            intents: A dict mapping question keys to answers.
+        """
+        for key, answer in intents.items():
+            self.add_intent(key, answer)
+
+    def get(self, key):
+        """Return the answer for an exact key, or None."""
+        return self._answers.get(key)
+
+    def best_match(self, message_lower):
+        """
+        Find the best matching key for a message.
+
+        Scoring is the proportion of overlapping words relative to the longer
+        of the message and key, plus 0.5 when the whole key appears in the
+        message. Ties go to the key that was registered first.
+
+        Args:
+            message_lower: The lowercased, stripped user message.
+
+        Returns:
+            A tuple (answer, score), or (None, 0) if no key shares a word.
+        """
+        message_words = set(message_lower.split())
+
+        # Count overlapping words per candidate key using the index
+        overlaps = {}
+        for word in message_words:
+            for position in self._index.get(word, ()):
+                overlaps[position] = overlaps.get(position, 0) + 1
+
+        best_match = None
+        best_score = 0
+        message_length = len(message_words)
+
+        for position in sorted(overlaps):
+            key = self._keys[position]
+            score = overlaps[position] / max(message_length, len(self._key_words[position]))
+
+            # Boost score for keys that are fully contained in the message
+            if key in message_lower:
+                score += 0.5
+
+            if score > best_score:
+                best_score = score
+                best_match = self._answers[key]
+
+        return best_match, best_score
+
+    def match(self, message_lower):
+        """
+        Return the answer for a message using exact then partial matching.
+
+        Args:
+            message_lower: The lowercased, stripped user message.
+
+        Returns:
+            A string containing the answer, or None if nothing scores above the threshold.
+        """
+        answer = self._answers.get(message_lower)
+        if answer is not None:
+            return answer
+
+        best_match, best_score = self.best_match(message_lower)
+        if best_score > self.threshold:
+            return best_match
+
+        return None
@@ -0,0 +1,370 @@
+import os
+import re
+import json
+import time
+import uuid
+import atexit
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:     # Windows; snapshots of exited workers are then kept as they are
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Snapshot holding the summed metrics of exited processes
+RETIRED_SNAPSHOT = "retired.json"
+
+# Histogram buckets in seconds, from a dictionary lookup up to a slow LLM call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        """Increase the count for the given label values."""
+        key = self._registry._label_values(self, labels)
+        with self._registry._lock:
+            self._registry._check_fork()
+            self._values[key] = self._values.get(key, 0) + amount
+        self._registry._maybe_flush()
+
+    def _samples(self):
+        return [[list(key), value] for key, value in self._values.items()]
+
+    def _reset(self):
+        self._values = {}
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}   # label values -> [bucket counts, sum, count]
+
+    def observe(self, value, **labels):
+        """Record one observation for the given label values."""
+        key = self._registry._label_values(self, labels)
+        with self._registry._lock:
+            self._registry._check_fork()
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+        self._registry._maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager that observes the duration of its block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        return [[list(key), list(counts), total, count] for key, (counts, total, count) in self._values.items()]
+
+    def _reset(self):
+        self._values = {}
+
+class MetricsRegistry:
+    """
+    Collection of counters and histograms rendered in Prometheus text format.
+
+    With a directory, each process periodically writes a snapshot of its
+    metrics to its own file there, and render() merges the snapshots of all
+    processes, so any gunicorn worker can serve totals for the whole server.
+    Snapshot files are named after the host and process ID. When metrics are
+    collected, the snapshots of processes on this host that have exited are
+    added into a single retired snapshot and deleted, so counts never go
+    backwards and files don't pile up as workers are replaced.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        """
+        Initialize the registry.
+
+        Args:
+            directory: Directory shared by all worker processes, or None to report this process only.
+            flush_interval: Minimum seconds between snapshot writes triggered by new observations.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._process_id = self._new_process_id()
+        self._last_flush = 0.0
+        self._flush_timer = None
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def counter(self, name, documentation, labelnames=()):
+        """Create and register a Counter."""
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Create and register a Histogram."""
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    @staticmethod
+    def _label_values(metric, labels):
+        if set(labels) != set(metric.labelnames):
+            raise ValueError(f"{metric.name} expects labels {metric.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in metric.labelnames)
+
+    def _new_process_id(self):
+        return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def _check_fork(self):
+        """Start from zero in a forked worker; the parent's values are in the parent's snapshot."""
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._process_id = self._new_process_id()
+            self._last_flush = 0.0
+            self._flush_timer = None
+            for metric in self._metrics.values():
+                metric._reset()
+
+    def snapshot(self):
+        """Return this process's metrics as a JSON-serializable dict."""
+        with self._lock:
+            self._check_fork()
+            return {
+                name: {
+                    "type": metric.type,
+                    "help": metric.documentation,
+                    "labelnames": list(metric.labelnames),
+                    "buckets": list(getattr(metric, "buckets", ())),
+                    "samples": metric._samples(),
+                }
+                for name, metric in self._metrics.items()
+            }
+
+    def flush(self):
+        """Write this process's snapshot to the shared directory."""
+        if not self.directory:
+            return
+        snapshot = self.snapshot()
+        path = os.path.join(self.directory, f"{self._process_id}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        self._last_flush = time.monotonic()
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def close(self):
+        """Write a final snapshot and stop writing snapshots at exit."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _maybe_flush(self):
+        """Schedule a snapshot write, at most one per flush_interval."""
+        if not self.directory:
+            return
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            delay = max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+            self._flush_timer = threading.Timer(delay, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._flush_timer = None
+        self.flush()
+
+    def collect(self):
+        """Return the metrics of all processes merged into one snapshot."""
+        if not self.directory:
+            return self.snapshot()
+
+        self.flush()
+        self._retire_exited()
+        snapshots = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                # Skips snapshots still being written
+                continue
+            snapshot = self._read(filename)
+            if snapshot is not None:
+                snapshots.append(snapshot["metrics"] if filename == RETIRED_SNAPSHOT else snapshot)
+        return merge_snapshots(snapshots)
+
+    def _read(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Retired by another process since the directory was listed
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics snapshot {filename}: {str(e)}")
+            return None
+
+    def _exited_processes(self):
+        """Return the snapshot files of processes on this host that are no longer running."""
+        prefix = f"{socket.gethostname()}-"
+        exited = []
+        for filename in os.listdir(self.directory):
+            if not filename.startswith(prefix) or not filename.endswith(".json"):
+                continue
+            process_id = filename[:-len(".json")]
+            # Checks the whole name, as another host's name may start with this one's
+            match = re.fullmatch(r"(\d+)-[0-9a-f]{8}", process_id[len(prefix):])
+            if process_id == self._process_id or match is None:
+                continue
+            try:
+                os.kill(int(match.group(1)), 0)
+            except ProcessLookupError:
+                exited.append(filename)
+            except PermissionError:
+                pass    # running as another user
+        return exited
+
+    def _retire_exited(self):
+        """Add the snapshots of exited processes into the retired snapshot and delete them."""
+        if fcntl is None or not self._exited_processes():
+            return
+
+        with open(os.path.join(self.directory, ".retire.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            retired = self._read(RETIRED_SNAPSHOT) or {"processes": [], "metrics": {}}
+            exited = self._exited_processes()
+            # A process listed as retired had its snapshot added before an earlier retirement
+            # was interrupted; its file only needs deleting
+            new = [filename for filename in exited if filename not in retired["processes"]]
+            snapshots = [snapshot for snapshot in map(self._read, new) if snapshot is not None]
+            if snapshots:
+                retired = {"processes": exited,
+                           "metrics": merge_snapshots([retired["metrics"]] + snapshots)}
+                path = os.path.join(self.directory, RETIRED_SNAPSHOT)
+                with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(retired, f)
+                os.replace(f"{path}.tmp", path)
+            for filename in exited:
+                os.remove(os.path.join(self.directory, filename))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        return render_prometheus(self.collect())
+
+def merge_snapshots(snapshots):
+    """
+    Sum metric snapshots from several processes.
+
+    Args:
+        snapshots: A list of dicts returned by MetricsRegistry.snapshot().
+
+    Returns:
+        A single snapshot dict with the samples of all processes added up.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for sample in metric["samples"]:
+                key = tuple(sample[0])
+                current = target["samples"].get(key)
+                if metric["type"] == "counter":
+                    target["samples"][key] = (current or 0) + sample[1]
+                elif current is None:
+                    target["samples"][key] = [list(sample[1]), sample[2], sample[3]]
+                else:
+                    current[0] = [a + b for a, b in zip(current[0], sample[1])]
+                    current[1] += sample[2]
+                    current[2] += sample[3]
+
+    for metric in merged.values():
+        if metric["type"] == "counter":
+            metric["samples"] = [[list(key), value] for key, value in metric["samples"].items()]
+        else:
+            metric["samples"] = [[list(key)] + value for key, value in metric["samples"].items()]
+    return merged
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(labelnames, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+def render_prometheus(snapshot):
+    """
+    Format a metrics snapshot in the Prometheus text exposition format.
+
+    Args:
+        snapshot: A dict returned by MetricsRegistry.snapshot() or merge_snapshots().
+
+    Returns:
+        The exposition text.
+    """
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        labelnames = metric["labelnames"]
+        lines.append(f"# HELP {name} {_escape(metric['help'])}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+
+        for sample in sorted(metric["samples"], key=lambda s: s[0]):
+            values = sample[0]
+            if metric["type"] == "counter":
+                lines.append(f"{name}{_format_labels(labelnames, values)} {_format_value(sample[1])}")
+                continue
+
+            counts, total, count = sample[1], sample[2], sample[3]
+            cumulative = 0
+            for bound, bucket_count in zip(metric["buckets"], counts):
+                cumulative += bucket_count
+                le = (("le", _format_value(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, values)} {_format_value(float(total))}")
+            lines.append(f"{name}_count{_format_labels(labelnames, values)} {count}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,306 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from utils.cache import INSTANCE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Namespace names double as snapshot directory names
+NAMESPACE_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+DEFAULT_NAMESPACE = "rubber-bumper"
+
+class NamespaceRegistry:
+    """
+    Named vector stores, one per case study, within a memory budget.
+
+    Stores are created by a factory on first use and tracked in least
+    recently used order. Whenever a store has been used, its memory is
+    re-measured with VectorStore.memory_usage(), and while the total is over
+    max_bytes the least recently used stores are saved as snapshots under
+    snapshot_dir and dropped. A spilled namespace is reloaded, memory-mapped,
+    the next time it is used. Namespaces in use (see use()) and the default
+    namespace are never spilled. Snapshots are written outside the
+    registry's lock, so other namespaces stay usable meanwhile; a namespace
+    asked for while its snapshot is being written waits for it.
+
+    The snapshot directory is shared by all processes of a deployment: a
+    namespace with a snapshot there is loaded from it rather than rebuilt,
+    whichever process saved it, and namespaces found there at startup are
+    available without being loaded.
+
+    Other processes can create and delete namespaces too. An exists
+    function, if given, is the authority on which namespaces other than the
+    default exist: ones it doesn't know of are forgotten, along with their
+    snapshot, even if loaded here, and ones it knows of but that are neither
+    loaded nor spilled are created with the factory on first use. A refresh
+    function, if given, is called with the name and store each time a store
+    is returned, outside the registry's lock, e.g. to apply documents added
+    to the namespace by other processes.
+    """
+
+    def __init__(self, factory, snapshot_dir=None, max_bytes=None, default=DEFAULT_NAMESPACE, exists=None,
+                 refresh=None):
+        """
+        Initialize the registry.
+
+        Args:
+            factory: Function of a namespace name returning a new VectorStore for it.
+            snapshot_dir: Directory spilled namespaces are saved to; defaults to namespaces/
+                in the instance directory.
+            max_bytes: Memory budget for all loaded stores; None or 0 never spills.
+            default: Name of the namespace that is never spilled.
+            exists: Optional function of a namespace name returning whether it exists.
+            refresh: Optional function of a namespace name and its store, called before the store is used.
+        """
+        self.factory = factory
+        self.exists = exists
+        self.refresh = refresh
+        self.snapshot_dir = snapshot_dir or os.path.join(INSTANCE_DIR, "namespaces")
+        self.max_bytes = max_bytes
+        self.default = default
+
+        self._stores = OrderedDict()    # loaded namespace -> store, least recently used first
+        self._bytes = {}                # loaded namespace -> memory at its last measurement
+        self._in_use = {}               # namespace -> number of active users
+        self._spilled = set(self._find_snapshots())
+        self._spilling = {}             # namespace -> (store, bytes) while its snapshot is written
+        self._unsaved = []              # namespaces taken out of memory whose snapshot isn't being written yet
+        self._lock = threading.RLock()
+        self._spill_done = threading.Condition(self._lock)
+        self._spills = 0
+        self._reloads = 0
+
+    def _find_snapshots(self):
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return [name for name in os.listdir(self.snapshot_dir)
+                if NAMESPACE_PATTERN.match(name) and self._has_snapshot(name)]
+
+    def _has_snapshot(self, name):
+        return os.path.exists(os.path.join(self._snapshot_path(name), "meta.json"))
+
+    def _deleted_elsewhere(self, name):
+        return name != self.default and self.exists is not None and not self.exists(name)
+
+    def _forget(self, name):
+        """Drop a namespace deleted by another process from memory, and its snapshot."""
+        # Caller must hold the lock
+        self._stores.pop(name, None)
+        self._bytes.pop(name, None)
+        self._spilled.discard(name)
+        from utils.vector_store import VectorStore
+        VectorStore.delete_snapshot(self._snapshot_path(name))
+
+    @staticmethod
+    def validate(name):
+        """
+        Check a namespace name.
+
+        Raises:
+            ValueError: If the name is not 1-64 lowercase letters, digits, '-' or '_'.
+        """
+        if not isinstance(name, str) or not NAMESPACE_PATTERN.match(name):
+            raise ValueError("Namespace names must be 1-64 lowercase letters, digits, '-' or '_'")
+        return name
+
+    def __contains__(self, name):
+        if name != self.default and self.exists is not None:
+            return self.exists(name)
+        with self._lock:
+            return name in self._stores or name in self._spilled
+
+    def names(self):
+        """Return the names of all loaded and spilled namespaces."""
+        with self._lock:
+            names = set(self._stores) | set(self._spilling) | self._spilled
+        return sorted(name for name in names if not self._deleted_elsewhere(name))
+
+    def get(self, name, create=False):
+        """
+        Return the store of a namespace, loading or creating it if needed.
+
+        Args:
+            name: The namespace name.
+            create: Whether to create the namespace if it doesn't exist.
+
+        Raises:
+            KeyError: If the namespace doesn't exist and create is False.
+        """
+        with self._lock:
+            store = self._get(name, create)
+        self._save_spilled()
+        if self.refresh is not None:
+            self.refresh(name, store)
+        return store
+
+    def _wait_for_spill(self, name):
+        # Caller must hold the lock, which is released while waiting
+        while name in self._spilling:
+            self._spill_done.wait()
+
+    def _get(self, name, create):
+        self.validate(name)
+        with self._lock:
+            self._wait_for_spill(name)
+            if self._deleted_elsewhere(name):
+                if name in self._stores or name in self._spilled:
+                    self._forget(name)
+                    logger.info(f"Forgot namespace {name}, deleted by another worker")
+                if not create:
+                    raise KeyError(name)
+
+            store = self._stores.get(name)
+            if store is not None:
+                self._stores.move_to_end(name)
+                return store
+
+            if name in self._spilled or self._has_snapshot(name):
+                from utils.vector_store import VectorStore
+                start_time = time.time()
+                try:
+                    store = VectorStore.load(self._snapshot_path(name), mmap=True)
+                    self._reloads += 1
+                    logger.info(f"Reloaded namespace {name} in {time.time() - start_time:.2f}s")
+                except (OSError, ValueError) as e:
+                    # Another worker may be replacing the snapshot; the store is rebuilt instead
+                    logger.warning(f"Could not load the snapshot of namespace {name}: {str(e)}")
+                self._spilled.discard(name)
+
+            if store is None:
+                if not (create or name == self.default or (self.exists is not None and self.exists(name))):
+                    raise KeyError(name)
+                store = self.factory(name)
+                logger.info(f"Created namespace {name}")
+
+            self._stores[name] = store
+            self._bytes[name] = store.memory_usage()
+            self._enforce_budget()
+            return store
+
+    @contextmanager
+    def use(self, name, create=False):
+        """
+        Use the store of a namespace, keeping it loaded until the block exits.
+
+        Its memory is re-measured on exit, as documents may have been added,
+        and other namespaces are spilled if the budget is exceeded.
+        """
+        with self._lock:
+            store = self._get(name, create)
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        try:
+            self._save_spilled()
+            if self.refresh is not None:
+                self.refresh(name, store)
+            yield store
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                if not self._in_use[name]:
+                    del self._in_use[name]
+                if self._stores.get(name) is store:
+                    self._bytes[name] = store.memory_usage()
+                    self._enforce_budget()
+            self._save_spilled()
+
+    def memory_usage(self):
+        """Return the measured memory of all loaded stores, in bytes."""
+        with self._lock:
+            return sum(self._bytes.values())
+
+    def _enforce_budget(self):
+        """
+        Take least recently used namespaces out of memory until the loaded stores fit the budget.
+
+        The caller must hold the lock, and call _save_spilled() once it has
+        released it to write their snapshots.
+        """
+        if not self.max_bytes:
+            return
+        for name in list(self._stores):
+            if self.memory_usage() <= self.max_bytes:
+                return
+            if name != self.default and name not in self._in_use:
+                self._start_spill(name)
+        if self.memory_usage() > self.max_bytes:
+            logger.warning(f"Namespaces use {self.memory_usage()} bytes, over the budget of {self.max_bytes}, "
+                           f"but none can be spilled")
+
+    def spill(self, name):
+        """Save a loaded namespace to its snapshot and drop it from memory."""
+        with self._lock:
+            self._start_spill(name)
+        self._save_spilled()
+
+    def _start_spill(self, name):
+        # Caller must hold the lock
+        self._spilling[name] = (self._stores.pop(name), self._bytes.pop(name))
+        self._unsaved.append(name)
+
+    def _save_spilled(self):
+        """Write the snapshots of namespaces taken out of memory, without holding the lock."""
+        while True:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                name = self._unsaved.pop(0)
+                store, freed = self._spilling[name]
+
+            try:
+                os.makedirs(self.snapshot_dir, exist_ok=True)
+                store.save(self._snapshot_path(name))
+            except Exception as e:
+                logger.error(f"Could not spill namespace {name}; keeping it loaded: {str(e)}", exc_info=True)
+                saved = False
+            else:
+                logger.info(f"Spilled namespace {name} ({freed} bytes) to {self._snapshot_path(name)}")
+                saved = True
+
+            with self._lock:
+                del self._spilling[name]
+                if saved:
+                    self._spilled.add(name)
+                    self._spills += 1
+                else:
+                    self._stores[name] = store
+                    self._bytes[name] = freed
+                self._spill_done.notify_all()
+
+    def drop(self, name):
+        """
+        Delete a namespace and its snapshot.
+
+        Other processes forget the namespace once the exists function stops
+        reporting it, so whatever it reads from must be updated too.
+        """
+        with self._lock:
+            if name == self.default:
+                raise ValueError("The default namespace cannot be deleted")
+            self._wait_for_spill(name)
+            if name not in self:
+                raise KeyError(name)
+            self._forget(name)
+
+    def _snapshot_path(self, name):
+        return os.path.join(self.snapshot_dir, name)
+
+    def stats(self):
+        """Return the memory budget and the state of every namespace as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "loaded_bytes": self.memory_usage(),
+                "spills": self._spills,
+                "reloads": self._reloads,
+                "namespaces": {
+                    name: {"loaded": name in self._stores, "bytes": self._bytes.get(name),
+                           "documents": len(self._stores[name]) if name in self._stores else None}
+                    for name in self.names()
+                },
+            }
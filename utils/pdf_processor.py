@@ -1,50 +1,390 @@
-import io
+import os
 import re
-import PyPDF2
-import nltk
-from nltk.tokenize import sent_tokenize
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-# Download NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+# Longest text carried over between pages while waiting for a sentence boundary
+MAX_CARRY_CHARS = 100000
 
-def process_pdf(file_stream):
+# Sentence splitter used for uploaded documents: "punkt" (NLTK) or "regex" (built in, much faster)
+SENTENCE_SPLITTER = os.environ.get("SENTENCE_SPLITTER", "punkt")
+
+# Candidate sentence ends for the regex splitter: terminal punctuation, closing quotes or brackets, whitespace
+SENTENCE_END_PATTERN = re.compile(r'[.!?]+["\')\]]*\s+')
+
+# Words ending in a period that don't end a sentence ("Rubber Bumper Co. sells ...")
+ABBREVIATIONS = frozenset([
+    'co', 'corp', 'inc', 'ltd', 'llc', 'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc',
+    'e.g', 'i.e', 'u.s', 'no', 'approx', 'dept', 'est', 'fig', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul',
+    'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+])
+
+# Approximate LLM tokens for token-based chunk sizes: words, numbers and individual punctuation marks
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+# First character of each whitespace-separated word
+WORD_START_PATTERN = re.compile(r'(?<!\S)\S')
+
+# PyPDF2 and NLTK are imported on first use; NLTK alone takes over a second to import
+_punkt_lock = threading.Lock()
+_punkt_checked = False
+
+def ensure_punkt():
+    """
+    Make sure NLTK's Punkt sentence tokenizer data is installed, downloading it if needed.
+    
+    Runs once per process, on the first sentence split, instead of when the
+    module is imported.
+    """
+    global _punkt_checked
+    if _punkt_checked:
+        return
+    with _punkt_lock:
+        if _punkt_checked:
+            return
+        import nltk
+        # NLTK 3.9 replaced the pickled punkt models with punkt_tab
+        resource = 'punkt_tab' if hasattr(nltk.tokenize, 'PunktTokenizer') else 'punkt'
+        try:
+            nltk.data.find(f'tokenizers/{resource}')
+        except LookupError:
+            nltk.download(resource)
+        _punkt_checked = True
+
+def sent_tokenize(text):
+    """
+    Split text into sentences with NLTK's Punkt tokenizer.
+    
+    Args:
+        text: A string containing the text to split.
+        
+    Returns:
+        A list of sentences.
+    """
+    ensure_punkt()
+    from nltk.tokenize import sent_tokenize as punkt_sent_tokenize
+    return punkt_sent_tokenize(text)
+
+_punkt_tokenizer = None
+
+def _get_punkt_tokenizer():
+    """Load NLTK's English Punkt tokenizer once per process."""
+    global _punkt_tokenizer
+    if _punkt_tokenizer is None:
+        ensure_punkt()
+        import nltk
+        if hasattr(nltk.tokenize, 'PunktTokenizer'):
+            _punkt_tokenizer = nltk.tokenize.PunktTokenizer('english')
+        else:
+            _punkt_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+    return _punkt_tokenizer
+
+def iter_regex_sentence_spans(text):
+    """
+    Find sentences with a regular expression instead of NLTK's Punkt model.
+    
+    A sentence ends at ".", "!" or "?" (with any closing quotes or brackets)
+    followed by whitespace, unless the next word starts with a lowercase
+    letter or the period ends a common abbreviation such as "Co." or "e.g.".
+    
+    Args:
+        text: A string containing the text to split.
+        
+    Yields:
+        (start, end) offsets of each sentence in text, without surrounding whitespace.
+    """
+    start = len(text) - len(text.lstrip())
+    for match in SENTENCE_END_PATTERN.finditer(text, start):
+        end = match.end()
+        if end < len(text) and text[end].islower():
+            continue
+        
+        punctuation_end = match.start() + len(match.group().rstrip())
+        if text[match.start()] == '.':
+            word_start = text.rfind(' ', start, match.start()) + 1
+            if text[max(word_start, start):match.start()].lower() in ABBREVIATIONS:
+                continue
+        
+        if punctuation_end > start:
+            yield start, punctuation_end
+        start = end
+    
+    end = len(text.rstrip())
+    if end > start:
+        yield start, end
+
+def iter_sentence_spans(text, splitter=None):
+    """
+    Find the sentences of a text as offsets, without copying it.
+    
+    Args:
+        text: A string containing the text to split.
+        splitter: "punkt" or "regex"; defaults to SENTENCE_SPLITTER.
+        
+    Returns:
+        An iterable of (start, end) offsets of each sentence in text.
+    """
+    splitter = splitter or SENTENCE_SPLITTER
+    if splitter == 'regex':
+        return iter_regex_sentence_spans(text)
+    if splitter == 'punkt':
+        return _get_punkt_tokenizer().span_tokenize(text)
+    raise ValueError(f"Unknown sentence splitter {splitter!r}; use 'punkt' or 'regex'")
+
+def split_sentences(text, splitter=None):
+    """
+    Split text into sentences.
+    
+    Args:
+        text: A string containing the text to split.
+        splitter: "punkt" or "regex"; defaults to SENTENCE_SPLITTER.
+        
+    Returns:
+        A list of sentences.
+    """
+    if (splitter or SENTENCE_SPLITTER) == 'punkt':
+        return sent_tokenize(text)
+    return [text[start:end] for start, end in iter_sentence_spans(text, splitter)]
+
+def process_pdf(file_stream, workers=None):
     """
     Process a PDF file and extract text chunks.
     
     Args:
         file_stream: A file stream object representing the PDF file.
+        workers: Number of processes used to extract pages in parallel; None or 1 extracts sequentially.
         
     Returns:
         A list of text chunks, with each chunk containing approximately 1000 characters.
     """
-    text = extract_text_from_pdf(file_stream)
-    chunks = split_text_into_chunks(text)
-    return chunks
+    return list(iter_pdf_chunks(file_stream, workers=workers))
 
-def extract_text_from_pdf(file_stream):
+def iter_pdf_chunks(file_stream, chunk_size=1000, overlap=200, workers=None, progress=None, splitter=None,
+                    unit="chars"):
     """
-    Extract text from a PDF file.
+    Stream text chunks from a PDF file as its pages are read.
+    
+    Pages are extracted, cleaned, split into sentences and grouped into
+    chunks one at a time, so chunks are produced before the whole document
+    has been read and memory use is bounded by a few pages.
+    
+    Args:
+        file_stream: A file stream object representing the PDF file.
+        chunk_size: An integer representing the target size of each chunk.
+        overlap: An integer representing the size of the overlap between chunks.
+        workers: Number of processes used to extract pages in parallel; None or 1 extracts sequentially.
+        progress: Optional callable invoked as progress(pages_read, total_pages).
+        splitter: "punkt" or "regex"; defaults to SENTENCE_SPLITTER.
+        unit: "chars" or "tokens", the unit of chunk_size and overlap.
+        
+    Yields:
+        Text chunks, in document order.
+    """
+    if workers and workers > 1:
+        pages = iter_clean_pages_parallel(file_stream, workers=workers, progress=progress)
+    else:
+        pages = iter_clean_pages(iter_pdf_pages(file_stream, progress=progress))
+    return iter_chunks(iter_sentences(pages, splitter), chunk_size=chunk_size, overlap=overlap, unit=unit)
+
+def ingest_pdf(file_stream, vector_store, batch_size=64, workers=None, progress=None, on_batch=None):
+    """
+    Stream a PDF file into a vector store in batches of chunks.
     
     Args:
         file_stream: A file stream object representing the PDF file.
+        vector_store: A VectorStore object to add the chunks to.
+        batch_size: Number of chunks added to the vector store at a time.
+        workers: Number of processes used to extract pages in parallel; None or 1 extracts sequentially.
+        progress: Optional callable invoked as progress(pages_read, total_pages).
+        on_batch: Optional callable invoked with the total number of chunks added after each batch.
         
     Returns:
-        A string containing the extracted text.
+        The number of chunks added.
     """
+    added = 0
+    batch = []
+    for chunk in iter_pdf_chunks(file_stream, workers=workers, progress=progress):
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            vector_store.add_documents(batch)
+            added += len(batch)
+            batch = []
+            if on_batch:
+                on_batch(added)
+    
+    if batch:
+        vector_store.add_documents(batch)
+        added += len(batch)
+        if on_batch:
+            on_batch(added)
+    
+    return added
+
+def iter_pdf_pages(file_stream, progress=None):
+    """
+    Extract the raw text of each page of a PDF file.
+    
+    Args:
+        file_stream: A file stream object representing the PDF file.
+        progress: Optional callable invoked as progress(pages_read, total_pages).
+        
+    Yields:
+        The text of each page.
+    """
+    import PyPDF2
     pdf_reader = PyPDF2.PdfReader(file_stream)
-    text = ""
+    total_pages = len(pdf_reader.pages)
     
-    for page_num in range(len(pdf_reader.pages)):
-        page = pdf_reader.pages[page_num]
-        text += page.extract_text() + "\n"
+    for page_num, page in enumerate(pdf_reader.pages, start=1):
+        yield (page.extract_text() or "") + "\n"
+        if progress:
+            progress(page_num, total_pages)
+
+def iter_clean_pages(pages):
+    """
+    Clean page texts one at a time, skipping pages with no text.
+    
+    Joining the results with single spaces gives the same text as cleaning
+    the concatenated pages at once.
+    
+    Args:
+        pages: An iterable of page texts.
+        
+    Yields:
+        Cleaned, non-empty page texts.
+    """
+    for page in pages:
+        page = clean_text(page)
+        if page:
+            yield page
+
+def iter_clean_pages_parallel(source, workers=None, pages_per_task=None, progress=None):
+    """
+    Extract and clean PDF pages across a pool of processes.
+    
+    The page range is split into contiguous spans. Each worker process opens
+    the PDF independently, extracts and cleans its spans, and the results are
+    yielded in page order as they become available.
+    
+    Workers open the PDF by path: a stream backed by a file is opened by its
+    name, and any other stream is copied to a temporary file first rather
+    than read into memory. Workers are started with forkserver (or spawn
+    where that is unavailable), as this runs on ingestion queue threads and
+    forking a process that has other threads running can deadlock the child.
+    
+    Args:
+        source: A file path or a file stream object representing the PDF file.
+        workers: Number of worker processes; defaults to the number of CPUs.
+        pages_per_task: Pages extracted per task; defaults to spreading the
+            document over four tasks per worker.
+        progress: Optional callable invoked as progress(pages_read, total_pages).
+        
+    Yields:
+        Cleaned, non-empty page texts, in page order.
+    """
+    path = _stream_path(source)
+    if path is not None:
+        yield from _iter_clean_pages_parallel(path, workers, pages_per_task, progress)
+        return
+    
+    with tempfile.NamedTemporaryFile(suffix=".pdf", prefix="pages-") as spooled:
+        shutil.copyfileobj(source, spooled)
+        spooled.flush()
+        yield from _iter_clean_pages_parallel(spooled.name, workers, pages_per_task, progress)
+
+def _stream_path(source):
+    """Return the path of a PDF given as a path or as a file stream at its start, or None."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and os.path.isfile(name) and source.seekable() and source.tell() == 0:
+        return name
+    return None
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _iter_clean_pages_parallel(path, workers, pages_per_task, progress):
+    import PyPDF2
+    page_count = len(PyPDF2.PdfReader(path).pages)
+    if page_count == 0:
+        return
+    
+    workers = workers or os.cpu_count() or 1
+    if not pages_per_task:
+        pages_per_task = max(1, -(-page_count // (workers * 4)))
+    spans = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    
+    # Each worker opens the PDF once, not once per task
+    with ProcessPoolExecutor(max_workers=min(workers, len(spans)), mp_context=_pool_context(),
+                             initializer=_init_page_worker, initargs=(path,)) as executor:
+        for (_, stop), pages in zip(spans, executor.map(_extract_page_span, spans)):
+            yield from pages
+            if progress:
+                progress(stop, page_count)
+
+_worker_reader = None
+
+def _init_page_worker(path):
+    """Open the PDF once in each worker process."""
+    global _worker_reader
+    import PyPDF2
+    _worker_reader = PyPDF2.PdfReader(path)
+
+def _extract_page_span(span):
+    """Extract and clean the pages in [start, stop) in a worker process."""
+    start, stop = span
+    pages = (_worker_reader.pages[page_num].extract_text() or "" for page_num in range(start, stop))
+    return list(iter_clean_pages(pages))
+
+def iter_sentences(pages, splitter=None):
+    """
+    Split a stream of cleaned page texts into sentences.
+    
+    The last sentence of each page may continue on the next page, so it is
+    held back and tokenized again together with the following page.
     
-    # Clean the text
-    text = clean_text(text)
+    Args:
+        pages: An iterable of cleaned page texts.
+        splitter: "punkt" or "regex"; defaults to SENTENCE_SPLITTER.
+        
+    Yields:
+        Sentences, in document order.
+    """
+    carry = ""
+    for page in pages:
+        text = carry + " " + page if carry else page
+        sentences = split_sentences(text, splitter)
+        if not sentences:
+            carry = ""
+            continue
+        
+        yield from sentences[:-1]
+        carry = sentences[-1]
+        
+        # Don't hold on to text that never reaches a sentence boundary
+        if len(carry) > MAX_CARRY_CHARS:
+            yield carry
+            carry = ""
+    
+    if carry:
+        yield carry
+
+def extract_text_from_pdf(file_stream):
+    """
+    Extract text from a PDF file.
     
-    return text
+    Args:
+        file_stream: A file stream object representing the PDF file.
+        
+    Returns:
+        A string containing the extracted text.
+    """
+    return " ".join(iter_clean_pages(iter_pdf_pages(file_stream)))
 
 def clean_text(text):
     """
@@ -64,47 +404,132 @@ def clean_text(text):
     
     return text.strip()
 
-def split_text_into_chunks(text, chunk_size=1000, overlap=200):
+def split_text_into_chunks(text, chunk_size=1000, overlap=200, splitter=None, unit="chars"):
     """
-    Split text into chunks of approximately chunk_size characters.
+    Split text into chunks of approximately chunk_size characters or tokens.
     Uses sentence boundaries to ensure chunks don't break in the middle of a sentence.
     
     Args:
         text: A string containing the text to split.
         chunk_size: An integer representing the target size of each chunk.
-        overlap: An integer representing the number of characters to overlap between chunks.
+        overlap: An integer representing the size of the overlap between chunks.
+        splitter: "punkt" or "regex"; defaults to SENTENCE_SPLITTER.
+        unit: "chars" or "tokens", the unit of chunk_size and overlap.
         
     Returns:
         A list of text chunks.
     """
-    # Split the text into sentences
-    sentences = sent_tokenize(text)
+    return [text[start:end] for start, end in
+            iter_chunk_spans(text, iter_sentence_spans(text, splitter), chunk_size, overlap, unit)]
+
+def count_tokens(text, start=0, end=None):
+    """
+    Count the approximate LLM tokens in text[start:end] without copying it.
+    
+    Words, numbers and punctuation marks count as one token each, which is
+    close to what subword tokenizers produce for plain English prose.
+    """
+    return len(TOKEN_PATTERN.findall(text, start, len(text) if end is None else end))
+
+def _overlap_start(text, start, end, overlap, unit):
+    """Return where the overlap carried from the chunk text[start:end] into the next chunk begins."""
+    if overlap <= 0:
+        return end
+    if unit == "tokens":
+        # Keep the last `overlap` tokens. Look in a window at the end of the chunk first; the
+        # window may begin inside a token, so it is only used if it holds more than enough tokens.
+        window_start = max(start, end - overlap * 8)
+        starts = [match.start() for match in TOKEN_PATTERN.finditer(text, window_start, end)]
+        if len(starts) <= overlap and window_start > start:
+            starts = [match.start() for match in TOKEN_PATTERN.finditer(text, start, end)]
+        return starts[-min(overlap, len(starts))] if starts else end
+    # Keep the whole words within the last `overlap` characters
+    match = WORD_START_PATTERN.search(text, max(start, end - overlap), end)
+    return match.start() if match else end
+
+def iter_chunk_spans(text, sentence_spans, chunk_size=1000, overlap=200, unit="chars"):
+    """
+    Group sentences into chunks, working on offsets into the original text.
+    
+    Each sentence is measured once and no text is copied, so the work is
+    linear in the length of the text. A sentence longer than chunk_size
+    becomes a chunk of its own.
+    
+    Args:
+        text: The text the sentence offsets refer to.
+        sentence_spans: An iterable of (start, end) sentence offsets, in order.
+        chunk_size: An integer representing the target size of each chunk.
+        overlap: An integer representing the size of the overlap between chunks.
+        unit: "chars" or "tokens", the unit of chunk_size and overlap.
+        
+    Yields:
+        (start, end) offsets of each chunk in text.
+    """
+    if unit not in ("chars", "tokens"):
+        raise ValueError(f"Unknown chunk size unit {unit!r}; use 'chars' or 'tokens'")
+    
+    chunk_start = chunk_end = None
+    size = 0
+    for start, end in sentence_spans:
+        sentence_size = count_tokens(text, start, end) if unit == "tokens" else None
+        if chunk_start is not None:
+            new_size = size + sentence_size if unit == "tokens" else end - chunk_start
+            if new_size > chunk_size:
+                yield chunk_start, chunk_end
+                chunk_start = _overlap_start(text, chunk_start, chunk_end, overlap, unit)
+                if chunk_start >= chunk_end:
+                    chunk_start = None
+                elif unit == "tokens":
+                    size = count_tokens(text, chunk_start, chunk_end)
+        
+        if chunk_start is None:
+            chunk_start, size = start, 0
+        chunk_end = end
+        if unit == "tokens":
+            size += sentence_size
+    
+    if chunk_start is not None:
+        yield chunk_start, chunk_end
+
+def iter_chunks(sentences, chunk_size=1000, overlap=200, unit="chars"):
+    """
+    Group a stream of sentences into chunks of approximately chunk_size characters or tokens.
     
-    chunks = []
-    current_chunk = ""
+    Sentences are joined with single spaces, so for cleaned text the chunks
+    are the same as split_text_into_chunks produces for the whole text.
     
+    Args:
+        sentences: An iterable of sentences.
+        chunk_size: An integer representing the target size of each chunk.
+        overlap: An integer representing the size of the overlap between chunks.
+        unit: "chars" or "tokens", the unit of chunk_size and overlap.
+        
+    Yields:
+        Text chunks, each yielded as soon as it is complete.
+    """
+    if unit not in ("chars", "tokens"):
+        raise ValueError(f"Unknown chunk size unit {unit!r}; use 'chars' or 'tokens'")
+    
+    parts = []
+    size = 0
     for sentence in sentences:
-        # If adding the next sentence would exceed the chunk size, 
-        # save the current chunk and start a new one
-        if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
-            chunks.append(current_chunk.strip())
-            
-            # Start new chunk with overlap from the end of the previous chunk
-            # Find the last 'overlap' characters worth of complete sentences
-            words = current_chunk.split()
-            overlap_text = ""
-            for word in reversed(words):
-                if len(overlap_text) + len(word) + 1 <= overlap:
-                    overlap_text = word + " " + overlap_text
-                else:
-                    break
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        sentence_size = count_tokens(sentence) if unit == "tokens" else len(sentence)
+        
+        if parts and size + sentence_size + (unit == "chars") > chunk_size:
+            chunk = " ".join(parts)
+            yield chunk
             
-            current_chunk = overlap_text
+            # Start the new chunk with the end of the previous one
+            tail = chunk[_overlap_start(chunk, 0, len(chunk), overlap, unit):]
+            parts = [tail] if tail else []
+            size = count_tokens(tail) if unit == "tokens" else len(tail)
         
-        current_chunk += " " + sentence
-    
-    # Add the last chunk if it's not empty
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
+        # In characters, the size includes the spaces joining the sentences
+        size += sentence_size + (unit == "chars" and bool(parts))
+        parts.append(sentence)
     
-    return chunks
+    if parts:
+        yield " ".join(parts)
@@ -0,0 +1,228 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# "whats" / "what's" -> "what is", so contractions match the spelled-out question
+CONTRACTION_PATTERN = re.compile(r"\b(what|how|who|where|when|why)'?s\b")
+
+# "doesn't" -> "does not", so a negation is a word of its own
+NEGATION_PATTERN = re.compile(r"n't\b")
+
+# Words and numbers ("2.5" stays one token, so "in 2016" and "in 2017" differ)
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?|[a-z]{2,}")
+
+# Words that don't change what a question asks; negations are deliberately not among them
+STOPWORDS = frozenset("""
+    a an the is are was were be been being am do does did has have had what which who whom whose how when where
+    why of in on at to for from by with about into over as and or if it its this that these those there their
+    they them we our us you your me my can could would should will shall may might much many tell please
+""".split())
+
+def content_tokens(normalized):
+    """Return the words and numbers of a normalized question that aren't stopwords."""
+    return frozenset(token for token in TOKEN_PATTERN.findall(normalized) if token not in STOPWORDS)
+
+def normalize_question(text):
+    """
+    Normalize a question for similarity matching.
+
+    Args:
+        text: The question text.
+
+    Returns:
+        The lowercased question with common contractions expanded and
+        whitespace collapsed.
+    """
+    text = CONTRACTION_PATTERN.sub(r"\1 is", text.lower())
+    text = NEGATION_PATTERN.sub(" not", text)
+    return " ".join(text.split())
+
+class SemanticCache:
+    """
+    Index of previously answered questions for near-duplicate lookups.
+
+    Questions are indexed with an incremental VectorStore, and a new
+    question is matched to the most similar indexed one by cosine
+    similarity over IDF-weighted term counts. Similarity alone would let
+    questions differing in one word ("benefits" and "risks", or an added
+    "not") share an answer, so a candidate only matches if it has exactly
+    the same content words and numbers, ignoring stopwords, word order,
+    punctuation and contractions. The cache stores only the question keys;
+    answers stay in the response cache, so their TTLs and eviction still
+    apply.
+
+    Recently added questions are kept in a small pending list that is
+    compared directly and indexed in batches, so the index's IDF weights
+    are recomputed once per batch rather than once per question. The index
+    is created on the first add, so creating a cache doesn't load
+    scikit-learn.
+    """
+
+    def __init__(self, threshold=0.8, max_entries=20000, batch_size=64, candidates=5):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for two questions to share an answer.
+            max_entries: Maximum number of indexed questions; the oldest are removed first.
+            batch_size: Number of pending questions indexed at a time.
+            candidates: Number of indexed questions checked per lookup.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.candidates = candidates
+
+        self._store = None              # created on the first add
+        self._keys = OrderedDict()      # normalized question -> response cache key, oldest first
+        self._questions = {}            # response cache key -> normalized questions mapping to it
+        self._pending = []              # normalized questions not indexed yet
+        self._pending_vectors = None    # their vectors, until the pending list or the index changes
+        self._removed_since_compact = 0
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    def add(self, question, key):
+        """
+        Register a question whose answer is stored in the response cache.
+
+        Args:
+            question: The question text.
+            key: The response cache key holding its answer.
+        """
+        if self.max_entries <= 0:
+            return
+
+        normalized = normalize_question(question)
+        with self._lock:
+            if normalized in self._keys:
+                self._unlink(normalized, self._keys[normalized])
+                self._keys[normalized] = key
+                self._questions.setdefault(key, set()).add(normalized)
+                self._keys.move_to_end(normalized)
+                return
+
+            self._keys[normalized] = key
+            self._questions.setdefault(key, set()).add(normalized)
+            self._pending.append(normalized)
+            self._pending_vectors = None
+
+            while len(self._keys) > self.max_entries:
+                oldest, oldest_key = self._keys.popitem(last=False)
+                self._unlink(oldest, oldest_key)
+                self._remove(oldest)
+
+            # Index the first question right away so pending ones have IDF weights to compare with
+            if len(self._pending) >= self.batch_size or self._store is None or len(self._store) == 0:
+                self._flush()
+
+    def lookup(self, question):
+        """
+        Find the most similar previously answered question.
+
+        Args:
+            question: The question text.
+
+        Returns:
+            A (key, similarity) tuple for the best match above the threshold, or None.
+        """
+        if self.max_entries <= 0:
+            return None
+
+        normalized = normalize_question(question)
+        with self._lock:
+            best = None
+            if normalized in self._keys:
+                best = (normalized, 1.0)
+            elif self._store is not None:
+                import numpy as np
+                tokens = content_tokens(normalized)
+                candidates = self._store.search_many([normalized], top_k=self.candidates, threshold=self.threshold)[0]
+
+                if self._pending:
+                    if self._pending_vectors is None:
+                        self._pending_vectors = self._store.transform(self._pending)
+                    if self._pending_vectors is not None:
+                        query = self._store.transform([normalized])
+                        scores = (self._pending_vectors @ query.T).toarray().ravel()
+                        candidates += [(self._pending[idx], scores[idx]) for idx in np.flatnonzero(scores > self.threshold)]
+
+                for candidate, score in sorted(candidates, key=lambda c: -c[1]):
+                    if content_tokens(candidate) == tokens:
+                        best = (candidate, float(score))
+                        break
+
+            if best is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            return self._keys[best[0]], best[1]
+
+    def discard(self, key):
+        """Remove every question that maps to a response cache key, e.g. after its answer expired."""
+        with self._lock:
+            for normalized in self._questions.pop(key, ()):
+                del self._keys[normalized]
+                self._remove(normalized)
+
+    def _unlink(self, normalized, key):
+        """Remove a question from the questions of its response cache key."""
+        questions = self._questions[key]
+        questions.discard(normalized)
+        if not questions:
+            del self._questions[key]
+
+    def _remove(self, normalized):
+        """Remove a question from the pending list or the index."""
+        self._pending_vectors = None
+        if normalized in self._pending:
+            self._pending.remove(normalized)
+            return
+
+        self._store.delete_document(normalized)
+        self._removed_since_compact += 1
+        if self._removed_since_compact > max(self.batch_size, len(self._store)):
+            self._store.compact()
+            self._removed_since_compact = 0
+
+    def _flush(self):
+        """Index the pending questions."""
+        if self._pending:
+            if self._store is None:
+                from utils.vector_store import VectorStore
+                self._store = VectorStore(incremental=True, n_features=2 ** 18, preload=False)
+            self._store.add_documents(self._pending, ids=self._pending)
+            self._pending = []
+            self._pending_vectors = None
+
+    def clear(self):
+        """Remove all questions."""
+        with self._lock:
+            if self._store is not None:
+                self._store.clear()
+            self._keys.clear()
+            self._questions.clear()
+            self._pending = []
+            self._pending_vectors = None
+            self._removed_since_compact = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self):
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._keys),
+                "pending": len(self._pending),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """A function call in flight, shared by every caller with the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is still running wait for it and receive the same result
+    (or exception) instead of repeating the work. Works for threads via do()
+    and for coroutines on an event loop via do_async().
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    def do(self, key, func):
+        """
+        Call func(), or wait for an identical call already in flight.
+
+        Args:
+            key: Hashable key identifying duplicate calls.
+            func: Callable taking no arguments.
+
+        Returns:
+            The value returned by func.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executions += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, func):
+        """
+        Await func(), or an identical coroutine already in flight on this event loop.
+
+        The shared call runs as its own task, so a caller that is cancelled
+        (e.g. because its client disconnected) doesn't cancel it for the others.
+
+        Args:
+            key: Hashable key identifying duplicate calls.
+            func: Callable taking no arguments and returning an awaitable.
+
+        Returns:
+            The value the awaitable resolves to.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = loop.create_task(func())
+                task.add_done_callback(lambda _: self._forget_task(task_key))
+                self._executions += 1
+            else:
+                self._coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _forget_task(self, task_key):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stats(self):
+        """Return execution, coalescing and in-flight counters."""
+        with self._lock:
+            total = self._executions + self._coalesced
+            return {
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+                "coalesced_rate": self._coalesced / total if total else 0.0,
+            }
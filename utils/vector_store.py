@@ -1,22 +1,98 @@
 import os
+import json
+import bisect
+import time
+import shutil
+import threading
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+from utils.bm25 import BM25Index
+from utils.dense_index import DenseIndex
 
 class VectorStore:
     """
     A simple in-memory vector store implementation using TF-IDF vectorization.
     With pre-loaded Rubber Bumper case study data.
+
+    By default the TF-IDF vectorizer is refit over the whole corpus whenever
+    documents are added. With incremental=True documents are hashed into term
+    counts instead, document frequencies are kept as running totals and the
+    IDF weighting is applied lazily on the next search, so adding a batch only
+    costs time proportional to the batch.
+
+    With backend="bm25" documents go into an inverted index scored with
+    BM25 instead, and top-k search stops early once the remaining query terms
+    cannot change the result (see BM25Index). Scores are then BM25 scores
+    divided by the highest score the query could reach, so like cosine
+    similarities they fall between 0 and 1 and the same relevance thresholds
+    apply. transform() is unavailable.
+
+    With backend="dense" the TF-IDF vectors are projected into a small
+    latent space by truncated SVD and searched as quantized dense vectors
+    (see DenseIndex). In incremental mode the projection is reused for new
+    documents until the corpus has doubled since it was fit.
     """
     
-    def __init__(self):
-        """Initialize the vector store with Rubber Bumper case study data."""
+    SNAPSHOT_FORMAT = 1
+    
+    DENSE_ARRAYS = ("columns", "components", "codes", "scales", "centroids", "cluster_rows", "cluster_offsets")
+    
+    BACKENDS = ("tfidf", "bm25", "dense")
+    
+    def __init__(self, incremental=False, n_features=2 ** 20, preload=True, backend="tfidf",
+                 dimensions=128, quantization="int8", clusters=0):
+        """
+        Initialize the vector store with Rubber Bumper case study data.
+        
+        Args:
+            incremental: Whether to index documents incrementally with a hashing vectorizer.
+            n_features: Number of hash buckets used in incremental mode.
+            preload: Whether to load the Rubber Bumper case study documents.
+            backend: "tfidf" for cosine similarity of TF-IDF vectors, "bm25"
+                for BM25 scoring over an inverted index, which is always
+                incremental, or "dense" for cosine similarity of low-rank
+                projections of the TF-IDF vectors.
+            dimensions: Number of latent dimensions in dense mode.
+            quantization: Storage type of dense vectors, "int8", "float16" or "float32".
+            clusters: Number of k-means clusters used to pre-filter dense search; 0 scores every document.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown vector store backend: {backend}")
+        self.backend = backend
+        self.incremental = incremental and backend != "bm25"
+        self.preload = preload
         self.documents = []
-        self.vectorizer = TfidfVectorizer()
+        self.doc_ids = []           # row -> document ID
+        self._rows = {}             # document ID -> row of its current version
+        self._deleted = set()       # rows removed or replaced by a newer version
+        self._next_id = 0
+        self.metadata = {}          # JSON-serializable state kept with snapshots, reset by clear()
+        self._lock = threading.RLock()
         self.vectors = None
+        self._term_documents_cache = None
+        self._dense = None
+        self._dense_source = None   # the vectors the dense index was built from
+        
+        if backend == "dense":
+            self._dense = DenseIndex(dimensions=dimensions, quantization=quantization, clusters=clusters)
+        
+        if backend == "bm25":
+            self.vectorizer = None
+            self._bm25 = BM25Index()
+        elif incremental:
+            self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+            self._df = np.zeros(n_features, dtype=np.int64)
+            self._batches = []          # append-only term count matrices, one per added batch
+            self._batch_offsets = []    # first row of each batch
+            self._idf = None
+        else:
+            self.vectorizer = TfidfVectorizer()
         
         # Pre-load the Rubber Bumper case study information
-        self.load_rubber_bumper_data()
+        if preload:
+            self.load_rubber_bumper_data()
         
     def load_rubber_bumper_data(self):
         """Load the Rubber Bumper case study data directly into the vector store."""
@@ -152,21 +228,163 @@ class VectorStore:
         # Add the documents to the store
         self.add_documents(rubber_bumper_documents)
         
-    def add_documents(self, documents):
+    def add_documents(self, documents, ids=None):
         """
         Add documents to the vector store.
         
         Args:
             documents: A list of strings (document texts).
+            ids: Optional list of document IDs. Adding a document with an
+                existing ID replaces the previous version.
+            
+        Returns:
+            A list of the document IDs, in the same order as documents.
         """
-        # Add to existing documents
-        self.documents.extend(documents)
+        documents = list(documents)
+        if ids is None:
+            ids = [None] * len(documents)
+        elif len(ids) != len(documents):
+            raise ValueError("ids must have the same length as documents")
         
-        # Recompute vectors for all documents
-        self._update_vectors()
+        with self._lock:
+            # Documents loaded from a snapshot are read-only until the first change
+            if not isinstance(self.documents, list):
+                self.documents = list(self.documents)
+            
+            start = len(self.documents)
+            assigned_ids = []
+            for document, doc_id in zip(documents, ids):
+                if doc_id is None:
+                    doc_id = self._next_id
+                    self._next_id += 1
+                elif isinstance(doc_id, int) and doc_id >= self._next_id:
+                    self._next_id = doc_id + 1
+                
+                # Replacing a document tombstones its previous version
+                if doc_id in self._rows:
+                    self._tombstone(self._rows[doc_id])
+                
+                self._rows[doc_id] = len(self.documents)
+                self.documents.append(document)
+                self.doc_ids.append(doc_id)
+                assigned_ids.append(doc_id)
+            
+            if self.backend == "bm25":
+                self._bm25.add(documents)
+            elif self.incremental:
+                self._index_batch(documents, start)
+            else:
+                # Recompute vectors for all documents
+                self._update_vectors()
+        
+        return assigned_ids
+    
+    def update_document(self, doc_id, document):
+        """
+        Replace the text of an existing document.
+        
+        Args:
+            doc_id: The ID of the document to replace.
+            document: The new document text.
+        """
+        with self._lock:
+            if doc_id not in self._rows:
+                raise KeyError(doc_id)
+            self.add_documents([document], ids=[doc_id])
+    
+    def delete_document(self, doc_id):
+        """
+        Remove a document from search results.
+        
+        The document is tombstoned rather than removed from the index, so no
+        rebuild is needed; call compact() to reclaim the space.
+        
+        Args:
+            doc_id: The ID of the document to delete.
+        """
+        with self._lock:
+            row = self._rows.pop(doc_id)
+            self._tombstone(row)
+            
+            if not self.incremental and not self._rows:
+                self.vectors = None
+    
+    def _tombstone(self, row):
+        """Mark a row as deleted and remove its terms from the document frequencies."""
+        self._deleted.add(row)
+        
+        if self.backend == "bm25":
+            self._bm25.remove(row)
+        elif self.incremental:
+            batch_num = bisect.bisect_right(self._batch_offsets, row) - 1
+            batch = self._batches[batch_num]
+            local_row = row - self._batch_offsets[batch_num]
+            terms = batch.indices[batch.indptr[local_row]:batch.indptr[local_row + 1]]
+            self._df[terms] -= 1
+            self.vectors = None
+    
+    def _index_batch(self, documents, start):
+        """Hash a batch of documents into term counts and update document frequencies."""
+        counts = self.vectorizer.transform(documents).tocsr()
+        counts.sum_duplicates()
+        
+        self._df += np.bincount(counts.indices, minlength=self._df.shape[0])
+        self._batches.append(counts)
+        self._batch_offsets.append(start)
+        
+        # The weighted matrix is rebuilt lazily on the next search
+        self.vectors = None
+    
+    def _ensure_vectors(self):
+        """Build the IDF-weighted, L2-normalized matrix if documents changed since the last search."""
+        if not self.incremental or self.vectors is not None or not self._batches:
+            return self.vectors
+        
+        with self._lock:
+            if self.vectors is not None:
+                return self.vectors
+            
+            if len(self._batches) > 1:
+                # Merge batches so the list stays short as more are appended
+                self._batches = [sp.vstack(self._batches, format="csr")]
+                self._batch_offsets = [0]
+            counts = self._batches[0]
+            
+            # Smoothed IDF, matching TfidfVectorizer's default weighting
+            n_live = len(self.documents) - len(self._deleted)
+            idf = np.log((1 + n_live) / (1 + self._df)) + 1
+            
+            self._idf = idf
+            self.vectors = normalize(self._apply_idf(counts, idf), norm="l2", copy=False)
+            return self.vectors
+    
+    @staticmethod
+    def _apply_idf(counts, idf):
+        """Return a copy of a CSR term count matrix with each column scaled by its IDF."""
+        weighted = counts.astype(np.float64, copy=True)
+        weighted.data *= idf[weighted.indices]
+        return weighted
+    
+    def _term_documents(self, vectors):
+        """Return the transposed document matrix as CSR, cached until the vectors change."""
+        cached = self._term_documents_cache
+        if cached is None or cached[0] is not vectors:
+            cached = (vectors, vectors.T.tocsr())
+            self._term_documents_cache = cached
+        return cached[1]
+    
+    def _transform_queries(self, queries):
+        """Vectorize queries the same way as the indexed documents."""
+        if self.incremental:
+            counts = self.vectorizer.transform(queries).tocsr()
+            return normalize(self._apply_idf(counts, self._idf), norm="l2", copy=False)
+        return self.vectorizer.transform(queries)
     
     def _update_vectors(self):
         """Update the vectors for all documents."""
+        if self._deleted:
+            self._compact_rows()
+        
         if not self.documents:
             self.vectors = None
             return
@@ -174,6 +392,94 @@ class VectorStore:
         # Fit and transform the documents
         self.vectors = self.vectorizer.fit_transform(self.documents)
     
+    def _compact_rows(self):
+        """Drop tombstoned rows from the document list and renumber the remaining rows."""
+        keep = [row for row in range(len(self.documents)) if row not in self._deleted]
+        self.documents = [self.documents[row] for row in keep]
+        self.doc_ids = [self.doc_ids[row] for row in keep]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+        self._deleted = set()
+        return keep
+    
+    def compact(self):
+        """Physically remove tombstoned documents from the index."""
+        with self._lock:
+            if not self._deleted:
+                return
+            
+            if self.backend == "bm25":
+                self._compact_rows()
+                self._bm25 = BM25Index(self._bm25.k1, self._bm25.b)
+                self._bm25.add(self.documents)
+                return
+            
+            if not self.incremental:
+                self._update_vectors()
+                return
+            
+            counts = sp.vstack(self._batches, format="csr") if len(self._batches) > 1 else self._batches[0]
+            keep = self._compact_rows()
+            self._batches = [counts[keep]]
+            self._batch_offsets = [0]
+            self.vectors = None
+    
+    def transform(self, texts):
+        """
+        Vectorize texts with the same weighting as the indexed documents.
+
+        Rows are L2-normalized, so the dot product of two rows is their
+        cosine similarity, on the same scale as search scores.
+
+        Args:
+            texts: A list of strings.
+
+        Returns:
+            A sparse matrix with one row per text, or None while the store is
+            empty or uses the BM25 backend.
+        """
+        with self._lock:
+            if self._ensure_vectors() is None:
+                return None
+            return self._transform_queries(list(texts))
+
+    def memory_usage(self):
+        """
+        Estimate the memory held by the store.
+        
+        Counts the document texts and the index arrays. Arrays memory-mapped
+        from a snapshot are counted too, although the OS can drop their pages.
+        
+        Returns:
+            The approximate size in bytes.
+        """
+        def csr_bytes(matrix):
+            return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes if matrix is not None else 0
+        
+        with self._lock:
+            if isinstance(self.documents, _SnapshotDocuments):
+                total = self.documents.nbytes
+            else:
+                total = sum(len(document or "") for document in self.documents)
+            
+            total += csr_bytes(self.vectors)
+            if self._term_documents_cache is not None:
+                total += csr_bytes(self._term_documents_cache[1])
+            if self.backend == "bm25":
+                total += self._bm25.memory_usage()
+            if self._dense is not None:
+                total += self._dense.memory_usage()
+            if self.incremental:
+                total += self._df.nbytes + sum(csr_bytes(batch) for batch in self._batches)
+                total += self._idf.nbytes if self._idf is not None else 0
+            elif getattr(self.vectorizer, "vocabulary_", None) is not None:
+                # Dict entry, key string and index per term, roughly
+                total += len(self.vectorizer.vocabulary_) * 100 + self.vectorizer.idf_.nbytes
+            return total
+    
+    def __len__(self):
+        """Return the number of live documents."""
+        return len(self._rows)
+    
     def search(self, query, top_k=3):
         """
         Search for documents similar to the query.
@@ -185,28 +491,367 @@ class VectorStore:
         Returns:
             A list of tuples (document_text, similarity_score).
         """
-        if not self.documents or self.vectors is None:
-            return []
+        return self.search_many([query], top_k=top_k)[0]
+    
+    def search_many(self, queries, top_k=3, threshold=0.1):
+        """
+        Search for documents similar to each of several queries at once.
+        
+        All queries are vectorized together and scored with a single sparse
+        matrix product. Document and query rows are already L2-normalized, so
+        the product is the cosine similarity. Only the top_k candidates of
+        each query are sorted.
+        
+        Args:
+            queries: A list of query strings.
+            top_k: An integer representing the number of top documents to return per query.
+            threshold: Only documents scoring above this similarity are returned.
+            
+        Returns:
+            A list with one entry per query, each a list of tuples (document_text, similarity_score).
+        """
+        queries = list(queries)
+        if self.backend == "bm25":
+            return self._search_bm25(queries, top_k, threshold)
+        
+        vectors = self._ensure_vectors()
+        if not queries or not self._rows or vectors is None or top_k <= 0:
+            return [[] for _ in queries]
         
-        # Transform query
-        query_vector = self.vectorizer.transform([query])
+        if self.backend == "dense":
+            return self._search_dense(vectors, queries, top_k, threshold)
         
-        # Compute similarities
-        similarities = cosine_similarity(query_vector, self.vectors)[0]
+        # Transform queries
+        query_vectors = self._transform_queries(queries)
         
-        # Get top-k documents
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        # One sparse product against the term -> document matrix, so each query
+        # only touches the documents that share one of its terms
+        similarities = (query_vectors @ self._term_documents(vectors)).tocsr()
+        
+        deleted_rows = np.fromiter(self._deleted, dtype=np.int64) if self._deleted else None
         
-        # Return top-k documents with their similarity scores
         results = []
-        for idx in top_indices:
-            if similarities[idx] > 0.1:  # Only include relevant results
-                results.append((self.documents[idx], similarities[idx]))
+        for query_num in range(len(queries)):
+            start, end = similarities.indptr[query_num], similarities.indptr[query_num + 1]
+            scores = similarities.data[start:end]
+            rows = similarities.indices[start:end]
+            
+            # Only include relevant results, and never tombstoned documents
+            keep = scores > threshold
+            if deleted_rows is not None:
+                keep &= ~np.isin(rows, deleted_rows)
+            scores, rows = scores[keep], rows[keep]
+            
+            # Partial selection of the top-k, then sort just those
+            if len(scores) > top_k:
+                top = np.argpartition(-scores, top_k - 1)[:top_k]
+                scores, rows = scores[top], rows[top]
+            order = np.argsort(-scores, kind="stable")
+            
+            results.append([(self.documents[rows[idx]], scores[idx]) for idx in order])
         
         return results
     
+    def _search_bm25(self, queries, top_k, threshold):
+        """Search the BM25 index one query at a time, scaling scores to between 0 and 1."""
+        results = []
+        with self._lock:
+            for query in queries:
+                hits = self._bm25.search(query, top_k)
+                highest = self._bm25.max_score(query) if hits else 1.0
+                results.append([(self.documents[row], score / highest)
+                                for row, score in hits if score / highest > threshold])
+        return results
+    
+    def _ensure_dense(self, vectors):
+        """Rebuild the dense index if the vectors changed since it was built."""
+        dense = self._dense
+        if self._dense_source is vectors:
+            return dense
+        
+        # Hashed columns keep their meaning as documents are added, so the
+        # projection is only refit once the corpus has doubled; a refit
+        # vocabulary renumbers the columns, so it always needs a new one
+        if not self.incremental or dense.components is None or vectors.shape[0] >= 2 * dense.fitted_rows:
+            dense.fit(vectors)
+        dense.build(vectors)
+        self._dense_source = vectors
+        return dense
+    
+    def _search_dense(self, vectors, queries, top_k, threshold):
+        """Search the quantized latent vectors."""
+        with self._lock:
+            dense = self._ensure_dense(vectors)
+            query_vectors = self._transform_queries(queries)
+            deleted_rows = np.fromiter(self._deleted, dtype=np.int64) if self._deleted else None
+            hits = dense.search(query_vectors, top_k, deleted_rows)
+            return [[(self.documents[row], score) for row, score in query_hits if score > threshold]
+                    for query_hits in hits]
+    
+    def save(self, path):
+        """
+        Save the index to a snapshot directory.
+        
+        The snapshot holds the vectorizer state and IDF weights, the CSR
+        arrays of the document matrix (and its transposed term -> document
+        form used by search), and the document texts, each as a separate .npy
+        file so they can be memory-mapped by load(). A dense index is saved
+        with its projection; a BM25 index is not, and load() rebuilds it from
+        the document texts.
+        
+        Each save writes a new version directory next to path (path.v<time>)
+        and then atomically replaces the symlink at path with one pointing to
+        it, so readers see either the old or the new snapshot and never a
+        partial one. The previous version is kept for readers that resolved
+        the link just before the swap; older ones are deleted.
+        
+        Args:
+            path: Path of the snapshot symlink to create or replace.
+        """
+        with self._lock:
+            vectors = self._ensure_vectors()
+            
+            meta = {
+                "format": self.SNAPSHOT_FORMAT,
+                "incremental": self.incremental,
+                "backend": self.backend,
+                "doc_ids": self.doc_ids,
+                "deleted": sorted(self._deleted),
+                "next_id": self._next_id,
+                "metadata": self.metadata,
+            }
+            arrays = {}
+            
+            if self.incremental:
+                meta["n_features"] = self._df.shape[0]
+                arrays["df"] = self._df
+                if self._batches:
+                    counts = sp.vstack(self._batches, format="csr") if len(self._batches) > 1 else self._batches[0]
+                    self._batches = [counts]
+                    self._batch_offsets = [0]
+                    self._add_csr_arrays(arrays, "counts", counts, meta)
+                    arrays["idf"] = self._idf
+            elif vectors is not None:
+                meta["vocabulary"] = {term: int(col) for term, col in self.vectorizer.vocabulary_.items()}
+                arrays["idf"] = self.vectorizer.idf_
+            
+            if self.backend == "dense":
+                dense = self._dense
+                meta["dense"] = {"dimensions": dense.dimensions, "quantization": dense.quantization,
+                                 "clusters": dense.clusters, "fitted_rows": dense.fitted_rows}
+                if vectors is not None:
+                    self._ensure_dense(vectors)
+                    for name in self.DENSE_ARRAYS:
+                        if getattr(dense, name) is not None:
+                            arrays[f"dense_{name}"] = getattr(dense, name)
+            
+            if vectors is not None:
+                self._add_csr_arrays(arrays, "vectors", vectors, meta)
+                self._add_csr_arrays(arrays, "term_documents", self._term_documents(vectors), meta)
+            
+            # Document texts as one UTF-8 blob plus row offsets
+            encoded = [(document or "").encode("utf-8") for document in self.documents]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(document) for document in encoded], out=offsets[1:])
+            arrays["document_offsets"] = offsets
+            arrays["document_text"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        
+        path = os.path.abspath(path)
+        version_path = f"{path}.v{time.time_ns():020d}-{os.getpid()}"
+        os.makedirs(version_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(version_path, f"{name}.npy"), array)
+        with open(os.path.join(version_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        
+        previous = os.path.realpath(path) if os.path.islink(path) else None
+        if os.path.isdir(path) and not os.path.islink(path):
+            # A snapshot saved as a plain directory by an earlier version
+            shutil.rmtree(path)
+        link_path = f"{path}.link-{os.getpid()}"
+        if os.path.lexists(link_path):
+            os.remove(link_path)
+        os.symlink(os.path.basename(version_path), link_path)
+        os.replace(link_path, path)
+        
+        self._prune_snapshots(path, keep=min(filter(None, (previous, version_path))))
+    
+    @staticmethod
+    def _snapshot_versions(path):
+        """Return the version directories of a snapshot path, oldest first."""
+        directory, name = os.path.split(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, entry) for entry in os.listdir(directory)
+                      if entry.startswith(f"{name}.v"))
+    
+    @classmethod
+    def _prune_snapshots(cls, path, keep):
+        """Delete versions older than keep, except the one path currently points to."""
+        # Versions newer than keep may still be being written by another process
+        current = os.path.realpath(path)
+        for version in cls._snapshot_versions(path):
+            if version < keep and version != current:
+                shutil.rmtree(version, ignore_errors=True)
+    
+    @classmethod
+    def delete_snapshot(cls, path):
+        """Delete a snapshot saved with save() and all of its versions."""
+        if os.path.islink(path) or os.path.isfile(path):
+            os.remove(path)
+        elif os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        for version in cls._snapshot_versions(path):
+            shutil.rmtree(version, ignore_errors=True)
+    
+    @staticmethod
+    def _add_csr_arrays(arrays, name, matrix, meta):
+        arrays[f"{name}_data"] = matrix.data
+        arrays[f"{name}_indices"] = matrix.indices
+        arrays[f"{name}_indptr"] = matrix.indptr
+        meta[f"{name}_shape"] = list(matrix.shape)
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load an index saved with save().
+        
+        With mmap=True the arrays are memory-mapped rather than read, so
+        loading takes milliseconds and processes loading the same snapshot
+        share its pages through the OS page cache. Mapped arrays are
+        read-only; they are copied only when the store is modified.
+        
+        Args:
+            path: Path of the snapshot directory.
+            mmap: Whether to memory-map the arrays instead of reading them into memory.
+            
+        Returns:
+            A VectorStore.
+        
+        Raises:
+            OSError: If the snapshot is missing or unreadable.
+            ValueError: If the snapshot is corrupt or has an unsupported format.
+        """
+        # Resolve the link once, so every file comes from the same version even if save() swaps it
+        path = os.path.realpath(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != cls.SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported vector store snapshot format: {meta.get('format')}")
+        
+        def load_array(name, mode="r"):
+            filename = os.path.join(path, f"{name}.npy")
+            if not os.path.exists(filename):
+                return None
+            array = np.load(filename, mmap_mode=mode if mmap else None)
+            # Zero-length arrays cannot be mapped
+            return np.asarray(array) if array.size == 0 else array
+        
+        def load_csr(name):
+            if f"{name}_shape" not in meta:
+                return None
+            return sp.csr_matrix(
+                (load_array(f"{name}_data"), load_array(f"{name}_indices"), load_array(f"{name}_indptr")),
+                shape=tuple(meta[f"{name}_shape"]),
+                copy=False,
+            )
+        
+        backend = meta.get("backend", "tfidf")
+        dense_options = {key: meta["dense"][key] for key in ("dimensions", "quantization", "clusters")} \
+            if backend == "dense" else {}
+        
+        if backend == "bm25":
+            store = cls(preload=False, backend="bm25")
+        elif meta["incremental"]:
+            store = cls(incremental=True, n_features=meta["n_features"], preload=False,
+                        backend=backend, **dense_options)
+            # Copy-on-write, as document frequencies change when documents are added
+            store._df = load_array("df", mode="c")
+            counts = load_csr("counts")
+            if counts is not None:
+                store._batches = [counts]
+                store._batch_offsets = [0]
+                store._idf = load_array("idf")
+        else:
+            store = cls(preload=False, backend=backend, **dense_options)
+            if "vocabulary" in meta:
+                store.vectorizer.vocabulary_ = meta["vocabulary"]
+                store.vectorizer.idf_ = load_array("idf")
+        
+        store.vectors = load_csr("vectors")
+        term_documents = load_csr("term_documents")
+        if term_documents is not None:
+            store._term_documents_cache = (store.vectors, term_documents)
+        
+        store.documents = _SnapshotDocuments(load_array("document_text"), load_array("document_offsets"))
+        store.doc_ids = meta["doc_ids"]
+        store._deleted = set(meta["deleted"])
+        store._rows = {doc_id: row for row, doc_id in enumerate(store.doc_ids) if row not in store._deleted}
+        store._next_id = meta["next_id"]
+        store.metadata = meta.get("metadata", {})
+        
+        if backend == "dense" and store.vectors is not None:
+            for name in cls.DENSE_ARRAYS:
+                setattr(store._dense, name, load_array(f"dense_{name}"))
+            store._dense.fitted_rows = meta["dense"]["fitted_rows"]
+            store._dense_source = store.vectors
+        
+        if store.backend == "bm25":
+            store._bm25.add(store.documents)
+            for row in store._deleted:
+                store._bm25.remove(row)
+        return store
+    
     def clear(self):
-        """Clear all documents from the vector store and reload the base data."""
-        self.documents = []
-        self.vectors = None
-        self.load_rubber_bumper_data()
+        """Clear all documents from the vector store and reload the base data if it was preloaded."""
+        with self._lock:
+            self.documents = []
+            self.doc_ids = []
+            self._rows = {}
+            self._deleted = set()
+            self._next_id = 0
+            self.metadata = {}
+            self.vectors = None
+            
+            if self.backend == "dense":
+                self._dense.components = None
+                self._dense_source = None
+            
+            if self.backend == "bm25":
+                self._bm25 = BM25Index(self._bm25.k1, self._bm25.b)
+            elif self.incremental:
+                self._df[:] = 0
+                self._batches = []
+                self._batch_offsets = []
+                self._idf = None
+            
+            if self.preload:
+                self.load_rubber_bumper_data()
+
+
+class _SnapshotDocuments:
+    """Read-only sequence of document texts decoded on access from a snapshot blob."""
+    
+    def __init__(self, text, offsets):
+        self._text = text
+        self._offsets = offsets
+    
+    def __len__(self):
+        return len(self._offsets) - 1
+    
+    @property
+    def nbytes(self):
+        return self._text.nbytes + self._offsets.nbytes
+    
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return bytes(self._text[self._offsets[row]:self._offsets[row + 1]]).decode("utf-8")
+    
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]